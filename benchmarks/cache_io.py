@@ -0,0 +1,338 @@
+"""
+Cache I/O benchmark for ``functions.caching``.
+
+Runs reader processes hammering ``load_cache()`` / ``load_cache_snapshot()`` while one or two writer processes
+keep rewriting the caches with ``dump_cache()`` and ``dump_cache_changes()``, just like the collectors do,
+and reports p50/p99 latencies, throughput and writers lock wait time as JSON.
+
+Payloads mimic the production caches: the core cache with the datacenters tree and key prices,
+and the leaderboard cache with the world and seven regional leaderboards.
+
+Usage::
+
+    python benchmarks/cache_io.py --readers 4 --writers 2 --duration 10 --output results.json
+
+Runs offline and doesn't need ``config.py`` or any of the bot dependencies besides ``filelock``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import json
+import multiprocessing as mp
+import os
+from pathlib import Path
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import types
+
+ROOT = Path(__file__).resolve().parent.parent
+
+CORE_CACHE_NAME = 'core_cache.json'
+LEADERBOARD_CACHE_NAME = 'leaderboard_cache.json'
+
+LEADERBOARD_REGIONS = ('northamerica', 'southamerica', 'europe', 'asia', 'australia', 'china', 'africa')
+MAPS = ('ancient', 'nuke', 'dust2', 'train', 'mirage', 'inferno', 'anubis', 'vertigo', 'overpass')
+CURRENCIES = ('USD', 'GBP', 'EUR', 'RUB', 'BRL', 'JPY', 'NOK', 'IDR', 'MYR', 'PHP', 'SGD', 'THB', 'VND', 'KRW',
+              'UAH', 'MXN', 'CAD', 'AUD', 'NZD', 'PLN', 'CHF', 'AED', 'CLP', 'CNY', 'COP', 'PEN', 'SAR', 'TWD',
+              'HKD', 'ZAR', 'INR', 'CRC', 'ILS', 'KWD', 'QAR', 'UYU', 'KZT')
+LOADS = ('idle', 'low', 'medium', 'high', 'full')
+CAPACITIES = ('full', 'ok', 'low', 'unknown')
+
+# same shape as DatacenterAtlas: 22 regions, 37 datacenters
+DATACENTER_REGIONS = (3, 2, 1, 1, 4, 2, 2, 1, 3, 1, 2, 1, 3, 1, 1, 2, 1, 1, 2, 1, 1, 1)
+
+PERCENTILES = (50, 99)
+
+
+def import_caching():
+    """Imports ``functions.caching`` without running ``functions/__init__.py`` (it needs the whole bot)."""
+
+    package = types.ModuleType('functions')
+    package.__path__ = [str(ROOT / 'functions')]
+    sys.modules['functions'] = package
+
+    for name in ('cachebus', 'cache_backends', 'caching'):
+        spec = importlib.util.spec_from_file_location(f'functions.{name}', ROOT / 'functions' / f'{name}.py')
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[spec.name] = module
+        spec.loader.exec_module(module)
+        setattr(package, name, module)
+
+    return package.caching, package.cache_backends
+
+
+# payloads
+
+def datacenters_payload(rng: random.Random) -> dict[str, ...]:
+    def state():
+        return {'capacity': rng.choice(CAPACITIES), 'load': rng.choice(LOADS)}
+
+    tree = {}
+    for i, size in enumerate(DATACENTER_REGIONS):
+        if size == 1:
+            tree[f'datacenter_{i}'] = state()
+        else:
+            tree[f'region_{i}'] = {f'datacenter_{i}_{j}': state() for j in range(size)}
+    return tree
+
+
+def key_price_payload(rng: random.Random) -> dict[str, float]:
+    return {currency: round(rng.uniform(1, 30_000), 2) for currency in CURRENCIES}
+
+
+def core_payload(rng: random.Random) -> dict[str, ...]:
+    return {
+        'api_timestamp': time.time(),
+        'sessions_logon_state': 'normal',
+        'matchmaking_scheduler_state': 'normal',
+        'steam_community_state': 'normal',
+        'webapi_state': 'normal',
+        'online_servers': rng.randint(100_000, 200_000),
+        'active_players': rng.randint(500_000, 1_500_000),
+        'searching_players': rng.randint(1_000, 20_000),
+        'average_search_time': rng.randint(10, 60),
+        'player_24h_peak': rng.randint(1_000_000, 1_800_000),
+        'player_alltime_peak': 1_862_531,
+        'monthly_unique_players': 28_000_000,
+        'datacenters': datacenters_payload(rng),
+        'key_price': key_price_payload(rng),
+    }
+
+
+def leaderboard_payload(rng: random.Random, region: str) -> list[dict[str, ...]]:
+    return [{'rank': rank,
+             'rating': rng.randint(20_000, 35_000),
+             'name': f'player_{region}_{rng.getrandbits(32):08x}',
+             'wins': rng.randint(0, 1_000),
+             'ties': rng.randint(0, 50),
+             'losses': rng.randint(0, 1_000),
+             'last_wins': {map_name: rng.randint(0, 100) for map_name in MAPS},
+             'timestamp': int(time.time()),
+             'region': region}
+            for rank in range(1, 11)]
+
+
+def leaderboards_payload(rng: random.Random) -> dict[str, ...]:
+    payload = {'world_leaderboard_stats': leaderboard_payload(rng, 'world')}
+    for region in LEADERBOARD_REGIONS:
+        payload[f'regional_leaderboard_stats_{region}'] = leaderboard_payload(rng, region)
+    return payload
+
+
+# workers
+
+def setup_worker(backend: str, workdir: Path, *, timed_locks: list[float] = None):
+    caching, cache_backends = import_caching()
+
+    if backend == 'sqlite':
+        class Backend(cache_backends.SQLiteCacheBackend):
+            def _transaction(self, *, timeout: int):
+                return _TimedLock(super()._transaction(timeout=timeout), timed_locks)
+
+        caching.set_backend(Backend(workdir / 'cache.db'))
+    else:
+        class Backend(cache_backends.JSONCacheBackend):
+            @staticmethod
+            def get_filelock(path: Path, *, timeout: int = 10):
+                return _TimedLock(cache_backends.JSONCacheBackend.get_filelock(path, timeout=timeout), timed_locks)
+
+        caching.set_backend(Backend())
+    return caching
+
+
+class _TimedLock:
+    """Context manager wrapper recording how long it took to enter the wrapped one."""
+
+    def __init__(self, lock, waits: list[float] | None):
+        self.lock = lock
+        self.waits = waits
+
+    def __enter__(self):
+        start = time.perf_counter()
+        result = self.lock.__enter__()
+        if self.waits is not None:
+            self.waits.append(time.perf_counter() - start)
+        return result
+
+    def __exit__(self, *exc_info):
+        return self.lock.__exit__(*exc_info)
+
+
+def reader(backend: str, workdir: str, operation: str, start_at: float, stop_at: float, results: mp.Queue):
+    workdir = Path(workdir)
+    caching = setup_worker(backend, workdir)
+    load = caching.load_cache_snapshot if operation == 'load_cache_snapshot' else caching.load_cache
+    paths = (workdir / CORE_CACHE_NAME, workdir / LEADERBOARD_CACHE_NAME)
+
+    latencies = []
+    time.sleep(max(0., start_at - time.time()))
+    i = 0
+    while time.time() < stop_at:
+        path = paths[i % 2]
+        i += 1
+        start = time.perf_counter()
+        load(path)
+        latencies.append(time.perf_counter() - start)
+
+    results.put({'role': 'reader', 'operation': operation, 'latencies': latencies})
+    results.put(None)
+
+
+def writer(backend: str, workdir: str, index: int, interval: float, start_at: float, stop_at: float,
+           results: mp.Queue):
+    workdir = Path(workdir)
+    lock_waits = []
+    caching = setup_worker(backend, workdir, timed_locks=lock_waits)
+    rng = random.Random(index)
+    core_path = workdir / CORE_CACHE_NAME
+    leaderboard_path = workdir / LEADERBOARD_CACHE_NAME
+
+    # the first writer acts like core.py, the second one like game_coordinator.py
+    if index == 0:
+        operations = (('dump_cache', lambda: caching.dump_cache(core_path, core_payload(rng))),
+                      ('dump_cache_changes', lambda: caching.dump_cache_changes(leaderboard_path,
+                                                                                leaderboards_payload(rng))))
+    else:
+        operations = (('dump_cache_changes', lambda: caching.dump_cache_changes(
+            core_path, {'key_price': key_price_payload(rng), 'online_players': rng.randint(0, 2_000_000)})),)
+
+    latencies = {name: [] for name, _ in operations}
+    time.sleep(max(0., start_at - time.time()))
+    i = 0
+    while time.time() < stop_at:
+        name, operation = operations[i % len(operations)]
+        i += 1
+        start = time.perf_counter()
+        operation()
+        latencies[name].append(time.perf_counter() - start)
+        if interval:
+            time.sleep(interval)
+
+    for name, values in latencies.items():
+        results.put({'role': 'writer', 'operation': name, 'latencies': values})
+    results.put({'role': 'writer', 'operation': 'lock_wait', 'latencies': lock_waits})
+    results.put(None)
+
+
+# reporting
+
+def percentile(values: list[float], p: float) -> float:
+    if not values:
+        return 0.
+    values = sorted(values)
+    k = (len(values) - 1) * p / 100
+    lo = int(k)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+def summarize(latencies: list[float], duration: float) -> dict[str, ...]:
+    summary = {'count': len(latencies), 'throughput_ops': round(len(latencies) / duration, 2)}
+    for p in PERCENTILES:
+        summary[f'p{p}_ms'] = round(percentile(latencies, p) * 1000, 4)
+    summary['max_ms'] = round(max(latencies, default=0.) * 1000, 4)
+    return summary
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(('git', 'rev-parse', 'HEAD'), cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return
+
+
+def run(args: argparse.Namespace) -> dict[str, ...]:
+    workdir = Path(tempfile.mkdtemp(prefix='incs2bot-cache-bench-'))
+    caching = setup_worker(args.backend, workdir)
+    rng = random.Random(0)
+    caching.dump_cache(workdir / CORE_CACHE_NAME, core_payload(rng))
+    caching.dump_cache(workdir / LEADERBOARD_CACHE_NAME, leaderboards_payload(rng))
+    payload_bytes = {name: len(json.dumps(caching.load_cache(workdir / name), indent=4, ensure_ascii=False))
+                     for name in (CORE_CACHE_NAME, LEADERBOARD_CACHE_NAME)}
+    caching.get_backend().close()
+
+    ctx = mp.get_context('spawn')
+    results = ctx.Queue()
+    start_at = time.time() + args.warmup
+    stop_at = start_at + args.duration
+
+    processes = [ctx.Process(target=reader, args=(args.backend, str(workdir), args.read_operation,
+                                                  start_at, stop_at, results))
+                 for _ in range(args.readers)]
+    processes += [ctx.Process(target=writer, args=(args.backend, str(workdir), i, args.write_interval,
+                                                   start_at, stop_at, results))
+                  for i in range(args.writers)]
+    for process in processes:
+        process.start()
+
+    collected: dict[str, list[float]] = {}
+    running = len(processes)
+    while running:
+        result = results.get()
+        if result is None:  # the process is done
+            running -= 1
+            continue
+        collected.setdefault(result['operation'], []).extend(result['latencies'])
+
+    for process in processes:
+        process.join()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    lock_waits = collected.pop('lock_wait', [])
+    lock_wait_summary = summarize(lock_waits, args.duration)
+    lock_wait_summary['total_ms'] = round(sum(lock_waits) * 1000, 4)
+
+    return {
+        'benchmark': 'cache_io',
+        'revision': git_revision(),
+        'label': args.label,
+        'timestamp': int(time.time()),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'params': {'backend': args.backend,
+                   'readers': args.readers,
+                   'writers': args.writers,
+                   'duration': args.duration,
+                   'write_interval': args.write_interval,
+                   'read_operation': args.read_operation,
+                   'payload_bytes': payload_bytes},
+        'operations': {name: summarize(values, args.duration) for name, values in sorted(collected.items())},
+        'lock_wait': lock_wait_summary,
+    }
+
+
+def parse_args(argv: list[str] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Cache I/O benchmark for functions.caching')
+    parser.add_argument('--backend', choices=('json', 'sqlite'), default='json')
+    parser.add_argument('--readers', type=int, default=4, help='number of reader processes')
+    parser.add_argument('--writers', type=int, choices=(1, 2), default=1, help='number of writer processes')
+    parser.add_argument('--duration', type=float, default=10, help='seconds to run for')
+    parser.add_argument('--warmup', type=float, default=1, help='seconds to wait for the processes to start')
+    parser.add_argument('--write-interval', type=float, default=0,
+                        help='seconds the writers sleep between writes (0 = write as fast as possible)')
+    parser.add_argument('--read-operation', choices=('load_cache', 'load_cache_snapshot'), default='load_cache')
+    parser.add_argument('--label', help='free-form label stored in the results')
+    parser.add_argument('--output', type=Path, help='write the results there instead of stdout')
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] = None):
+    args = parse_args(argv)
+    results = json.dumps(run(args), indent=4)
+    if args.output is None:
+        print(results)
+    else:
+        args.output.write_text(results + '\n', encoding='utf-8')
+
+
+if __name__ == '__main__':
+    main()
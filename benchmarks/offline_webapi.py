@@ -0,0 +1,291 @@
+"""
+Offline stand-in for the Steam Web API.
+
+Replays the responses recorded in ``benchmarks/fixtures/steam_webapi`` (one ``<Interface>.<Method>.json`` per endpoint)
+with configurable latency, error rates and payload sizes, so anything built on ``SteamWebAPI`` / ``AsyncSteamWebAPI``
+can be exercised deterministically on a machine with no network::
+
+    stand_in = OfflineSteamWebAPI(OfflineProfile(latency=0.05, error_rate=0.1, payload_scale=2, seed=1))
+    api = AsyncSteamWebAPI('offline', transport=stand_in.async_transport())
+    sync_api = SteamWebAPI('offline', transport=stand_in.sync_transport())
+
+The fixtures can be refreshed from the real API (the key never gets into them)::
+
+    python benchmarks/offline_webapi.py record --api-key <key> --steamid 76561197960287930
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import copy
+from dataclasses import dataclass
+import datetime as dt
+import importlib.util
+import json
+from pathlib import Path
+import random
+import sys
+import threading
+import time
+import types
+
+import httpx
+import requests
+import requests.adapters
+
+ROOT = Path(__file__).resolve().parent.parent
+FIXTURES_DIR = Path(__file__).resolve().parent / 'fixtures' / 'steam_webapi'
+
+# where the variable-length part of every response is, that's what ``payload_scale`` scales
+SCALABLE_PARTS = {
+    ('ICSGOServers_730', 'GetGameServersStatus'): ('result', 'datacenters'),
+    ('ICSGOServers_730', 'GetLeaderboardEntries'): ('result', 'entries'),
+    ('ISteamEconomy', 'GetAssetPrices'): ('result', 'assets'),
+    ('ISteamUser', 'GetPlayerBans'): ('players',),
+    ('ISteamUser', 'GetPlayerSummaries'): ('response', 'players'),
+    ('ISteamUserStats', 'GetUserStatsForGame'): ('playerstats', 'stats'),
+}
+GAME_SERVERS_STATUS = ('ICSGOServers_730', 'GetGameServersStatus')
+
+NOT_FOUND_BODY = b'<html><head><title>Not Found</title></head><body><h1>Not Found</h1></body></html>'
+ERROR_BODY = b'<html><head><title>Service Unavailable</title></head><body><h1>Service Unavailable</h1></body></html>'
+
+
+def import_steam_webapi():
+    """Imports ``utypes.steam_webapi`` without running ``utypes/__init__.py`` (it needs the whole bot)."""
+
+    package = types.ModuleType('utypes')
+    package.__path__ = [str(ROOT / 'utypes')]
+    sys.modules['utypes'] = package
+
+    for name in ('webapi_policy', 'steam_webapi'):
+        spec = importlib.util.spec_from_file_location(f'utypes.{name}', ROOT / 'utypes' / f'{name}.py')
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[spec.name] = module
+        spec.loader.exec_module(module)
+        setattr(package, name, module)
+
+    return package.steam_webapi
+
+
+@dataclass(frozen=True, slots=True)
+class OfflineProfile:
+    """
+    How the stand-in behaves.
+
+    Every request takes ``latency`` ± ``jitter`` seconds, fails with 503 with ``error_rate`` probability
+    or times out (after ``latency`` seconds) with ``timeout_rate`` probability. ``payload_scale`` multiplies
+    the variable-length part of every response (leaderboard entries, datacenters, assets and so on).
+    The same ``seed`` gives the same sequence of outcomes.
+    """
+
+    latency: float = 0
+    jitter: float = 0
+    error_rate: float = 0
+    timeout_rate: float = 0
+    payload_scale: float = 1
+    seed: int = 0
+
+
+class OfflineResponse:
+    __slots__ = ('status_code', 'content', 'delay', 'timed_out')
+
+    def __init__(self, status_code: int, content: bytes, delay: float, timed_out: bool = False):
+        self.status_code = status_code
+        self.content = content
+        self.delay = delay
+        self.timed_out = timed_out
+
+
+class OfflineSteamWebAPI:
+    """Answers Steam Web API requests with the recorded fixtures, keeps per-endpoint request counters."""
+
+    def __init__(self, profile: OfflineProfile = OfflineProfile(), fixtures_dir: Path = FIXTURES_DIR):
+        self.profile = profile
+        self.fixtures_dir = Path(fixtures_dir)
+        self.stats: dict[str, dict[str, int]] = {}
+
+        self._rng = random.Random(profile.seed)
+        self._lock = threading.Lock()
+        self._payloads: dict[tuple[str, str], dict[str, ...] | None] = {}
+        self._encoded: dict[tuple[str, str], bytes] = {}
+
+    def respond(self, path: str) -> OfflineResponse:
+        """Decides what a request to ``path`` (e.g. ``/ISteamUser/GetPlayerBans/v1/``) gets."""
+
+        endpoint = tuple(path.strip('/').split('/')[:2])
+        profile = self.profile
+        with self._lock:  # the sync transport may be shared between threads
+            delay = max(0., profile.latency + self._rng.uniform(-profile.jitter, profile.jitter))
+            roll = self._rng.random()
+            stats = self.stats.setdefault('/'.join(endpoint), {'requests': 0, 'errors': 0, 'timeouts': 0})
+            stats['requests'] += 1
+
+            if roll < profile.timeout_rate:
+                stats['timeouts'] += 1
+                return OfflineResponse(0, b'', delay, timed_out=True)
+            if roll < profile.timeout_rate + profile.error_rate:
+                stats['errors'] += 1
+                return OfflineResponse(503, ERROR_BODY, delay)
+
+            content = self._content(endpoint)
+        if content is None:
+            return OfflineResponse(404, NOT_FOUND_BODY, delay)
+        return OfflineResponse(200, content, delay)
+
+    def payload(self, endpoint: tuple[str, str]) -> dict[str, ...] | None:
+        """Returns the (scaled) fixture of an endpoint, ``None`` if there's no fixture for it."""
+
+        if endpoint not in self._payloads:
+            try:
+                with open(self.fixtures_dir / f'{endpoint[0]}.{endpoint[1]}.json', encoding='utf-8') as f:
+                    payload = json.load(f)
+            except FileNotFoundError:
+                payload = None
+            else:
+                if endpoint in SCALABLE_PARTS:
+                    payload = scale_payload(payload, SCALABLE_PARTS[endpoint], self.profile.payload_scale)
+            self._payloads[endpoint] = payload
+        return self._payloads[endpoint]
+
+    def _content(self, endpoint: tuple[str, str]) -> bytes | None:
+        if endpoint == GAME_SERVERS_STATUS:  # the timestamp is updated on every poll
+            payload = self.payload(endpoint)
+            if payload is None:
+                return
+            now = dt.datetime.now(dt.UTC)
+            payload['result']['app'].update(timestamp=int(now.timestamp()), time=f'{now:%Y-%m-%d %H:%M:%S}')
+            return json.dumps(payload).encode()
+
+        if endpoint not in self._encoded:
+            payload = self.payload(endpoint)
+            if payload is None:
+                return
+            self._encoded[endpoint] = json.dumps(payload).encode()
+        return self._encoded[endpoint]
+
+    def async_transport(self) -> OfflineTransport:
+        return OfflineTransport(self)
+
+    def sync_transport(self) -> OfflineAdapter:
+        return OfflineAdapter(self)
+
+
+def scale_payload(payload: dict[str, ...], part: tuple[str, ...], scale: float) -> dict[str, ...]:
+    """Repeats (or cuts) the list or the dict at ``part`` so it has ``scale`` times as many items."""
+
+    payload = copy.deepcopy(payload)
+    parent = payload
+    for key in part[:-1]:
+        parent = parent[key]
+    items = parent[part[-1]]
+    size = max(1, round(len(items) * scale))
+
+    if isinstance(items, list):
+        parent[part[-1]] = [copy.deepcopy(items[i % len(items)]) for i in range(size)]
+    else:
+        keys = list(items)
+        scaled = {}
+        for i in range(size):
+            key = keys[i % len(keys)]
+            scaled[key if i < len(keys) else f'{key} #{i // len(keys)}'] = copy.deepcopy(items[key])
+        parent[part[-1]] = scaled
+    return payload
+
+
+class OfflineTransport(httpx.AsyncBaseTransport):
+    """``httpx`` transport for ``AsyncSteamWebAPI``."""
+
+    def __init__(self, stand_in: OfflineSteamWebAPI):
+        self.stand_in = stand_in
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        response = self.stand_in.respond(request.url.path)
+        await asyncio.sleep(response.delay)
+        if response.timed_out:
+            raise httpx.ReadTimeout('Offline stand-in timed out', request=request)
+        return httpx.Response(response.status_code, content=response.content, request=request,
+                              headers={'Content-Type': content_type(response)})
+
+
+class OfflineAdapter(requests.adapters.BaseAdapter):
+    """``requests`` adapter for ``SteamWebAPI``."""
+
+    def __init__(self, stand_in: OfflineSteamWebAPI):
+        super().__init__()
+        self.stand_in = stand_in
+
+    def send(self, request: requests.PreparedRequest, stream=False, timeout=None, verify=True, cert=None,
+             proxies=None) -> requests.Response:
+        offline_response = self.stand_in.respond(requests.utils.urlparse(request.url).path)
+        time.sleep(offline_response.delay)
+        if offline_response.timed_out:
+            raise requests.ReadTimeout('Offline stand-in timed out', request=request)
+
+        response = requests.Response()
+        response.status_code = offline_response.status_code
+        response._content = offline_response.content
+        response.headers['Content-Type'] = content_type(offline_response)
+        response.encoding = 'utf-8'
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+def content_type(response: OfflineResponse) -> str:
+    return 'application/json; charset=UTF-8' if response.status_code == 200 else 'text/html'
+
+
+# recording
+
+def record(api_key: str, steamid: str, season: int, fixtures_dir: Path):
+    """Saves the current responses of the real API as fixtures."""
+
+    steam_webapi = import_steam_webapi()
+    api = steam_webapi.SteamWebAPI(api_key)
+    responses = {
+        ('ICSGOServers_730', 'GetGameServersStatus'): api.cs2_get_game_servers_status,
+        ('ICSGOServers_730', 'GetLeaderboardEntries'): lambda: api.cs2_get_premier_leaderboard_stats(season=season),
+        ('ICSGOServers_730', 'GetMonthlyPlayerCount'): lambda: api._method('ICSGOServers_730',
+                                                                            'GetMonthlyPlayerCount', 1),
+        ('ISteamEconomy', 'GetAssetPrices'): lambda: api.get_asset_prices(730),
+        ('ISteamUser', 'GetPlayerBans'): lambda: api.get_player_bans(steamid),
+        ('ISteamUser', 'GetPlayerSummaries'): lambda: api.get_player_summaries(steamid),
+        ('ISteamUserStats', 'GetUserStatsForGame'): lambda: api.get_user_game_stats(steamid, 730),
+    }
+
+    fixtures_dir.mkdir(parents=True, exist_ok=True)
+    for (interface, method), request in responses.items():
+        response = request()
+        if not isinstance(response, dict):
+            print(f'{interface}/{method}: got {response.status_code}, skipped', file=sys.stderr)
+            continue
+        path = fixtures_dir / f'{interface}.{method}.json'
+        path.write_text(json.dumps(response, indent=1, ensure_ascii=False) + '\n', encoding='utf-8')
+        print(f'{interface}/{method}: saved to {path}', file=sys.stderr)
+    api.close()
+
+
+def parse_args(argv: list[str] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Offline stand-in for the Steam Web API')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    record_parser = subparsers.add_parser('record', help='refresh the fixtures from the real API')
+    record_parser.add_argument('--api-key', required=True)
+    record_parser.add_argument('--steamid', required=True, help='a public profile with CS2 stats')
+    record_parser.add_argument('--season', type=int, default=3, help='Premier season of the leaderboard')
+    record_parser.add_argument('--fixtures-dir', type=Path, default=FIXTURES_DIR)
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] = None):
+    args = parse_args(argv)
+    if args.command == 'record':
+        record(args.api_key, args.steamid, args.season, args.fixtures_dir)
+
+
+if __name__ == '__main__':
+    main()
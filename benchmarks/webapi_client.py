@@ -0,0 +1,138 @@
+"""
+Steam Web API client benchmark for ``AsyncSteamWebAPI``, run against the offline stand-in (see ``offline_webapi.py``).
+
+Runs concurrent workers calling the endpoints the way a given consumer does, with the same retry policy
+and circuit breakers as ``core.py``, and reports p50/p99 latencies and throughput of every call,
+failed calls, requests that actually hit the stand-in (retries included) and the breakers states as JSON.
+
+Usage::
+
+    python benchmarks/webapi_client.py --mix collector --concurrency 8 --latency 0.05 --error-rate 0.05
+
+Runs offline and doesn't need ``config.py`` or any of the bot dependencies besides ``httpx`` and ``requests``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+from pathlib import Path
+import platform
+import random
+import time
+
+from cache_io import git_revision, summarize
+from offline_webapi import import_steam_webapi, OfflineProfile, OfflineSteamWebAPI
+
+LEADERBOARD_REGIONS = ('northamerica', 'southamerica', 'europe', 'asia', 'australia', 'china', 'africa')
+STEAMID = '76561197960287930'  # the one the fixtures were recorded for
+
+# call name -> how to make it, the weights are how often the consumer makes it
+MIXES = {
+    'collector': {
+        'game_servers_status': (lambda api: api.cs2_get_game_servers_status(), 20),
+        'leaderboard': (lambda api: api.cs2_get_premier_leaderboard_stats(season=3,
+                                                                          region=random.choice(LEADERBOARD_REGIONS)),
+                        8),
+        'asset_prices': (lambda api: api.get_asset_prices(730), 1),
+        'monthly_player_count': (lambda api: api.cs2_get_monthly_player_count(), 1),
+    },
+    'profiles': {
+        'player_bans': (lambda api: api.get_player_bans(STEAMID), 1),
+        'player_summaries': (lambda api: api.get_player_summaries(STEAMID), 1),
+        'user_game_stats': (lambda api: api.get_user_game_stats(STEAMID, 730), 1),
+    },
+}
+
+
+async def worker(api, calls: dict[str, ...], rng: random.Random, stop_at: float,
+                 latencies: dict[str, list[float]], failures: dict[str, int]):
+    names = list(calls)
+    weights = [weight for _, weight in calls.values()]
+    while time.perf_counter() < stop_at:
+        name = rng.choices(names, weights)[0]
+        start = time.perf_counter()
+        # noinspection PyBroadException
+        try:
+            await calls[name][0](api)
+        except Exception:
+            failures[name] = failures.get(name, 0) + 1
+            continue
+        latencies.setdefault(name, []).append(time.perf_counter() - start)
+
+
+async def run(args: argparse.Namespace) -> dict[str, ...]:
+    steam_webapi = import_steam_webapi()
+    policy = steam_webapi.RetryPolicy(attempts=args.attempts, base_delay=args.base_delay, max_delay=15, deadline=30)
+    profile = OfflineProfile(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                             timeout_rate=args.timeout_rate, payload_scale=args.payload_scale, seed=args.seed)
+    stand_in = OfflineSteamWebAPI(profile)
+    api = steam_webapi.AsyncSteamWebAPI('offline', transport=stand_in.async_transport(), retry_policy=policy,
+                                        breaker_failure_threshold=args.breaker_threshold)
+
+    random.seed(args.seed)
+    latencies: dict[str, list[float]] = {}
+    failures: dict[str, int] = {}
+    stop_at = time.perf_counter() + args.duration
+    await asyncio.gather(*(worker(api, MIXES[args.mix], random.Random(args.seed + i), stop_at, latencies, failures)
+                           for i in range(args.concurrency)))
+    await api.close()
+
+    return {
+        'benchmark': 'webapi_client',
+        'revision': git_revision(),
+        'label': args.label,
+        'timestamp': int(time.time()),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'params': {'mix': args.mix,
+                   'concurrency': args.concurrency,
+                   'duration': args.duration,
+                   'attempts': args.attempts,
+                   'breaker_threshold': args.breaker_threshold,
+                   'profile': {'latency': profile.latency,
+                               'jitter': profile.jitter,
+                               'error_rate': profile.error_rate,
+                               'timeout_rate': profile.timeout_rate,
+                               'payload_scale': profile.payload_scale,
+                               'seed': profile.seed}},
+        'calls': {name: summarize(values, args.duration) for name, values in sorted(latencies.items())},
+        'failures': failures,
+        'stand_in_requests': stand_in.stats,
+        'breakers': api.breaker_states(),
+    }
+
+
+def parse_args(argv: list[str] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Steam Web API client benchmark against the offline stand-in')
+    parser.add_argument('--mix', choices=MIXES, default='collector', help='which consumer to mimic')
+    parser.add_argument('--concurrency', type=int, default=8, help='number of concurrent workers')
+    parser.add_argument('--duration', type=float, default=10, help='seconds to run for')
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds every request takes')
+    parser.add_argument('--jitter', type=float, default=0.01, help='± seconds added to the latency')
+    parser.add_argument('--error-rate', type=float, default=0, help='share of 503 responses')
+    parser.add_argument('--timeout-rate', type=float, default=0, help='share of requests timing out')
+    parser.add_argument('--payload-scale', type=float, default=1, help='multiplier of the response sizes')
+    parser.add_argument('--attempts', type=int, default=4, help='attempts per call, like in core.py')
+    parser.add_argument('--base-delay', type=float, default=1, help='base delay of the retry backoff')
+    parser.add_argument('--breaker-threshold', type=int, default=5, help='failures in a row to open a breaker')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--label', help='free-form label stored in the results')
+    parser.add_argument('--output', type=Path, help='write the results there instead of stdout')
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] = None):
+    args = parse_args(argv)
+    results = json.dumps(asyncio.run(run(args)), indent=4)
+    if args.output is None:
+        print(results)
+    else:
+        args.output.write_text(results + '\n', encoding='utf-8')
+
+
+if __name__ == '__main__':
+    main()
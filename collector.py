@@ -0,0 +1,87 @@
+"""
+Runs the core, the game coordinator and the graph collectors in a single process.
+
+An optional replacement for running ``core.py``, ``game_coordinator.py`` and ``online_players_graph.py``
+one by one: the heavy imports (pandas, matplotlib, Steam client) are loaded once, there's a single MTProto session,
+and the caches written by one collector are read by the others from memory (see ``caching.enable_write_through()``).
+
+* the core and the graph jobs share the core scheduler, the blocking graph maker runs in its thread pool;
+* the game coordinator shares the event loop too (its Steam clients run in their own gevent thread anyway),
+  the alerts are sent with the core bot.
+
+The per-script entry points still work as before, just don't run them along with this one.
+"""
+
+import asyncio
+import sys
+
+from apscheduler.schedulers.base import BaseScheduler
+# noinspection PyPackageRequirements
+from pyrogram import idle
+
+import config
+from functions import caching
+from functions.ulogging import get_logger
+
+import core
+import game_coordinator
+import online_players_graph
+
+logger = get_logger(f'{config.NAME}.collector')
+
+
+def adopt_jobs(source: BaseScheduler, target: BaseScheduler):
+    """Moves all the jobs of a scheduler that wasn't started to another one."""
+
+    for job in source.get_jobs():
+        # the options that weren't passed explicitly only get the scheduler defaults once it's started
+        options = {option: getattr(job, option) for option in ('misfire_grace_time', 'coalesce', 'max_instances')
+                   if hasattr(job, option)}
+        target.add_job(job.func, job.trigger, args=job.args, kwargs=job.kwargs, id=job.id, name=job.name, **options)
+        source.remove_job(job.id)
+
+
+async def main() -> bool:
+    """Returns ``False`` if the game coordinator has stopped on its own."""
+
+    logger.info('Started.')
+    gc_crashed = False
+    gc_task = None
+
+    caching.enable_write_through()
+    adopt_jobs(online_players_graph.scheduler, core.scheduler)
+    try:
+        core.scheduler.start()
+        await core.bot.start()
+        gc_task = asyncio.create_task(game_coordinator.run_embedded(core.bot))
+
+        idle_task = asyncio.create_task(idle())
+        await asyncio.wait((idle_task, gc_task), return_when=asyncio.FIRST_COMPLETED)
+        idle_task.cancel()
+        if gc_task.done():
+            gc_crashed = True
+            logger.warning('The game coordinator has stopped, shutting down...')
+    except TypeError:  # catching TypeError because Pyrogram propagates it at stop for some reason
+        logger.info('Shutting down the bot...')
+    finally:
+        if gc_task is not None:
+            gc_task.cancel()
+            # noinspection PyBroadException
+            try:
+                await gc_task
+            except asyncio.CancelledError:
+                pass
+            except Exception:
+                logger.exception('Caught exception in the game coordinator!')
+        core.scheduler.shutdown()
+        await core.alert_dispatcher.close()
+        await core.bot.stop()
+        await core.steam_webapi.close()
+        logger.info('Terminated.')
+
+    return not gc_crashed
+
+
+if __name__ == '__main__':
+    if not asyncio.get_event_loop().run_until_complete(main()):
+        sys.exit(1)
@@ -1,11 +1,9 @@
 import asyncio
 import datetime as dt
 import platform
-from functools import wraps
+from functools import partial, wraps
 
-import requests
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-import pandas as pd
 # noinspection PyPackageRequirements
 from pyrogram import Client, idle
 if platform.system() == 'Linux':
@@ -17,9 +15,15 @@ if platform.system() == 'Linux':
 import config
 from dcatlas import DatacenterAtlas
 from functions import caching, utime
+from functions.alerts import AlertDispatcher
+from functions.player_peak import PlayerPeakTracker
+from functions.polling import AdaptivePollingPolicy
 from functions.ulogging import *
 from l10n import locale
-from utypes import ExchangeRate, GameServers, State, SteamWebAPI
+from utypes import AsyncSteamWebAPI, CircuitBreaker, CircuitOpenError, RetryPolicy
+from utypes import QuotaExceededError, rate_limiter_from_config, RequestPriority
+from utypes import ExchangeRate, GameServers, State, States
+from utypes.game_data import BasicServerStatusData
 from utypes import LeaderboardStats, LEADERBOARD_API_REGIONS
 
 execution_start_dt = dt.datetime.now()
@@ -27,12 +31,25 @@ execution_cron = (execution_start_dt + dt.timedelta(minutes=2)).replace(second=0
 
 CURRENT_PREMIER_SEASON = 3
 UPDATE_CACHE_INTERVAL = 40
+JOB_ATTEMPTS = 5
+GAME_SERVERS_STATUS_ENDPOINT = 'ICSGOServers_730/GetGameServersStatus'
+POLLED_STATES = ('sessions_logon_state', 'matchmaking_scheduler_state', 'steam_community_state')
+LEADERBOARD_FETCH_CONCURRENCY = 8
+LEADERBOARD_FETCH_TIMEOUT = 20
+LEADERBOARD_FETCH_ATTEMPTS = 3
+LEADERBOARD_RETRY_DELAY = 45
 
 loc = locale('ru')
 
 setup_logging(config.LOGS_CONFIG_FILE_PATH)
 logger = get_logger(f'{config.NAME}.core')
 
+caching.setup_caching(config)
+
+# collector's own state, which the bot doesn't show, so it's kept out of the core cache
+CORE_STATUS_FILE_PATH = (getattr(config, 'CORE_STATUS_FILE_PATH', None)
+                         or config.CORE_CACHE_FILE_PATH.with_suffix('.status.json'))
+
 scheduler = AsyncIOScheduler()
 bot = Client(config.BOT_CORE_MODULE_NAME,
              api_id=config.API_ID,
@@ -41,47 +58,141 @@ bot = Client(config.BOT_CORE_MODULE_NAME,
              test_mode=config.TEST_MODE,
              no_updates=True,
              workdir=config.SESS_FOLDER)
-steam_webapi = SteamWebAPI(config.STEAM_API_KEY, headers=config.REQUESTS_HEADERS)
-
+polling_policy = AdaptivePollingPolicy(UPDATE_CACHE_INTERVAL,
+                                       min_interval=getattr(config, 'CORE_POLL_INTERVAL_MIN', 15),
+                                       max_interval=getattr(config, 'CORE_POLL_INTERVAL_MAX', 120))
+reported_api_datacenters: set[str] = set()  # that are missing in DatacenterAtlas
+game_coordinator_state: str | None = None  # seen on the last poll
+game_servers_fingerprint: str | None = None  # of the last GetGameServersStatus response written to the cache
+player_peak_tracker = PlayerPeakTracker(config.PLAYER_CHART_FILE_PATH,
+                                        getattr(config, 'PLAYER_PEAK_CHECKPOINT_FILE_PATH', None))
+alert_dispatcher = AlertDispatcher(bot)
+steam_webapi = AsyncSteamWebAPI(config.STEAM_API_KEY, headers=config.REQUESTS_HEADERS,
+                                http2=getattr(config, 'STEAM_WEBAPI_HTTP2', False),
+                                retry_policy=RetryPolicy(attempts=4, base_delay=1, max_delay=15, deadline=30),
+                                breaker_failure_threshold=5,
+                                breaker_reset_timeout=120,
+                                rate_limiter=rate_limiter_from_config(config),
+                                priority=RequestPriority.COLLECTOR)
+
+
+def exception_handler(*, message: str, retry: bool = False, timeout: int = 45, attempts: int = JOB_ATTEMPTS):
+    """Logs exceptions of a job and, if ``retry`` is set, runs it again up to ``attempts`` times in total."""
 
-def exception_handler(*, message: str, retry: bool = False, timeout: int = 45):
     def decorator(func):
         @wraps(func)
         async def inner(*args, **kwargs):
-            # noinspection PyBroadException
-            try:
-                await func(*args, **kwargs)
-            except Exception:
-                logger.exception(message)
-                if retry:
+            for attempt in range(1, (attempts if retry else 1) + 1):
+                # noinspection PyBroadException
+                try:
+                    return await func(*args, **kwargs)
+                except (CircuitOpenError, QuotaExceededError) as e:  # no point in hammering the API
+                    logger.warning(f'{message} {e}')
+                    return
+                except Exception:
+                    logger.exception(message)
+                if attempt < attempts:
                     await asyncio.sleep(timeout)
-                    return await inner(*args, **kwargs)
 
         return inner
     return decorator
 
 
 def remap_datacenters_info(info: dict[str, dict[str, str]]):
-    return {dc.id: dc.remap(info) for dc in DatacenterAtlas.available_dcs()}
+    new_api_datacenters = DatacenterAtlas.unknown_api_datacenters(info) - reported_api_datacenters
+    if new_api_datacenters:
+        logger.warning(f'Found datacenters missing in the atlas: {", ".join(sorted(new_api_datacenters))}')
+        reported_api_datacenters.update(new_api_datacenters)
 
+    return DatacenterAtlas.remap(info)
 
-def get_player_24h_peak(df: pd.DataFrame):
-    now = utime.utcnow()
-    end_date = f'{now:%Y-%m-%d %H:%M:%S}'
-    start_date = f'{(now - dt.timedelta(days=1)):%Y-%m-%d %H:%M:%S}'
-    mask = (df['DateTime'] > start_date) & (df['DateTime'] <= end_date)
 
-    player_24h_peak = df.loc[mask]['Players'].max()
-    return int(player_24h_peak) if pd.notna(player_24h_peak) else 0
+def is_maintenance(gc_state: str, sessions_logon_state: str) -> bool:
+    return BasicServerStatusData(utime.utcnow(),
+                                 States.get_or_unknown(gc_state),
+                                 States.get_or_unknown(sessions_logon_state)).is_maintenance()
 
 
-@scheduler.scheduled_job('interval', seconds=UPDATE_CACHE_INTERVAL)
-@exception_handler(message='Caught exception while updating the cache!')
+@scheduler.scheduled_job('interval', seconds=UPDATE_CACHE_INTERVAL, id='update_cache_info')
 async def update_cache_info():
-    cache = caching.load_cache(config.CORE_CACHE_FILE_PATH)
-    gc_cache = caching.load_cache(config.GC_CACHE_FILE_PATH)
+    # noinspection PyBroadException
+    try:
+        await collect_game_servers_status()
+    except Exception as e:
+        if isinstance(e, (CircuitOpenError, QuotaExceededError)):
+            logger.warning(f'Skipped updating the cache: {e}')
+        else:
+            logger.exception('Caught exception while updating the cache!')
+        reschedule_update_cache_info(polling_policy.observe(error=True))
+        report_webapi_breakers()
+
+
+def report_webapi_breakers():
+    """Lets the bot know that Steam Web API is unavailable, so it doesn't show outdated states as normal."""
+
+    global game_servers_fingerprint
+
+    breakers = steam_webapi.breaker_states()
+
+    # noinspection PyBroadException
+    try:
+        dump_status({'webapi_breakers': breakers})
+        if breakers.get(GAME_SERVERS_STATUS_ENDPOINT) == CircuitBreaker.OPEN:
+            game_servers_fingerprint = None  # so the real state gets written once the API is back
+            webapi_state = States.INTERNAL_STEAM_ERROR.literal
+            if caching.load_cache_snapshot(config.CORE_CACHE_FILE_PATH).get('webapi_state') != webapi_state:
+                caching.dump_cache_changes(config.CORE_CACHE_FILE_PATH, {'webapi_state': webapi_state})
+    except Exception:
+        logger.exception('Caught exception while reporting Steam Web API state!')
+
+
+def dump_status(changes: dict[str, ...]):
+    """Writes the collector state (poll interval, breakers, quota), which isn't shown by the bot."""
+
+    caching.dump_cache_changes(CORE_STATUS_FILE_PATH, changes | webapi_quota())
+
 
-    game_servers_data = GameServers.request(steam_webapi)
+def webapi_quota() -> dict[str, ...]:
+    if steam_webapi.rate_limiter is None:
+        return {}
+    return {'webapi_quota': steam_webapi.rate_limiter.quota()}
+
+
+def reschedule_update_cache_info(interval: float):
+    job = scheduler.get_job('update_cache_info')
+    if job is not None and job.trigger.interval.total_seconds() != interval:
+        logger.info(f'Polling game servers status every {interval:.0f} seconds now.')
+        scheduler.reschedule_job('update_cache_info', trigger='interval', seconds=interval)
+
+
+async def collect_game_servers_status():
+    global game_servers_fingerprint, game_coordinator_state
+
+    gc_cache = caching.load_cache_snapshot(config.GC_CACHE_FILE_PATH)
+
+    response = await steam_webapi.cs2_get_game_servers_status()
+    fingerprint = GameServers.fingerprint(response)
+    player_24h_peak = player_peak_tracker.peak()
+
+    gc_state = gc_cache.get('game_coordinator_state')
+    gc_state_changed = game_coordinator_state is not None and gc_state != game_coordinator_state
+    game_coordinator_state = gc_state
+
+    core_cache = caching.load_cache_snapshot(config.CORE_CACHE_FILE_PATH)
+    if (fingerprint == game_servers_fingerprint
+            and core_cache.get('player_24h_peak') == player_24h_peak
+            and gc_cache.get('online_players', 0) <= core_cache.get('player_alltime_peak', 1)):
+        # nothing but the timestamp has changed, no need to remap and rewrite everything
+        important = gc_state_changed or is_maintenance(gc_state, core_cache.get('sessions_logon_state'))
+        interval = polling_policy.observe(important=important)
+        caching.dump_cache_changes(config.CORE_CACHE_FILE_PATH, {'api_timestamp': GameServers.api_timestamp(response)})
+        dump_status({'poll_interval': interval, 'webapi_breakers': steam_webapi.breaker_states()})
+        reschedule_update_cache_info(interval)
+        return
+
+    cache = caching.load_cache(config.CORE_CACHE_FILE_PATH)
+    old_states = {key: cache.get(key) for key in POLLED_STATES}
+    game_servers_data = GameServers.parse(response)
 
     for key, value in game_servers_data.asdict().items():
         if key == 'datacenters':
@@ -99,17 +210,24 @@ async def update_cache_info():
             scheduler.add_job(alert_players_peak, id='players_peak', next_run_time=delay, coalesce=True)
         cache['player_alltime_peak'] = gc_cache['online_players']
 
-    df = pd.read_csv(config.PLAYER_CHART_FILE_PATH, parse_dates=['DateTime'])
-    cache['player_24h_peak'] = get_player_24h_peak(df)
+    cache['player_24h_peak'] = player_24h_peak
+
+    states_changed = any(cache.get(key) != old_state for key, old_state in old_states.items())
+    important = (states_changed or gc_state_changed
+                 or is_maintenance(gc_state, cache.get('sessions_logon_state')))
+    interval = polling_policy.observe(changed=True, important=important)
 
     caching.dump_cache(config.CORE_CACHE_FILE_PATH, cache)
+    game_servers_fingerprint = fingerprint
+    dump_status({'poll_interval': interval, 'webapi_breakers': steam_webapi.breaker_states()})
+    reschedule_update_cache_info(interval)
 
         
 @scheduler.scheduled_job('cron',
                          hour=execution_cron.hour, minute=execution_cron.minute, second=0)
 @exception_handler(message='Caught exception while gathering monthly players!', retry=True)
 async def unique_monthly():
-    new_player_count = steam_webapi.cs2_get_monthly_player_count()
+    new_player_count = await steam_webapi.cs2_get_monthly_player_count()
 
     cache = caching.load_cache(config.CORE_CACHE_FILE_PATH)
 
@@ -128,32 +246,57 @@ async def unique_monthly():
                          hour=execution_cron.hour, minute=execution_cron.minute, second=0)
 @exception_handler(message='Caught exception while gathering key price!', retry=True)
 async def check_currency():
-    new_prices = ExchangeRate.request(steam_webapi).asdict()
+    new_prices = (await ExchangeRate.arequest(steam_webapi)).asdict()
 
     caching.dump_cache_changes(config.CORE_CACHE_FILE_PATH, {'key_price': new_prices})
 
 
 @scheduler.scheduled_job('cron',
                          hour=execution_cron.hour, minute=execution_cron.minute, second=0)
-async def fetch_leaderboard():
-    # noinspection PyBroadException
-    try:
-        world_leaderboard_stats = LeaderboardStats.request_world(steam_webapi, season=CURRENT_PREMIER_SEASON)
-
-        new_data = {'world_leaderboard_stats': world_leaderboard_stats}
+async def fetch_leaderboard(keys: tuple[str, ...] = None, attempt: int = 1):
+    """
+    Fetches the world and the regional leaderboards concurrently and writes them with a single cache update.
+
+    Leaderboards that failed to fetch are retried later on their own, the rest is written right away.
+    """
+
+    fetchers = {'world_leaderboard_stats': partial(LeaderboardStats.arequest_world,
+                                                   steam_webapi, season=CURRENT_PREMIER_SEASON)}
+    for region in LEADERBOARD_API_REGIONS:
+        fetchers[f'regional_leaderboard_stats_{region}'] = partial(LeaderboardStats.arequest_regional,
+                                                                   steam_webapi, season=CURRENT_PREMIER_SEASON,
+                                                                   region=region)
+    if keys is not None:
+        fetchers = {key: fetcher for key, fetcher in fetchers.items() if key in keys}
+
+    semaphore = asyncio.Semaphore(LEADERBOARD_FETCH_CONCURRENCY)
+
+    async def fetch(fetcher):
+        async with semaphore:
+            return await asyncio.wait_for(fetcher(), LEADERBOARD_FETCH_TIMEOUT)
+
+    results = await asyncio.gather(*(fetch(fetcher) for fetcher in fetchers.values()), return_exceptions=True)
+
+    new_data = {}
+    failed = []
+    for key, result in zip(fetchers, results):
+        if isinstance(result, Exception):
+            logger.warning(f'Failed to fetch {key}: {result!r}')
+            failed.append(key)
+        else:
+            new_data[key] = result
+
+    if new_data:
+        caching.dump_cache_changes(config.LEADERBOARD_SEASON3_CACHE_FILE_PATH, new_data)
 
-        for region in LEADERBOARD_API_REGIONS:
-            regional_leaderboard_stats = LeaderboardStats.request_regional(steam_webapi,
-                                                                           season=CURRENT_PREMIER_SEASON, region=region)
-            new_data[f'regional_leaderboard_stats_{region}'] = regional_leaderboard_stats
+    if failed:
+        if attempt >= LEADERBOARD_FETCH_ATTEMPTS:  # leaderboards closed?
+            logger.error(f'Giving up fetching {", ".join(failed)} after {attempt} attempts.')
+            return
 
-        caching.dump_cache_changes(config.LEADERBOARD_SEASON3_CACHE_FILE_PATH, new_data)
-    except requests.exceptions.JSONDecodeError:  # leaderboards closed?
-        pass
-    except Exception:
-        logger.exception('Caught exception fetching leaderboards!')
-        await asyncio.sleep(45)
-        return await fetch_leaderboard()
+        retry_at = dt.datetime.now() + dt.timedelta(seconds=LEADERBOARD_RETRY_DELAY)
+        scheduler.add_job(fetch_leaderboard, id='fetch_leaderboard_retry', next_run_time=retry_at,
+                          args=(tuple(failed), attempt + 1), replace_existing=True)
 
 
 @exception_handler(message='Caught exception while gathering key price!', retry=True)
@@ -177,10 +320,7 @@ async def send_alert(key, new_value):
     else:
         chat_list = [config.INCS2CHAT, config.CSTRACKER]
 
-    for chat_id in chat_list:
-        msg = await bot.send_message(chat_id, text)
-        if chat_id == config.INCS2CHAT:
-            await msg.pin(disable_notification=True)
+    alert_dispatcher.send(text, chat_list, pin_in={config.INCS2CHAT})
 
 
 async def main():
@@ -193,8 +333,9 @@ async def main():
         logger.info('Shutting down the bot...')
     finally:
         scheduler.shutdown()
+        await alert_dispatcher.close()
         await bot.stop()
-        steam_webapi.close()
+        await steam_webapi.close()
         logger.info('Terminated.')
 
 
@@ -1,13 +1,77 @@
+from typing import NamedTuple
+
 from l10n import LocaleKeys as LK
-from utypes import Datacenter, DatacenterRegion, DatacenterVariation
+from utypes import Datacenter, DatacenterGroup, DatacenterRegion, DatacenterVariation
+from utypes.datacenters import UNKNOWN_DC_STATE
+
+__all__ = ["DatacenterAtlas", "RemapEntry"]
+
 
-__all__ = ["DatacenterAtlas"]
+class RemapEntry(NamedTuple):
+    api_id: str
+    path: tuple[str, ...]  # where the datacenter state goes in the cache, e.g. ('germany', 'frankfurt')
+    datacenter: Datacenter
+    parent: DatacenterVariation  # the atlas entry it belongs to
 
 
 class _DCAtlasMethods:
+    """
+    The atlas is compiled once when it's defined: the available datacenters are collected
+    and every API datacenter name gets mapped to its place in the cache, so remapping
+    the API response is a single pass over a flat table.
+    """
+
+    _available_dcs: tuple[DatacenterVariation, ...] = ()
+    _remap_table: dict[str, RemapEntry] = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+
+        cls._available_dcs = tuple(v for v in vars(cls).values() if isinstance(v, DatacenterVariation))
+        cls._remap_table = {}
+        for dc in cls._available_dcs:
+            for entry in cls._entries(dc, dc, ()):
+                if entry.api_id in cls._remap_table:
+                    raise ValueError(f'{entry.api_id!r} is associated with more than one datacenter')
+                cls._remap_table[entry.api_id] = entry
+
+    @classmethod
+    def _entries(cls, variation: DatacenterVariation, parent: DatacenterVariation, path: tuple[str, ...]):
+        path += (variation.id,)
+        if isinstance(variation, Datacenter):
+            yield RemapEntry(variation.associated_api_id, path, variation, parent)
+        elif isinstance(variation, DatacenterRegion):
+            for dc in variation.datacenters:
+                yield from cls._entries(dc, parent, path)
+        elif isinstance(variation, DatacenterGroup):
+            for region in variation.regions:
+                yield from cls._entries(region, parent, path)
+
     @classmethod
     def available_dcs(cls):
-        return (v for k, v in vars(cls).items() if isinstance(v, DatacenterVariation))
+        return iter(cls._available_dcs)
+
+    @classmethod
+    def remap(cls, info: dict[str, dict[str, str]]) -> dict[str, ...]:
+        """Turns the ``datacenters`` of the API response into the nested structure stored in the cache."""
+
+        result = {}
+        for api_id, entry in cls._remap_table.items():
+            target = result
+            for key in entry.path[:-1]:
+                target = target.setdefault(key, {})
+            target[entry.path[-1]] = info.get(api_id, UNKNOWN_DC_STATE)
+        return result
+
+    @classmethod
+    def by_api_id(cls, api_id: str) -> RemapEntry | None:
+        return cls._remap_table.get(api_id)
+
+    @classmethod
+    def unknown_api_datacenters(cls, info: dict[str, ...]) -> set[str]:
+        """Returns the API datacenters that aren't in the atlas (yet)."""
+
+        return info.keys() - cls._remap_table.keys()
 
 
 class DatacenterAtlas(_DCAtlasMethods):
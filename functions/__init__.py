@@ -1,2 +1,2 @@
-from . import caching, decorators, info_formatters, ulogging, utime
+from . import caching, decorators, info_formatters, rendering, ulogging, utime
 from .locale import locale
@@ -0,0 +1,180 @@
+"""
+Concurrent alert fan-out for the collectors.
+
+Every chat gets its own queue and worker, so a ``FloodWait`` or a slow pin in one chat doesn't hold back
+alerts to the others. Alerts to a chat are still sent in order: on ``FloodWait`` the worker of that chat
+retries the same alert once the wait is over, while the rest of the chats carry on. Other errors are retried
+a few times too, unless Telegram rejected the message itself.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from dataclasses import dataclass, field
+import logging
+import time
+from typing import Collection, Iterable
+
+# noinspection PyPackageRequirements
+from pyrogram import Client
+# noinspection PyPackageRequirements
+from pyrogram.errors import BadRequest, FloodWait, Forbidden
+# noinspection PyPackageRequirements
+from pyrogram.types import Message
+
+
+__all__ = ['AlertDispatcher']
+
+
+logger = logging.getLogger('INCS2bot.alerts')
+
+
+@dataclass(slots=True)
+class _Alert:
+    text: str
+    pin: bool
+    kwargs: dict[str, ...] = field(default_factory=dict)
+    attempts: int = 0
+
+
+class AlertDispatcher:
+    """
+    Sends alerts to several chats concurrently.
+
+    ``send()`` only puts the alert into the queues of the chats and returns right away. A text that's already
+    queued for a chat, or was delivered to it within ``dedupe_window`` seconds, isn't sent to that chat again;
+    if the delivery fails, the same text can be sent again right away. Call ``close()`` on shutdown
+    to deliver what's left.
+    """
+
+    DEFAULT_DEDUPE_WINDOW = 10 * 60
+    MAX_ATTEMPTS = 5  # per alert or pin, flood waits included
+    RETRY_DELAY = 5  # seconds, multiplied by the attempt number
+    CLOSE_TIMEOUT = 30
+
+    def __init__(self, bot: Client, *, dedupe_window: float = DEFAULT_DEDUPE_WINDOW):
+        self.bot = bot
+        self.dedupe_window = dedupe_window
+
+        self._queues: dict[int | str, asyncio.Queue[_Alert]] = {}
+        self._workers: dict[int | str, asyncio.Task] = {}
+        self._pins: set[asyncio.Task] = set()
+        self._queued: set[tuple[int | str, str]] = set()  # (chat id, text)
+        self._recent: deque[tuple[float, tuple[int | str, str]]] = deque()  # (sent at, (chat id, text)), oldest first
+        self._recent_sent: set[tuple[int | str, str]] = set()
+
+    def send(self, text: str, chat_ids: Iterable[int | str], *, pin_in: Collection[int | str] = (),
+             **kwargs) -> bool:
+        """
+        Queues ``text`` to be sent to every chat of ``chat_ids`` (and pinned in the ones of ``pin_in``),
+        ``kwargs`` are passed to ``Client.send_message()``. Returns ``False`` if it's a duplicate in every chat.
+        """
+
+        self._forget_old()
+
+        queued = False
+        for chat_id in chat_ids:
+            key = (chat_id, text)
+            if key in self._queued or key in self._recent_sent:
+                continue
+            self._queued.add(key)
+            self._queue(chat_id).put_nowait(_Alert(text, chat_id in pin_in, kwargs))
+            queued = True
+
+        if not queued:
+            logger.info(f'Skipping a duplicate alert: {text[:50]!r}')
+        return queued
+
+    def _forget_old(self):
+        recent = self._recent
+        expired = time.monotonic() - self.dedupe_window
+        while recent and recent[0][0] <= expired:
+            self._recent_sent.discard(recent.popleft()[1])
+
+    def _sent(self, chat_id: int | str, text: str):
+        key = (chat_id, text)
+        self._recent.append((time.monotonic(), key))
+        self._recent_sent.add(key)
+
+    def _queue(self, chat_id: int | str) -> asyncio.Queue[_Alert]:
+        queue = self._queues.get(chat_id)
+        if queue is None:
+            queue = self._queues[chat_id] = asyncio.Queue()
+            self._workers[chat_id] = asyncio.create_task(self._work(chat_id, queue), name=f'alerts-{chat_id}')
+        return queue
+
+    async def _work(self, chat_id: int | str, queue: asyncio.Queue[_Alert]):
+        while True:
+            alert = await queue.get()
+            try:
+                await self._deliver(chat_id, alert)
+            finally:
+                self._queued.discard((chat_id, alert.text))
+                queue.task_done()
+
+    async def _deliver(self, chat_id: int | str, alert: _Alert):
+        message = None
+        while message is None:
+            alert.attempts += 1
+            try:
+                message = await self.bot.send_message(chat_id, alert.text, **alert.kwargs)
+            except FloodWait as e:
+                if alert.attempts >= self.MAX_ATTEMPTS:
+                    logger.error(f'Gave up sending an alert to {chat_id} after {alert.attempts} attempts')
+                    return
+                logger.warning(f'Got a {e.value}s flood wait while sending an alert to {chat_id}, retrying after it')
+                await asyncio.sleep(e.value)  # only this chat waits
+            except (BadRequest, Forbidden):
+                logger.exception(f'Telegram rejected an alert to {chat_id}!')  # it won't get any better
+                return
+            # noinspection PyBroadException
+            except Exception:
+                if alert.attempts >= self.MAX_ATTEMPTS:
+                    logger.exception(f'Gave up sending an alert to {chat_id} after {alert.attempts} attempts!')
+                    return
+                logger.warning(f'Caught exception while sending an alert to {chat_id}, retrying', exc_info=True)
+                await asyncio.sleep(self.RETRY_DELAY * alert.attempts)
+
+        self._sent(chat_id, alert.text)
+        if alert.pin:
+            task = asyncio.create_task(self._pin(message))
+            self._pins.add(task)
+            task.add_done_callback(self._pins.discard)
+
+    async def _pin(self, message: Message):
+        for attempt in range(1, self.MAX_ATTEMPTS + 1):
+            try:
+                await message.pin(disable_notification=True)
+                return
+            except FloodWait as e:
+                if attempt == self.MAX_ATTEMPTS:
+                    break
+                await asyncio.sleep(e.value)
+            # noinspection PyBroadException
+            except Exception:
+                logger.exception(f'Caught exception while pinning an alert in {message.chat.id}!')
+                return
+        logger.error(f'Gave up pinning an alert in {message.chat.id} after {self.MAX_ATTEMPTS} flood waits')
+
+    async def join(self):
+        """Waits until every queued alert is sent and pinned."""
+
+        await asyncio.gather(*(queue.join() for queue in self._queues.values()))
+        if self._pins:
+            await asyncio.wait(self._pins)
+
+    async def close(self, timeout: float = CLOSE_TIMEOUT):
+        """Delivers the queued alerts (waiting up to ``timeout`` seconds) and stops the workers."""
+
+        try:
+            await asyncio.wait_for(self.join(), timeout)
+        except TimeoutError:
+            logger.warning(f'Some alerts weren\'t delivered in {timeout}s, dropping them')
+
+        tasks = [*self._workers.values(), *self._pins]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._queues.clear()
+        self._workers.clear()
@@ -0,0 +1,178 @@
+"""
+Diff engine for the depot branches of the CS2 app.
+
+Instead of keeping the whole ``depots/branches`` section of the product info in the GC cache, we keep a compact
+snapshot (branch name -> build id, update time and a hash of the raw branch data) in its own file.
+``BranchSnapshot.diff()`` compares fresh branches with it in a single pass and returns typed events,
+which can then be handled by any number of consumers.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from enum import StrEnum
+import hashlib
+import json
+import logging
+from pathlib import Path
+from typing import Collection
+
+from .cache_backends import dump_json_atomically
+
+
+__all__ = ['BranchEventType', 'BranchState', 'BranchEvent', 'BranchSnapshot', 'is_backup_branch']
+
+
+logger = logging.getLogger('INCS2bot.branches')
+
+
+def is_backup_branch(name: str) -> bool:
+    return name.startswith('1.4') or name.startswith('1.3')
+
+
+class BranchEventType(StrEnum):
+    CREATED = 'created'
+    UPDATED = 'updated'
+    DELETED = 'deleted'
+
+
+@dataclass(frozen=True, slots=True)
+class BranchState:
+    buildid: str
+    timeupdated: int | None
+    hash: str
+
+    @classmethod
+    def from_branch_data(cls, data: dict[str, ...]) -> BranchState:
+        timeupdated = data.get('timeupdated')
+        return cls(str(data['buildid']),
+                   int(timeupdated) if timeupdated is not None else None,
+                   _hash_branch_data(data))
+
+
+@dataclass(frozen=True, slots=True)
+class BranchEvent:
+    type: BranchEventType
+    branch: str
+    buildid: str | None = None  # None for deleted branches
+    old_buildid: str | None = None  # None for created branches
+
+    @property
+    def is_backup(self) -> bool:
+        return is_backup_branch(self.branch)
+
+
+def _hash_branch_data(data: dict[str, ...]) -> str:
+    dumped = json.dumps(data, sort_keys=True, separators=(',', ':')).encode()
+    return hashlib.blake2b(dumped, digest_size=8).hexdigest()
+
+
+class BranchSnapshot:
+    """
+    Last seen state of every branch, persisted to ``path`` whenever it changes.
+
+    Until the snapshot has been seeded (from a previous run, ``seed()`` or the first ``diff()``)
+    there's nothing to compare with, so no events are emitted.
+
+    Updates of the ``deferred`` branches are also kept as pending (and persisted along with the snapshot)
+    until they are ``resolve()``-d, so the ones that weren't handled before a restart can be picked up
+    with ``pending_events()``.
+    """
+
+    def __init__(self, path: Path, *, deferred: Collection[str] = ()):
+        self.path = Path(path)
+        self.deferred = frozenset(deferred)
+        self.branches: dict[str, BranchState] | None = None
+        self.pending: dict[str, BranchEvent] = {}  # branch -> its latest unresolved update
+
+        self._load()
+
+    @property
+    def seeded(self) -> bool:
+        return self.branches is not None
+
+    def seed(self, branches: dict[str, dict[str, ...]]):
+        """Replaces the snapshot with ``branches`` (raw product info data) without emitting any events."""
+
+        self.branches = {name: BranchState.from_branch_data(data) for name, data in branches.items()}
+        self._save()
+
+    def diff(self, branches: dict[str, dict[str, ...]]) -> list[BranchEvent]:
+        """
+        Compares ``branches`` (raw product info data) with the snapshot, updates it and returns what has changed.
+
+        A branch is considered updated when its build id has changed, other changes of its data
+        (like a new description) only update the snapshot.
+        """
+
+        if not self.seeded:
+            self.seed(branches)
+            return []
+
+        events = []
+        old_branches = self.branches
+        new_branches = {}
+        changed = False
+        kept = 0  # branches that were in the snapshot already
+        for name, data in branches.items():
+            state = new_branches[name] = BranchState.from_branch_data(data)
+            old_state = old_branches.get(name)
+
+            if old_state is None:
+                events.append(BranchEvent(BranchEventType.CREATED, name, buildid=state.buildid))
+                changed = True
+                continue
+
+            kept += 1
+            if old_state.hash != state.hash:
+                if old_state.buildid != state.buildid:
+                    event = BranchEvent(BranchEventType.UPDATED, name,
+                                        buildid=state.buildid, old_buildid=old_state.buildid)
+                    events.append(event)
+                    if name in self.deferred:
+                        self.pending[name] = event
+                changed = True
+
+        if kept < len(old_branches):
+            events.extend(BranchEvent(BranchEventType.DELETED, name, old_buildid=state.buildid)
+                          for name, state in old_branches.items() if name not in new_branches)
+            changed = True
+
+        self.branches = new_branches
+        if changed:
+            self._save()
+        return events
+
+    def pending_events(self) -> list[BranchEvent]:
+        """Returns the updates of the deferred branches that haven't been resolved yet."""
+
+        return list(self.pending.values())
+
+    def resolve(self, event: BranchEvent):
+        """Marks a pending update as handled. Does nothing if the branch has been updated again since then."""
+
+        if self.pending.get(event.branch) == event:
+            del self.pending[event.branch]
+            self._save()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+            self.branches = {name: BranchState(*state) for name, state in snapshot['branches'].items()}
+            self.pending = {name: BranchEvent(BranchEventType.UPDATED, name, *buildids)
+                            for name, buildids in snapshot['pending'].items()}
+        except FileNotFoundError:
+            pass
+        except (ValueError, TypeError, AttributeError, KeyError):
+            self.branches, self.pending = None, {}
+            logger.warning(f'Ignoring broken branches snapshot {self.path}')
+
+    def _save(self):
+        snapshot = {
+            'branches': {name: [state.buildid, state.timeupdated, state.hash]
+                         for name, state in self.branches.items()},
+            'pending': {name: [event.buildid, event.old_buildid] for name, event in self.pending.items()},
+        }
+
+        dump_json_atomically(self.path, snapshot, separators=(',', ':'))
@@ -0,0 +1,313 @@
+"""
+Storage backends behind ``functions.caching``.
+
+``JSONCacheBackend`` keeps every cache in its own JSON file (the default),
+``SQLiteCacheBackend`` keeps all of them in one SQLite database in WAL mode,
+one row per top-level key, so readers never block writers and partial updates only touch the changed rows.
+Caches are still addressed by their file paths, the SQLite backend uses file names as namespaces.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+from pathlib import Path
+import sqlite3
+import tempfile
+from typing import Collection, Hashable
+
+import filelock
+
+from utypes.sqlite_db import SQLiteDatabase
+
+
+__all__ = ['CacheBackend', 'CacheNotFoundError', 'CacheCorruptedError', 'JSONCacheBackend', 'SQLiteCacheBackend',
+           'GENERATION_KEY', 'dump_json_atomically']
+
+
+GENERATION_KEY = '__generation__'
+
+logger = logging.getLogger('INCS2bot.cache_backends')
+
+
+class CacheNotFoundError(FileNotFoundError):
+    """Raised when there's nothing stored for a cache yet."""
+
+
+class CacheCorruptedError(ValueError):
+    """Raised instead of updating a cache that can't be parsed, which would silently drop everything in it."""
+
+
+def _get_generation(cache: dict[str, ...]) -> int:
+    return cache.get(GENERATION_KEY, 0)
+
+
+def _current_umask() -> int:
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+_UMASK = _current_umask()  # read once at import, os.umask() can't be read without setting it
+
+
+def _fsync_dir(path: Path):
+    """Makes a rename in the directory durable. Not possible (nor needed) on Windows."""
+
+    if os.name == 'nt':
+        return
+
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def dump_json_atomically(path: Path, obj, **kwargs):
+    """
+    Writes ``obj`` to a temporary file and atomically replaces ``path`` with it, keeping the file mode.
+    Readers see either the old file or the new one, and the new one survives a power loss.
+    ``kwargs`` are passed to ``json.dump()``.
+    """
+
+    try:
+        mode = os.stat(path).st_mode & 0o777
+    except FileNotFoundError:
+        mode = 0o666 & ~_UMASK  # what open() would have created it with
+
+    with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=path.parent,
+                                     prefix=f'.{path.name}.', suffix='.tmp', delete=False) as f:
+        try:
+            os.chmod(f.name, mode)  # temporary files are only readable by the owner
+            json.dump(obj, f, **kwargs)
+            f.flush()
+            os.fsync(f.fileno())
+        except BaseException:
+            f.close()
+            os.unlink(f.name)
+            raise
+
+    os.replace(f.name, path)
+    _fsync_dir(path.parent)
+
+
+class CacheBackend:
+    FILE_BASED = False  # whether every cache is a separate file that can be watched
+
+    def load(self, path: Path) -> dict[str, ...]:
+        raise NotImplementedError
+
+    def load_with_fingerprint(self, path: Path) -> tuple[dict[str, ...], Hashable]:
+        """Loads the cache along with the fingerprint of the exact state that was loaded."""
+
+        raise NotImplementedError
+
+    def fingerprint(self, path: Path) -> Hashable:
+        """Returns a cheap value that changes every time the cache is written."""
+
+        raise NotImplementedError
+
+    def replace(self, path: Path, cache: dict[str, ...], *, timeout: int) -> dict[str, ...]:
+        """Replaces the whole cache, bumping its generation. Returns what was written."""
+
+        raise NotImplementedError
+
+    def update(self, path: Path, changes: dict[str, ...], *, removed: Collection[str] = (),
+               timeout: int) -> dict[str, ...]:
+        """
+        Updates the given keys and deletes the ``removed`` ones, bumping the generation.
+        Returns the whole resulting cache.
+        """
+
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class JSONCacheBackend(CacheBackend):
+    FILE_BASED = True
+
+    def __init__(self):
+        # fingerprint and generation of every file we've written last, see _next_generation()
+        self._generations: dict[Path, tuple[tuple[int, int, int], int]] = {}
+
+    @staticmethod
+    def get_filelock(path: Path, *, timeout: int = 10):
+        """Lock used to serialize the writers. Readers don't need it since the files are replaced atomically."""
+
+        return filelock.FileLock(path.with_suffix(path.suffix + '.lock'), timeout=timeout)
+
+    @staticmethod
+    def _stat_fingerprint(stat: os.stat_result) -> tuple[int, int, int]:
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def load(self, path: Path) -> dict[str, ...]:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def load_with_fingerprint(self, path: Path) -> tuple[dict[str, ...], tuple[int, int, int]]:
+        with open(path, 'r', encoding='utf-8') as f:
+            # fingerprint the file we've actually opened, it may be replaced in the meantime
+            fingerprint = self._stat_fingerprint(os.fstat(f.fileno()))
+            return json.load(f), fingerprint
+
+    def fingerprint(self, path: Path) -> tuple[int, int, int]:
+        """Returns ``(mtime_ns, size, inode)`` of a file, enough to tell if it was rewritten."""
+
+        return self._stat_fingerprint(os.stat(path))
+
+    def _load_or_empty(self, path: Path) -> dict[str, ...]:
+        try:
+            return self.load(path)
+        except FileNotFoundError:
+            return {}
+        except ValueError as e:
+            raise CacheCorruptedError(f'{path} is corrupted: {e}') from e
+
+    def _next_generation(self, path: Path) -> int:
+        """
+        Next generation of a cache that's about to be replaced. Taken from our own last write
+        if nobody has written the file since, so the whole file isn't parsed just for that.
+        """
+
+        try:
+            fingerprint = self.fingerprint(path)
+        except FileNotFoundError:
+            return self._generations.get(path, (None, 0))[1] + 1
+
+        known_fingerprint, generation = self._generations.get(path, (None, 0))
+        if fingerprint == known_fingerprint:
+            return generation + 1
+
+        try:
+            return _get_generation(self._load_or_empty(path)) + 1
+        except CacheCorruptedError:
+            # replacing it loses nothing, so let the cache recover
+            logger.warning(f'{path.name} is corrupted, overwriting it')
+            return generation + 1
+
+    def _publish(self, path: Path, cache: dict[str, ...]):
+        dump_json_atomically(path, cache, indent=4, ensure_ascii=False)
+        self._generations[path] = self.fingerprint(path), _get_generation(cache)
+
+    def replace(self, path: Path, cache: dict[str, ...], *, timeout: int) -> dict[str, ...]:
+        with self.get_filelock(path, timeout=timeout):
+            cache = cache | {GENERATION_KEY: self._next_generation(path)}
+            self._publish(path, cache)
+        return cache
+
+    def update(self, path: Path, changes: dict[str, ...], *, removed: Collection[str] = (),
+               timeout: int) -> dict[str, ...]:
+        with self.get_filelock(path, timeout=timeout):
+            cache = self._load_or_empty(path)
+            cache = cache | changes | {GENERATION_KEY: _get_generation(cache) + 1}
+            for key in removed:
+                cache.pop(key, None)
+            self._publish(path, cache)
+        return cache
+
+
+class SQLiteCacheBackend(CacheBackend):
+    SCHEMA = (
+        'CREATE TABLE IF NOT EXISTS cache_entries ('
+        'namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, PRIMARY KEY (namespace, key)'
+        ') WITHOUT ROWID',
+        'CREATE TABLE IF NOT EXISTS cache_generations ('
+        'namespace TEXT PRIMARY KEY, generation INTEGER NOT NULL'
+        ')',
+    )
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        self.db = SQLiteDatabase(db_path)
+
+        with self.db.transaction() as conn:
+            for statement in self.SCHEMA:
+                conn.execute(statement)
+
+    @staticmethod
+    def _namespace(path: Path) -> str:
+        return path.name
+
+    def _select(self, conn: sqlite3.Connection, namespace: str) -> dict[str, ...] | None:
+        row = conn.execute('SELECT generation FROM cache_generations WHERE namespace = ?', (namespace,)).fetchone()
+        if row is None:
+            return
+
+        cache = {key: json.loads(value) for key, value in
+                 conn.execute('SELECT key, value FROM cache_entries WHERE namespace = ?', (namespace,))}
+        cache[GENERATION_KEY] = row[0]
+        return cache
+
+    def load(self, path: Path) -> dict[str, ...]:
+        return self.load_with_fingerprint(path)[0]
+
+    def load_with_fingerprint(self, path: Path) -> tuple[dict[str, ...], int]:
+        conn = self.db.connection()
+        conn.execute('BEGIN')  # read both tables from the same snapshot
+        try:
+            cache = self._select(conn, self._namespace(path))
+        finally:
+            conn.execute('COMMIT')
+
+        if cache is None:
+            raise CacheNotFoundError(f'Nothing is stored for {path.name} in {self.db_path}')
+        return cache, cache[GENERATION_KEY]
+
+    def fingerprint(self, path: Path) -> int:
+        row = (self.db.connection()
+               .execute('SELECT generation FROM cache_generations WHERE namespace = ?', (self._namespace(path),))
+               .fetchone())
+        if row is None:
+            raise CacheNotFoundError(f'Nothing is stored for {path.name} in {self.db_path}')
+        return row[0]
+
+    @staticmethod
+    def _bump_generation(conn: sqlite3.Connection, namespace: str) -> int:
+        conn.execute('INSERT INTO cache_generations (namespace, generation) VALUES (?, 1) '
+                     'ON CONFLICT (namespace) DO UPDATE SET generation = generation + 1', (namespace,))
+        return conn.execute('SELECT generation FROM cache_generations WHERE namespace = ?',
+                            (namespace,)).fetchone()[0]
+
+    @staticmethod
+    def _upsert(conn: sqlite3.Connection, namespace: str, entries: dict[str, ...]):
+        conn.executemany('INSERT INTO cache_entries (namespace, key, value) VALUES (?, ?, ?) '
+                         'ON CONFLICT (namespace, key) DO UPDATE SET value = excluded.value',
+                         ((namespace, key, json.dumps(value, ensure_ascii=False))
+                          for key, value in entries.items() if key != GENERATION_KEY))
+
+    def replace(self, path: Path, cache: dict[str, ...], *, timeout: int) -> dict[str, ...]:
+        namespace = self._namespace(path)
+        with self.db.transaction(timeout=timeout) as conn:
+            conn.execute('DELETE FROM cache_entries WHERE namespace = ?', (namespace,))
+            self._upsert(conn, namespace, cache)
+            generation = self._bump_generation(conn, namespace)
+        return cache | {GENERATION_KEY: generation}
+
+    def update(self, path: Path, changes: dict[str, ...], *, removed: Collection[str] = (),
+               timeout: int) -> dict[str, ...]:
+        namespace = self._namespace(path)
+        with self.db.transaction(timeout=timeout) as conn:
+            self._upsert(conn, namespace, changes)
+            if removed:
+                conn.executemany('DELETE FROM cache_entries WHERE namespace = ? AND key = ?',
+                                 ((namespace, key) for key in removed))
+            self._bump_generation(conn, namespace)
+            return self._select(conn, namespace)
+
+    def restore(self, path: Path, cache: dict[str, ...], *, timeout: int = 30):
+        """Stores the cache as is, keeping its generation. Used to migrate caches from other backends."""
+
+        namespace = self._namespace(path)
+        with self.db.transaction(timeout=timeout) as conn:
+            conn.execute('DELETE FROM cache_entries WHERE namespace = ?', (namespace,))
+            self._upsert(conn, namespace, cache)
+            conn.execute('INSERT INTO cache_generations (namespace, generation) VALUES (?, ?) '
+                         'ON CONFLICT (namespace) DO UPDATE SET generation = excluded.generation',
+                         (namespace, _get_generation(cache)))
+
+    def close(self):
+        self.db.close()
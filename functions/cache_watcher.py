@@ -0,0 +1,198 @@
+"""
+Notifies about cache files being rewritten by the collectors.
+
+On Linux it uses inotify (through ``ctypes``, so no extra dependencies), watching the directories
+of the cache files, since ``functions.caching`` publishes them by renaming a temporary file.
+Everywhere else, as well as with backends that don't keep caches in separate files,
+it falls back to polling cache fingerprints.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import ctypes
+import ctypes.util
+import logging
+import os
+from pathlib import Path
+import struct
+from typing import Awaitable, Callable, Iterable, NamedTuple
+
+from . import caching
+
+
+__all__ = ['CacheChanged', 'CacheWatcher']
+
+
+logger = logging.getLogger('INCS2bot.cache_watcher')
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+_EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, len
+
+
+class CacheChanged(NamedTuple):
+    path: Path
+    generation: int
+
+
+CacheChangedCallback = Callable[[CacheChanged], Awaitable[None] | None]
+
+
+def _load_libc():
+    if not hasattr(os, 'O_NONBLOCK'):
+        return
+    libc_name = ctypes.util.find_library('c')
+    if libc_name is None:
+        return
+    libc = ctypes.CDLL(libc_name, use_errno=True)
+    if not hasattr(libc, 'inotify_init1'):
+        return
+    return libc
+
+
+class CacheWatcher:
+    """
+    Emits ``CacheChanged(path, generation)`` events on the asyncio loop whenever a cache file gets a new generation.
+
+    Every change also warms up the snapshot of the file (see ``caching.load_cache_snapshot()``),
+    so the callbacks and any handlers afterwards get the new data without touching the disk.
+    """
+
+    DEFAULT_POLL_INTERVAL = 1
+
+    def __init__(self, paths: Iterable[Path], *, poll_interval: float = DEFAULT_POLL_INTERVAL):
+        self.paths = {Path(path) for path in paths}
+        self.poll_interval = poll_interval
+
+        self._callbacks: list[CacheChangedCallback] = []
+        self._generations: dict[Path, int] = {}
+        self._inotify_fd: int | None = None
+        self._watched_dirs: dict[int, Path] = {}
+        self._poll_task: asyncio.Task | None = None
+        self._pending: set[Path] = set()
+        self._tasks: set[asyncio.Task] = set()
+
+    def on_change(self, callback: CacheChangedCallback):
+        """Registers a callback, can be used as a decorator. Coroutine functions are supported too."""
+
+        self._callbacks.append(callback)
+        return callback
+
+    @property
+    def uses_inotify(self) -> bool:
+        return self._inotify_fd is not None
+
+    async def start(self):
+        for path in self.paths:
+            await self._check(path, notify=False)
+
+        if caching.get_backend().FILE_BASED and self._start_inotify():
+            logger.info('Watching cache files with inotify.')
+        else:
+            logger.info('inotify is unavailable, polling caches instead.')
+            self._poll_task = asyncio.create_task(self._poll())
+
+    async def stop(self):
+        if self._inotify_fd is not None:
+            asyncio.get_running_loop().remove_reader(self._inotify_fd)
+            os.close(self._inotify_fd)
+            self._inotify_fd = None
+        if self._poll_task is not None:
+            self._poll_task.cancel()
+            self._poll_task = None
+        for task in self._tasks:
+            task.cancel()
+
+    def _start_inotify(self) -> bool:
+        libc = _load_libc()
+        if libc is None:
+            return False
+
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            logger.warning(f'inotify_init1() failed: {os.strerror(ctypes.get_errno())}')
+            return False
+
+        for directory in {path.parent for path in self.paths}:
+            wd = libc.inotify_add_watch(fd, os.fsencode(directory), IN_CLOSE_WRITE | IN_MOVED_TO)
+            if wd < 0:
+                logger.warning(f'inotify_add_watch() failed for {directory}: {os.strerror(ctypes.get_errno())}')
+                os.close(fd)
+                return False
+            self._watched_dirs[wd] = directory
+
+        self._inotify_fd = fd
+        asyncio.get_running_loop().add_reader(fd, self._read_inotify_events)
+        return True
+
+    def _read_inotify_events(self):
+        try:
+            buffer = os.read(self._inotify_fd, 64 * 1024)
+        except BlockingIOError:
+            return
+
+        offset = 0
+        while offset < len(buffer):
+            wd, mask, cookie, length = _EVENT_HEADER.unpack_from(buffer, offset)
+            offset += _EVENT_HEADER.size
+            name = buffer[offset:offset + length].rstrip(b'\0')
+            offset += length
+
+            directory = self._watched_dirs.get(wd)
+            if directory is None or not name:
+                continue
+            path = directory / os.fsdecode(name)
+            if path in self.paths and path not in self._pending:
+                self._pending.add(path)
+                self._spawn(self._check(path))
+
+    async def _poll(self):
+        fingerprints = {}
+        while True:
+            for path in self.paths:
+                try:
+                    fingerprint = caching.get_fingerprint(path)
+                except FileNotFoundError:
+                    continue
+                if fingerprints.get(path) != fingerprint:
+                    fingerprints[path] = fingerprint
+                    await self._check(path)
+            await asyncio.sleep(self.poll_interval)
+
+    async def _check(self, path: Path, *, notify: bool = True):
+        self._pending.discard(path)
+        try:
+            cache = await asyncio.to_thread(caching.load_cache_snapshot, path)
+        except (FileNotFoundError, ValueError):
+            return
+
+        generation = caching.get_generation(cache)
+        if self._generations.get(path) == generation:
+            return
+        self._generations[path] = generation
+
+        if notify:
+            self._emit(CacheChanged(path, generation))
+
+    def _emit(self, event: CacheChanged):
+        for callback in self._callbacks:
+            # noinspection PyBroadException
+            try:
+                result = callback(event)
+                if asyncio.iscoroutine(result):
+                    self._spawn(result)
+            except Exception:
+                logger.exception(f'Caught exception in cache watcher callback {callback!r}!')
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._done)
+
+    def _done(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error('Caught exception in cache watcher task!', exc_info=task.exception())
@@ -0,0 +1,225 @@
+"""
+Memory-mapped cache region shared between the bot and the collectors.
+
+The region is split into fixed-size named sections, each one guarded by a seqlock:
+a writer makes the sequence number odd, writes the payload and makes it even again,
+while readers retry if the sequence number was odd or has changed during the read.
+Every section is expected to have exactly one writer process.
+
+Payloads are encoded with ``marshal``: it's compact, way faster to decode than JSON
+and (unlike ``pickle``) can't execute anything while decoding.
+All the processes must run on the same Python version, which is the case for our deployment.
+"""
+
+from __future__ import annotations
+
+import logging
+import marshal
+import mmap
+import os
+from pathlib import Path
+import struct
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+__all__ = ['CacheBus', 'CacheBusError']
+
+
+logger = logging.getLogger('INCS2bot.cachebus')
+
+
+class CacheBusError(Exception):
+    pass
+
+
+class CacheBus:
+    MAGIC = b'INCSBUS1'
+    DEFAULT_SECTIONS = 8
+    DEFAULT_SECTION_CAPACITY = 256 * 1024
+    READ_RETRIES = 100
+    _TOMBSTONE = 0xFFFFFFFF  # payload length of an invalidated section
+
+    _HEADER = struct.Struct('<8sII')        # magic, sections count, section capacity
+    _SECTION_HEADER = struct.Struct('<64sQQI4x')  # name, seq, generation, payload length
+    _SEQ = struct.Struct('<Q')
+    _GENERATION_AND_LENGTH = struct.Struct('<QI')
+
+    def __init__(self, path: Path, *, sections: int = DEFAULT_SECTIONS,
+                 section_capacity: int = DEFAULT_SECTION_CAPACITY):
+        self.path = path
+        self.sections = sections
+        self.section_capacity = section_capacity
+        self._size = self._HEADER.size + sections * (self._SECTION_HEADER.size + section_capacity)
+
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT | getattr(os, 'O_BINARY', 0), 0o600)
+        try:
+            with self._flock():
+                self._init_region()
+            self._mm = mmap.mmap(self._fd, self._size)
+        except BaseException:
+            os.close(self._fd)
+            raise
+
+        self._write_lock = threading.Lock()
+        self._offsets: dict[str, int] = {}
+        self._decoded: dict[str, tuple[int, int, dict[str, ...]]] = {}  # name -> (seq, generation, data)
+
+    def _flock(self):
+        return _FileLock(self._fd)
+
+    def _init_region(self):
+        os.lseek(self._fd, 0, os.SEEK_SET)
+        header = os.read(self._fd, self._HEADER.size)
+        if len(header) == self._HEADER.size:
+            magic, sections, section_capacity = self._HEADER.unpack(header)
+            if magic == self.MAGIC:
+                if (sections, section_capacity) != (self.sections, self.section_capacity):
+                    raise CacheBusError(f'{self.path} was created with a different layout '
+                                        f'({sections} sections, {section_capacity} bytes each)')
+                return
+
+        os.ftruncate(self._fd, 0)
+        os.ftruncate(self._fd, self._size)
+        os.lseek(self._fd, 0, os.SEEK_SET)
+        os.write(self._fd, self._HEADER.pack(self.MAGIC, self.sections, self.section_capacity))
+
+    def _section_offset(self, index: int) -> int:
+        return self._HEADER.size + index * (self._SECTION_HEADER.size + self.section_capacity)
+
+    def _find_section(self, name: str) -> int | None:
+        offset = self._offsets.get(name)
+        if offset is not None:
+            return offset
+
+        encoded_name = name.encode()
+        for i in range(self.sections):
+            offset = self._section_offset(i)
+            section_name = self._SECTION_HEADER.unpack_from(self._mm, offset)[0].rstrip(b'\0')
+            if section_name == encoded_name:
+                self._offsets[name] = offset
+                return offset
+
+    def _claim_section(self, name: str) -> int:
+        encoded_name = name.encode()
+        if len(encoded_name) > 64:
+            raise CacheBusError(f'Section name is too long: {name!r}')
+
+        with self._flock():
+            offset = self._find_section(name)
+            if offset is not None:
+                return offset
+
+            for i in range(self.sections):
+                offset = self._section_offset(i)
+                if not self._SECTION_HEADER.unpack_from(self._mm, offset)[0].rstrip(b'\0'):
+                    self._SECTION_HEADER.pack_into(self._mm, offset, encoded_name, 0, 0, 0)
+                    self._offsets[name] = offset
+                    return offset
+
+        raise CacheBusError(f'No free sections left in {self.path}')
+
+    def publish(self, name: str, data: dict[str, ...], generation: int) -> bool:
+        """
+        Writes the data into the section, claiming it if necessary.
+
+        Returns ``False`` if the data can't be published (too big for a section or not marshallable),
+        the section is invalidated then, so readers fall back to the backend until the next successful publish.
+        """
+
+        try:
+            payload = marshal.dumps(data)
+        except ValueError:
+            logger.warning(f'Unable to encode {name!r} for the cache bus, invalidating it...')
+            self._write(name, generation, None)
+            return False
+
+        if len(payload) > self.section_capacity:
+            logger.warning(f'{name!r} is too big for the cache bus ({len(payload)} bytes), invalidating it...')
+            self._write(name, generation, None)
+            return False
+
+        self._write(name, generation, payload)
+        return True
+
+    def _write(self, name: str, generation: int, payload: bytes | None):
+        """Writes ``payload`` into the section, ``None`` writes a tombstone."""
+
+        with self._write_lock:
+            offset = self._find_section(name)
+            if offset is None:
+                offset = self._claim_section(name)
+
+            seq_offset = offset + 64
+            payload_offset = offset + self._SECTION_HEADER.size
+            seq = self._SEQ.unpack_from(self._mm, seq_offset)[0]
+
+            self._SEQ.pack_into(self._mm, seq_offset, seq + 1)  # odd: write in progress
+            if payload is None:
+                length = self._TOMBSTONE
+            else:
+                self._mm[payload_offset:payload_offset + len(payload)] = payload
+                length = len(payload)
+            self._GENERATION_AND_LENGTH.pack_into(self._mm, seq_offset + 8, generation, length)
+            self._SEQ.pack_into(self._mm, seq_offset, seq + 2)
+
+    def read(self, name: str) -> tuple[int, dict[str, ...]] | None:
+        """
+        Returns ``(generation, data)`` of the section or ``None`` if nothing was published there yet
+        or the last publish has failed.
+
+        Decoded data is kept until the section changes, so the returned dict **must not** be mutated.
+        """
+
+        offset = self._find_section(name)
+        if offset is None:
+            return
+
+        seq_offset = offset + 64
+        payload_offset = offset + self._SECTION_HEADER.size
+        decoded = self._decoded.get(name)
+
+        for _ in range(self.READ_RETRIES):
+            seq = self._SEQ.unpack_from(self._mm, seq_offset)[0]
+            if decoded is not None and decoded[0] == seq:
+                return None if decoded[2] is None else (decoded[1], decoded[2])
+            if seq == 0:
+                return
+            if seq & 1:
+                continue
+
+            generation, length = self._GENERATION_AND_LENGTH.unpack_from(self._mm, seq_offset + 8)
+            payload = self._mm[payload_offset:payload_offset + length] if length != self._TOMBSTONE else None
+            if self._SEQ.unpack_from(self._mm, seq_offset)[0] != seq:
+                continue
+
+            data = marshal.loads(payload) if payload is not None else None
+            self._decoded[name] = (seq, generation, data)
+            if data is None:
+                return
+            return generation, data
+
+        logger.warning(f'Failed to read {name!r} from the cache bus, the writer is too busy')
+
+    def close(self):
+        self._mm.close()
+        os.close(self._fd)
+
+
+class _FileLock:
+    """Cross-process lock used only while initializing the region and claiming sections."""
+
+    def __init__(self, fd: int):
+        self.fd = fd
+
+    def __enter__(self):
+        if fcntl is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_EX)
+
+    def __exit__(self, *_):
+        if fcntl is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
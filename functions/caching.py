@@ -1,26 +1,306 @@
-import json
+import asyncio
+import logging
 from pathlib import Path
+import threading
+import time
+from typing import Collection
 
-import filelock
+from .cache_backends import CacheBackend, JSONCacheBackend, SQLiteCacheBackend, GENERATION_KEY
+from .cachebus import CacheBus
 
-__all__ = ['load_cache', 'dump_cache', 'dump_cache_changes']
+__all__ = ['load_cache', 'load_cache_snapshot', 'dump_cache', 'dump_cache_changes',
+           'aload_cache', 'aload_cache_snapshot', 'adump_cache', 'adump_cache_changes',
+           'get_generation', 'get_fingerprint', 'invalidate_snapshots', 'enable_cache_bus', 'enable_write_through',
+           'setup_caching', 'set_backend', 'get_backend', 'CacheWriter', 'GENERATION_KEY']
 
 
-def get_filelock(path: Path, *, timeout: int = 10):
-    return filelock.FileLock(path.with_suffix(path.suffix + '.lock'), timeout=timeout)
+logger = logging.getLogger('INCS2bot.caching')
 
 
-def load_cache(path: Path, *, timeout: int = 10) -> dict[str, ...]:
-    with get_filelock(path, timeout=timeout):
-        with open(path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+class CacheSnapshot:
+    """Parsed cache kept in memory along with the fingerprint of the state it was read from."""
+
+    __slots__ = ('data', 'fingerprint', 'checked_at')
+
+    def __init__(self, data: dict[str, ...], fingerprint, checked_at: float):
+        self.data = data
+        self.fingerprint = fingerprint
+        self.checked_at = checked_at
+
+
+_snapshots: dict[Path, CacheSnapshot] = {}
+_bus: CacheBus | None = None
+_backend: CacheBackend = JSONCacheBackend()
+_write_through = False
+_write_lock = threading.Lock()  # so the snapshot kept by write-through matches the fingerprint
+
+
+def set_backend(backend: CacheBackend):
+    """Replaces the storage backend of the current process (JSON files by default)."""
+
+    global _backend
+
+    _backend.close()
+    _backend = backend
+    _snapshots.clear()
+
+
+def get_backend() -> CacheBackend:
+    return _backend
+
+
+def setup_caching(config):
+    """
+    Configures caching for the current process from the config.
+
+    ``CACHE_BACKEND`` is either ``'json'`` (default) or ``'sqlite'``, the latter stores
+    everything in ``CACHE_DB_FILE_PATH``. ``CACHE_BUS_FILE_PATH`` enables the cache bus.
+    """
+
+    backend = getattr(config, 'CACHE_BACKEND', 'json')
+    if backend == 'sqlite':
+        set_backend(SQLiteCacheBackend(config.CACHE_DB_FILE_PATH))
+    elif backend != 'json':
+        raise ValueError(f'Unknown cache backend: {backend!r}')
+
+    enable_cache_bus(getattr(config, 'CACHE_BUS_FILE_PATH', None))
+
+
+def enable_cache_bus(path: Path | None):
+    """
+    Enables the shared memory cache bus (see ``functions.cachebus``) for the current process.
+
+    Every cache written afterwards is also published on the bus, and ``load_cache_snapshot()``
+    reads from the bus first, falling back to the backend for sections nobody has published yet
+    and for the ones whose last publish has failed (e.g. the cache has outgrown its section).
+    Passing ``None`` does nothing, so it can be called with an optional config value.
+    """
+
+    global _bus
+
+    if path is None or _bus is not None:
+        return
+    _bus = CacheBus(path)
+
+
+def enable_write_through():
+    """
+    Keeps every cache written by the current process as its in-memory snapshot,
+    so ``load_cache_snapshot()`` in the same process doesn't have to read and parse what has just been written.
+
+    Only safe if the current process is the only writer of the caches it writes, which is the case
+    for the collectors run together by ``collector.py``.
+    """
+
+    global _write_through
+
+    _write_through = True
+
+
+def get_fingerprint(path: Path):
+    """Returns a cheap value that changes every time the cache is rewritten (see ``CacheBackend.fingerprint()``)."""
+
+    return _backend.fingerprint(path)
+
+
+def get_generation(cache: dict[str, ...]) -> int:
+    """Returns the generation number of a loaded cache (0 if it was never written by ``dump_cache()``)."""
+
+    return cache.get(GENERATION_KEY, 0)
+
+
+def load_cache(path: Path) -> dict[str, ...]:
+    return _backend.load(path)
+
+
+def load_cache_snapshot(path: Path, *, max_staleness: float = 0) -> dict[str, ...]:
+    """
+    Read-through version of ``load_cache()``.
+
+    Keeps the parsed cache in memory and only re-reads it if its fingerprint has changed.
+    If the snapshot was checked less than ``max_staleness`` seconds ago, it's returned without touching the disk at all.
+
+    The returned dict is shared between all the callers, so it **must not** be mutated.
+    """
+
+    data = _peek_snapshot(path, max_staleness)
+    if data is not None:
+        return data
+
+    snapshot = _snapshots.get(path)
+    now = time.monotonic()
+    if snapshot is not None:
+        if snapshot.fingerprint == get_fingerprint(path):
+            snapshot.checked_at = now
+            return snapshot.data
+
+    data, fingerprint = _backend.load_with_fingerprint(path)
+    _snapshots[path] = CacheSnapshot(data, fingerprint, now)
+    return data
+
+
+def _peek_snapshot(path: Path, max_staleness: float) -> dict[str, ...] | None:
+    """Returns the cache if it can be served from memory without any I/O."""
+
+    if _bus is not None and (published := _bus.read(path.name)) is not None:
+        return published[1]
+
+    snapshot = _snapshots.get(path)
+    if snapshot is not None and time.monotonic() - snapshot.checked_at < max_staleness:
+        return snapshot.data
+
+
+async def aload_cache(path: Path) -> dict[str, ...]:
+    return await asyncio.to_thread(load_cache, path)
+
+
+async def aload_cache_snapshot(path: Path, *, max_staleness: float = 0) -> dict[str, ...]:
+    """
+    Asyncio version of ``load_cache_snapshot()``.
+
+    Anything that can be served from memory (the cache bus or a fresh enough snapshot) is returned right away,
+    otherwise the check and the read are done in a worker thread, so a slow disk never blocks the event loop.
+    """
+
+    data = _peek_snapshot(path, max_staleness)
+    if data is not None:
+        return data
+    return await asyncio.to_thread(load_cache_snapshot, path, max_staleness=max_staleness)
+
+
+def invalidate_snapshots(path: Path = None):
+    """Drops the in-memory snapshot of a given cache file (or all of them), forcing the next read to hit the disk."""
+
+    if path is None:
+        _snapshots.clear()
+    else:
+        _snapshots.pop(path, None)
+
+
+def _load_or_empty(path: Path) -> dict[str, ...]:
+    try:
+        return _backend.load(path)
+    except FileNotFoundError:  # a corrupted cache is raised, not treated as an empty one
+        return {}
+
+
+def _published(path: Path, cache: dict[str, ...]):
+    if _write_through:
+        _snapshots[path] = CacheSnapshot(dict(cache), get_fingerprint(path), time.monotonic())
+    else:
+        _snapshots.pop(path, None)
+    if _bus is not None:
+        _bus.publish(path.name, cache, get_generation(cache))
 
 
 def dump_cache(path: Path, cache: dict[str, ...], *, timeout: int = 5):
-    with get_filelock(path, timeout=timeout):
-        with open(path, 'w', encoding='utf-8') as f:
-            json.dump(cache, f, indent=4, ensure_ascii=False)
+    with _write_lock:
+        _published(path, _backend.replace(path, cache, timeout=timeout))
+
+
+def dump_cache_changes(path: Path, changes: dict[str, ...], *, removed: Collection[str] = (), timeout: int = 10):
+    """Updates the given keys of the cache and deletes the ``removed`` ones."""
+
+    with _write_lock:
+        _published(path, _backend.update(path, changes, removed=removed, timeout=timeout))
+
+
+async def adump_cache(path: Path, cache: dict[str, ...], *, timeout: int = 5):
+    """Asyncio version of ``dump_cache()``, waits for the writers lock in a worker thread."""
+
+    await asyncio.to_thread(dump_cache, path, cache, timeout=timeout)
+
+
+async def adump_cache_changes(path: Path, changes: dict[str, ...], *, removed: Collection[str] = (),
+                              timeout: int = 10):
+    """Asyncio version of ``dump_cache_changes()``, waits for the writers lock in a worker thread."""
+
+    await asyncio.to_thread(dump_cache_changes, path, changes, removed=removed, timeout=timeout)
+
+
+_REMOVED = object()  # marks the keys removed from a CacheWriter
+
+
+class CacheWriter:
+    """
+    Write-behind buffer for a single cache file.
+
+    ``update()`` and ``remove()`` only remember the changes, while a background thread merges everything
+    that was buffered during ``interval`` seconds and writes it with a single ``dump_cache_changes()``.
+    Don't forget to ``close()`` it on shutdown to flush the remaining changes.
+    """
+
+    DEFAULT_INTERVAL = 1
+
+    def __init__(self, path: Path, *, interval: float = DEFAULT_INTERVAL, timeout: int = 10):
+        self.path = path
+        self.interval = interval
+        self.timeout = timeout
+
+        self._pending: dict[str, ...] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closing = threading.Event()  # interrupts the wait for more changes
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=f'CacheWriter({path.name})', daemon=True)
+        self._thread.start()
+
+    def update(self, changes: dict[str, ...]):
+        if self._closed:
+            raise RuntimeError(f'{self!r} is closed')
+
+        with self._lock:
+            self._pending.update(changes)
+        self._wakeup.set()
+
+    def remove(self, *keys: str):
+        """Deletes the keys from the cache, unlike ``update()`` with ``None`` values."""
+
+        self.update(dict.fromkeys(keys, _REMOVED))
+
+    def load(self) -> dict[str, ...]:
+        """Loads the cache with the changes that weren't written yet applied on top."""
+
+        cache = _load_or_empty(self.path)
+        with self._lock:
+            cache |= self._pending
+        return {key: value for key, value in cache.items() if value is not _REMOVED}
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                changes, self._pending = self._pending, {}
+            if not changes:
+                return
+
+            removed = [key for key, value in changes.items() if value is _REMOVED]
+            updated = {key: value for key, value in changes.items() if value is not _REMOVED}
+            try:
+                dump_cache_changes(self.path, updated, removed=removed, timeout=self.timeout)
+            except BaseException:
+                with self._lock:  # keep them for the next try, newer changes win
+                    self._pending = changes | self._pending
+                raise
+
+    def _run(self):
+        while not self._closed:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            self._closing.wait(self.interval)  # let more changes pile up
+
+            # noinspection PyBroadException
+            try:
+                self.flush()
+            except Exception:
+                logger.exception(f'Caught exception while writing {self.path.name}!')
 
+    def close(self):
+        self._closed = True
+        self._closing.set()
+        self._wakeup.set()
+        self._thread.join()
+        self.flush()
 
-def dump_cache_changes(path: Path, changes: dict[str, ...], *, timeout: int = 10):
-    dump_cache(path, load_cache(path, timeout=timeout) | changes, timeout=timeout)
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.path.name!r})'
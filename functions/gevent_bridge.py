@@ -0,0 +1,141 @@
+"""
+Bridge between asyncio and gevent code running in the same process.
+
+``steam`` and ``csgo`` clients are built on gevent: their calls block until the gevent hub gets the answer,
+and their greenlets (CM connection, heartbeats) only make progress while the hub runs.
+``GeventThread`` keeps a hub running in a dedicated thread, and ``await thread.run(func, ...)`` runs
+a blocking gevent call there, so the event loop stays free while Steam calls are in flight.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+import concurrent.futures
+import logging
+import threading
+from typing import Callable
+
+import gevent
+import gevent.event
+
+
+__all__ = ['GeventThread']
+
+
+logger = logging.getLogger('INCS2bot.gevent_bridge')
+
+
+class GeventThread:
+    """Gevent hub running in its own thread, accepting calls from other threads."""
+
+    def __init__(self, name: str = 'gevent'):
+        self.name = name
+        self._callbacks: deque[Callable[[], ...]] = deque()
+        self._started = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._wakeup = None  # async watcher of the hub, the only thing that's safe to touch from other threads
+        self._stop = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self._thread is not None:
+            raise RuntimeError(f'{self!r} is already started')
+
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+        self._started.wait()
+
+    def _run(self):
+        hub = gevent.get_hub()
+        self._stop = gevent.event.Event()
+        self._wakeup = hub.loop.async_()
+        self._wakeup.start(self._run_callbacks)
+        self._started.set()
+
+        try:
+            self._stop.wait()  # keeps the hub running
+        finally:
+            self._wakeup.stop()
+            self._wakeup.close()
+
+    def _run_callbacks(self):
+        while self._callbacks:
+            callback = self._callbacks.popleft()
+            # noinspection PyBroadException
+            try:
+                callback()
+            except Exception:
+                logger.exception(f'Caught exception in a callback of {self!r}!')
+
+    def call_soon_threadsafe(self, callback: Callable[[], ...]):
+        """Schedules ``callback`` to be called in the hub thread."""
+
+        if not self.running:
+            raise RuntimeError(f'{self!r} is not running')
+
+        self._callbacks.append(callback)
+        self._wakeup.send()
+
+    def submit(self, func: Callable[..., ...], *args, deadline: float = None,
+               **kwargs) -> tuple[concurrent.futures.Future, Callable[[], None]]:
+        """
+        Runs ``func(*args, **kwargs)`` in a new greenlet of the hub thread.
+
+        The greenlet gets killed if it doesn't finish in ``deadline`` seconds, the future gets ``TimeoutError`` then.
+        Returns the future and a function that kills the greenlet.
+        """
+
+        future = concurrent.futures.Future()
+        greenlet: gevent.Greenlet | None = None
+
+        def call():
+            try:
+                with gevent.Timeout(deadline, TimeoutError(f'{func.__name__} has missed its {deadline}s deadline')):
+                    result = func(*args, **kwargs)
+            except gevent.GreenletExit:
+                future.set_exception(concurrent.futures.CancelledError())
+            except BaseException as e:  # gevent.Timeout is a BaseException
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+        def spawn():
+            nonlocal greenlet
+            if future.set_running_or_notify_cancel():
+                greenlet = gevent.spawn(call)
+
+        def kill():
+            if greenlet is not None:
+                greenlet.kill(block=False)
+            else:
+                future.cancel()
+
+        self.call_soon_threadsafe(spawn)
+        return future, lambda: self.call_soon_threadsafe(kill)
+
+    async def run(self, func: Callable[..., ...], *args, deadline: float = None, **kwargs):
+        """Awaitable version of ``submit()``, cancelling the awaiting task kills the greenlet."""
+
+        future, kill = self.submit(func, *args, deadline=deadline, **kwargs)
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            if self.running:
+                kill()
+            raise
+
+    def stop(self, timeout: float = None):
+        """Stops the hub (the remaining greenlets are left as they are) and waits for the thread to finish."""
+
+        if not self.running:
+            return
+
+        self.call_soon_threadsafe(self._stop.set)
+        self._thread.join(timeout)
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.name!r})'
@@ -0,0 +1,85 @@
+"""
+PICS (Steam's Product Info Cache Server) change feed.
+
+Every product info change on Steam bumps a global change number, and a client can ask which apps have changed
+since a given one. That's much cheaper than downloading product info of the watched apps on every poll,
+so ``PICSChangeFeed`` only fetches product info of the apps that have actually changed.
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import Iterable, Protocol
+
+
+__all__ = ['PICSChangeFeed']
+
+
+logger = logging.getLogger('INCS2bot.pics')
+
+
+class PICSClient(Protocol):
+    """The part of ``steam.client.SteamClient`` the feed uses, so it can be replaced with a fake one in tests."""
+
+    def get_changes_since(self, change_number: int, app_changes: bool = True, package_changes: bool = False): ...
+
+    def get_product_info(self, apps: list[int] = (), timeout: float = 15) -> dict[str, ...] | None: ...
+
+
+class PICSChangeFeed:
+    """
+    Keeps the last seen PICS change number of the watched ``apps``.
+
+    ``poll()`` asks for the changes since that number and returns product info of the changed apps only
+    (all of them on the first poll, or when Steam says the client has to do a full update).
+    With ``use_changes=False`` it fetches product info of all the apps on every poll, like it used to be done.
+
+    ``poll()`` calls blocking gevent methods of the client, so it has to be run in the Steam thread.
+    """
+
+    def __init__(self, apps: Iterable[int], *, use_changes: bool = True):
+        self.apps = frozenset(apps)
+        self.use_changes = use_changes
+        self.change_number = 0  # 0 means that nothing has been fetched yet
+
+    def poll(self, client: PICSClient, timeout: float = 15) -> dict[int, dict[str, ...]]:
+        """
+        Returns product info of the apps that have changed since the last poll, keyed by app id.
+
+        Raises ``TimeoutError`` if Steam hasn't answered; the change number is only advanced
+        once product info has been fetched, so the changes get picked up on the next poll.
+        """
+
+        if not self.use_changes:
+            return self._fetch(client, self.apps, timeout)
+
+        changes = client.get_changes_since(self.change_number, app_changes=True, package_changes=False)
+        if changes is None:
+            raise TimeoutError('PICS changes request has timed out')
+
+        current_change_number = changes.current_change_number
+        if self.change_number and current_change_number == self.change_number:
+            return {}
+
+        if not self.change_number or changes.force_full_update or changes.force_full_app_update:
+            changed_apps = self.apps
+        else:
+            changed_apps = self.apps & {change.appid for change in changes.app_changes}
+
+        product_info = self._fetch(client, changed_apps, timeout) if changed_apps else {}
+        logger.debug(f'PICS change number {self.change_number} -> {current_change_number}, '
+                     f'changed apps: {sorted(product_info)}')
+        self.change_number = current_change_number
+        return product_info
+
+    def reset(self):
+        """Makes the next poll fetch product info of all the apps."""
+
+        self.change_number = 0
+
+    @staticmethod
+    def _fetch(client: PICSClient, apps: Iterable[int], timeout: float) -> dict[int, dict[str, ...]]:
+        product_info = client.get_product_info(apps=sorted(apps), timeout=timeout)
+        if product_info is None:
+            raise TimeoutError('Product info request has timed out')
+        return product_info['apps']
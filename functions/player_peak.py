@@ -0,0 +1,143 @@
+"""
+Rolling 24h players peak, maintained incrementally from the player chart CSV.
+
+The CSV is written by ``online_players_graph.py`` every 10 minutes and only grows at the end
+(old marks get dropped from the start), so we only parse the rows newer than the last one we've seen
+and feed them into a monotonic deque, which gives the window maximum in O(1) amortized time.
+The deque is checkpointed next to the CSV, so a restart doesn't have to parse the whole file again.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+import datetime as dt
+import json
+import logging
+import os
+from pathlib import Path
+
+from . import utime
+from .cache_backends import dump_json_atomically
+
+
+__all__ = ['RollingMax', 'PlayerPeakTracker']
+
+
+logger = logging.getLogger('INCS2bot.player_peak')
+
+DAY = 24 * 60 * 60
+CSV_DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+TAIL_CHUNK_SIZE = 4096
+
+
+class RollingMax:
+    """Maximum over a sliding time window, kept as a deque of ``(timestamp, value)`` with decreasing values."""
+
+    __slots__ = ('window', '_items')
+
+    def __init__(self, window: float, items: list[tuple[float, int]] = ()):
+        self.window = window
+        self._items: deque[tuple[float, int]] = deque(items)
+
+    def push(self, timestamp: float, value: int):
+        items = self._items
+        while items and items[-1][1] <= value:
+            items.pop()
+        items.append((timestamp, value))
+
+    def max(self, now: float) -> int:
+        """Returns the maximum of the values pushed during the last ``window`` seconds, 0 if there are none."""
+
+        items = self._items
+        while items and items[0][0] <= now - self.window:
+            items.popleft()
+        return items[0][1] if items else 0
+
+    def items(self) -> list[tuple[float, int]]:
+        return list(self._items)
+
+
+class PlayerPeakTracker:
+    """Keeps the 24h players peak up to date with the player chart CSV."""
+
+    def __init__(self, csv_path: Path, checkpoint_path: Path = None, *, window: float = DAY):
+        self.csv_path = Path(csv_path)
+        self.checkpoint_path = Path(checkpoint_path) if checkpoint_path else self.csv_path.with_suffix('.peak.json')
+        self.rolling_max = RollingMax(window)
+        self.last_timestamp: float | None = None
+        self._csv_fingerprint = None
+
+        self._load_checkpoint()
+
+    def peak(self) -> int:
+        """Feeds the new CSV rows (if there are any) and returns the current 24h peak."""
+
+        try:
+            self._feed()
+        except FileNotFoundError:
+            pass
+        return self.rolling_max.max(utime.utcnow().timestamp())
+
+    def _feed(self):
+        stat = os.stat(self.csv_path)
+        fingerprint = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        if fingerprint == self._csv_fingerprint:
+            return
+
+        rows = self._read_new_rows(stat.st_size)
+        for timestamp, players in rows:
+            self.rolling_max.push(timestamp, players)
+        if rows:
+            self.last_timestamp = rows[-1][0]
+            self._save_checkpoint()
+
+        self._csv_fingerprint = fingerprint
+
+    def _read_new_rows(self, size: int) -> list[tuple[float, int]]:
+        """Reads the file backwards by chunks until it meets a row we've already seen."""
+
+        with open(self.csv_path, 'rb') as f:
+            end = size
+            tail = b''
+            while True:
+                start = max(0, end - TAIL_CHUNK_SIZE)
+                f.seek(start)
+                tail = f.read(end - start) + tail
+                end = start
+
+                # the first line of the chunk may be cut, unless we've reached the start of the file
+                lines = tail.splitlines() if start == 0 else tail.splitlines()[1:]
+                rows = [row for line in lines if (row := self._parse_row(line)) is not None]
+                if start == 0 or (rows and self.last_timestamp is not None and rows[0][0] <= self.last_timestamp):
+                    break
+
+        if self.last_timestamp is None:
+            return rows
+        return [row for row in rows if row[0] > self.last_timestamp]
+
+    @staticmethod
+    def _parse_row(line: bytes) -> tuple[float, int] | None:
+        try:
+            date_time, players = line.decode().split(',')
+            timestamp = (dt.datetime.strptime(date_time, CSV_DATETIME_FORMAT)
+                         .replace(tzinfo=dt.UTC)
+                         .timestamp())
+            return timestamp, int(float(players))
+        except ValueError:  # header or a broken line
+            return
+
+    def _load_checkpoint(self):
+        try:
+            with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+                checkpoint = json.load(f)
+            self.rolling_max = RollingMax(self.rolling_max.window,
+                                          [(timestamp, value) for timestamp, value in checkpoint['items']])
+            self.last_timestamp = checkpoint['last_timestamp']
+        except FileNotFoundError:
+            pass
+        except (ValueError, KeyError, TypeError):
+            logger.warning(f'Ignoring broken checkpoint {self.checkpoint_path}')
+
+    def _save_checkpoint(self):
+        checkpoint = {'last_timestamp': self.last_timestamp, 'items': self.rolling_max.items()}
+        dump_json_atomically(self.checkpoint_path, checkpoint)
@@ -0,0 +1,75 @@
+"""Adaptive polling interval for the collectors."""
+
+from __future__ import annotations
+
+
+__all__ = ['AdaptivePollingPolicy']
+
+
+class AdaptivePollingPolicy:
+    """
+    Decides how long to wait before the next poll, based on what the last ones have brought.
+
+    * Something important happened (states changed, Steam maintenance, GC state change) — poll as fast as allowed
+      for the next ``hot_polls`` polls;
+    * Data changed — go back to the default interval;
+    * Nothing changed for ``stable_polls`` polls in a row or the API is erroring — back off
+      by ``backoff_factor`` up to ``max_interval``.
+    """
+
+    DEFAULT_BACKOFF_FACTOR = 1.5
+    DEFAULT_STABLE_POLLS = 3
+    DEFAULT_HOT_POLLS = 5
+
+    def __init__(self, default_interval: float, *, min_interval: float, max_interval: float,
+                 backoff_factor: float = DEFAULT_BACKOFF_FACTOR, stable_polls: int = DEFAULT_STABLE_POLLS,
+                 hot_polls: int = DEFAULT_HOT_POLLS):
+        if not min_interval <= default_interval <= max_interval:
+            raise ValueError(f'Default interval {default_interval} is out of bounds [{min_interval}, {max_interval}]')
+
+        self.default_interval = default_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff_factor = backoff_factor
+        self.stable_polls = stable_polls
+        self.hot_polls = hot_polls
+
+        self.interval = default_interval
+        self._unchanged_polls = 0
+        self._hot_polls_left = 0
+
+    def observe(self, *, changed: bool = False, important: bool = False, error: bool = False) -> float:
+        """Takes the outcome of the last poll into account and returns the interval before the next one."""
+
+        if important:
+            self._hot_polls_left = self.hot_polls
+            self._unchanged_polls = 0
+        elif error:
+            self._unchanged_polls = 0
+            self._backoff()
+        elif changed:
+            self._unchanged_polls = 0
+            if self._hot_polls_left == 0:
+                self.interval = self.default_interval
+        else:
+            self._unchanged_polls += 1
+            if self._hot_polls_left == 0:
+                if self._unchanged_polls >= self.stable_polls:
+                    self._backoff()
+                else:
+                    self.interval = max(self.interval, self.default_interval)
+
+        if self._hot_polls_left > 0 and not error:
+            self._hot_polls_left -= 1
+            self.interval = self.min_interval
+            if self._hot_polls_left == 0:
+                self._unchanged_polls = 0
+
+        return self.interval
+
+    def _backoff(self):
+        self.interval = min(self.max_interval, max(self.interval, self.default_interval) * self.backoff_factor)
+
+    def __repr__(self):
+        return (f'{self.__class__.__name__}(interval={self.interval}, '
+                f'bounds=[{self.min_interval}, {self.max_interval}])')
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import logging
+import threading
+from typing import Callable, Hashable, Iterable, TYPE_CHECKING
+
+from utypes import GameServers, GameVersion, States
+from . import info_formatters
+
+if TYPE_CHECKING:
+    from l10n import Locale
+    from utypes import CoreCache, DatacenterVariation, GCCache, GraphCache, State
+    from utypes.game_data import BasicServerStatusData
+
+
+__all__ = ['RenderStore', 'render_store',
+           'server_status', 'matchmaking_stats', 'datacenter_state', 'game_version', 'prerender_all']
+
+
+logger = logging.getLogger('INCS2bot.rendering')
+
+
+class RenderStore:
+    """
+    Keeps rendered response texts, keyed by ``(response kind, lang code, cache generation)``.
+
+    Responses like server status only change when the collectors write new data,
+    so they're rendered once per generation for each language and then just fetched.
+    Only the latest generation is kept for every kind.
+
+    Anything else a response depends on (like being in the maintenance window, which depends on the current time)
+    must be a part of its generation key, or the stored text goes stale.
+    """
+
+    def __init__(self):
+        self._store: dict[str, tuple[Hashable, dict[str, str]]] = {}
+        self._lock = threading.Lock()
+
+    def _texts(self, kind: str, generation: Hashable) -> dict[str, str]:
+        with self._lock:
+            stored = self._store.get(kind)
+            if stored is None or stored[0] != generation:
+                stored = self._store[kind] = (generation, {})
+            return stored[1]
+
+    def get(self, kind: str, locale: Locale, generation: Hashable, render: Callable[[], str]) -> str:
+        """Returns the stored text, calling ``render()`` if it wasn't rendered for this generation yet."""
+
+        texts = self._texts(kind, generation)
+        text = texts.get(locale.lang_code)
+        if text is None:
+            text = texts[locale.lang_code] = render()
+        return text
+
+    def clear(self):
+        with self._lock:
+            self._store.clear()
+
+
+render_store = RenderStore()
+
+
+def _is_maintenance(data: BasicServerStatusData | State) -> bool | None:
+    return None if data is States.UNKNOWN else data.is_maintenance()
+
+
+def server_status(core_cache: CoreCache, gc_cache: GCCache, locale: Locale) -> str:
+    data = GameServers.cached_server_status(core_cache, gc_cache)
+    generation = (core_cache.generation, gc_cache.generation, _is_maintenance(data))
+    return render_store.get('server_status', locale, generation,
+                            lambda: info_formatters.format_server_status(data, locale))
+
+
+def matchmaking_stats(core_cache: CoreCache, gc_cache: GCCache, graph_cache: GraphCache, locale: Locale) -> str:
+    data = GameServers.cached_matchmaking_stats(core_cache, gc_cache, graph_cache.link)
+    generation = (core_cache.generation, gc_cache.generation, graph_cache.generation, _is_maintenance(data))
+    return render_store.get('matchmaking_stats', locale, generation,
+                            lambda: info_formatters.format_matchmaking_stats(data, locale))
+
+
+def datacenter_state(core_cache: CoreCache, datacenter: DatacenterVariation, locale: Locale) -> str:
+    state = core_cache.datacenter_state(datacenter)
+    return render_store.get(f'datacenter_{datacenter.id}', locale, core_cache.generation,
+                            lambda: info_formatters.format_datacenter_state(state, locale,
+                                                                            core_cache.latest_info_update))
+
+
+def game_version(gc_cache: GCCache, locale: Locale) -> str:
+    data = GameVersion.cached_data(gc_cache)
+    return render_store.get('game_version', locale, gc_cache.generation,
+                            lambda: info_formatters.format_game_version_info(data, locale))
+
+
+def prerender_all(core_cache: CoreCache, gc_cache: GCCache, graph_cache: GraphCache,
+                  datacenters: Iterable[DatacenterVariation], locales: Iterable[Locale]):
+    """Renders every generation-bound response for all the given locales."""
+
+    datacenters = tuple(datacenters)
+
+    # noinspection PyBroadException
+    try:
+        for locale in locales:
+            game_version(gc_cache, locale)
+
+            if core_cache.latest_info_update is States.UNKNOWN:
+                continue
+
+            server_status(core_cache, gc_cache, locale)
+            matchmaking_stats(core_cache, gc_cache, graph_cache, locale)
+            for datacenter in datacenters:
+                datacenter_state(core_cache, datacenter, locale)
+    except Exception:
+        logger.exception('Caught exception while prerendering responses!')
@@ -10,6 +10,8 @@ from typing import override
 
 __all__ = ['setup_logging', 'get_logger']
 
+_applied_configs: set[Path] = set()
+
 class EnhancedRotatingFileHandler(TimedRotatingFileHandler):
     """
     Combining `TimedRotatingFileHandler` and `RotatingFileHandler` (adds `maxBytes` to `TimedRotatingFileHandler`).
@@ -110,9 +112,14 @@ class EnhancedRotatingFileHandler(TimedRotatingFileHandler):
 
 
 def setup_logging(config_file: str | Path = None):
-    """Applies all the settings from a logging config."""
+    """Applies all the settings from a logging config, once per process (collectors may share one)."""
 
     if config_file is not None:
+        config_file = Path(config_file).resolve()
+        if config_file in _applied_configs:
+            return
+        _applied_configs.add(config_file)
+
         with open(config_file, encoding='utf-8') as f:
             config = json.load(f)
         logging.config.dictConfig(config)
@@ -10,7 +10,6 @@ from apscheduler.schedulers.gevent import GeventScheduler
 from csgo.client import CSGOClient
 import gevent
 from pyrogram import Client
-import requests
 from steam.client import SteamClient
 from steam.enums import EResult
 
@@ -22,8 +21,12 @@ if platform.system() == 'Linux':
 
 import config
 from functions import caching, locale, utime
+from functions.alerts import AlertDispatcher
+from functions.branches import BranchEvent, BranchEventType, BranchSnapshot
+from functions.gevent_bridge import GeventThread
+from functions.pics import PICSChangeFeed
 from functions.ulogging import *
-from utypes import GameVersion, States, GameVersionData
+from utypes import GameVersionData, GameVersionFetcher, States
 
 VALVE_TIMEZONE = ZoneInfo('America/Los_Angeles')
 loc = locale('ru')
@@ -40,10 +43,27 @@ AVAILABLE_ALERTS = {'public_branch_updated': loc.notifs_build_public,
                     'misc_branch_updated': loc.notifs_misc_branch_updated,
                     'branch_deleted': loc.notifs_branch_deleted}
 MAIN_BRANCHES = {'public', '<null>'}  # <null> is for other important things
+CS2_APP_ID = 730
+CS2_CLIENT_APP_ID = 2275500
+CS2_SERVER_APP_ID = 2275530
+USE_PICS_CHANGES = getattr(config, 'GC_USE_PICS_CHANGES', True)
+# asking for PICS changes is cheap, so it can be done more often than fetching the whole product info
+DEPOTS_POLL_INTERVAL = getattr(config, 'GC_DEPOTS_POLL_INTERVAL', 15 if USE_PICS_CHANGES else 45)
+PRODUCT_INFO_TIMEOUT = 15
+PRODUCT_INFO_DEADLINE = 30  # for the whole call, in case Steam client's own timeout doesn't fire
+PRODUCT_INFO_TIMEOUTS_TO_RESTART = 5  # in a row, the client is probably stuck then
+STEAM_STOP_TIMEOUT = 10
+GAME_VERSION_RETRY_DELAY = 15  # doubled after every failed try
+GAME_VERSION_MAX_RETRY_DELAY = 5 * 60
+GAME_VERSION_DEADLINE = 30 * 60
+GAME_VERSION_IDLE_DELAY = 60 * 60  # once the deadline is reached
 
 setup_logging(config.LOGS_CONFIG_FILE_PATH)
 logger = get_logger(f'{config.NAME}.gc')
 
+caching.setup_caching(config)
+
+
 class PatchedSteamClient(SteamClient):
     """Fixes an infinite program blocking when unable to connect to CM."""
 
@@ -77,14 +97,22 @@ bot = Client(config.BOT_GC_MODULE_NAME,
 client = PatchedSteamClient()
 client.set_credential_location(config.STEAM_CREDS_PATH)
 cs = CSGOClient(client)
+alert_dispatcher = AlertDispatcher(bot)
+steam_thread = GeventThread('steam')  # Steam and CS clients only run there, see `functions.gevent_bridge`
 gevent_scheduler = GeventScheduler()
 async_scheduler = AsyncIOScheduler()
+gc_cache_writer = caching.CacheWriter(config.GC_CACHE_FILE_PATH)
+game_version_fetcher = GameVersionFetcher()
+branch_snapshot = BranchSnapshot(getattr(config, 'GC_BRANCHES_SNAPSHOT_FILE_PATH', None)
+                                 or config.GC_CACHE_FILE_PATH.with_suffix('.branches.json'),
+                                 deferred=('public',))  # resolved once the alert is sent, see update_public_branch
+pics_feed = PICSChangeFeed((CS2_APP_ID, CS2_CLIENT_APP_ID, CS2_SERVER_APP_ID), use_changes=USE_PICS_CHANGES)
 
-going_to_shutdown = False  # can be used in jobs to safely call sys.exit() afterwards
-
-
-def is_backup_branch(name: str) -> bool:
-    return name.startswith('1.4') or name.startswith('1.3')
+going_to_shutdown = False  # can be used in jobs and Steam event handlers to safely call sys.exit() afterwards
+owns_bot = True  # False if `bot` is shared with other collectors (see collector.py), so it's not ours to stop
+event_loop: asyncio.AbstractEventLoop | None = None
+product_info_timeouts = 0
+game_version_task: asyncio.Task | None = None  # pulls the game version data of the latest public build
 
 
 @client.on(SteamClient.EVENT_ERROR)
@@ -112,6 +140,8 @@ def handle_reconnect(delay):
 
 @client.on(SteamClient.EVENT_DISCONNECTED)
 def handle_disconnect():
+    global going_to_shutdown
+
     logger.warning('Disconnected.')
 
     logger.info('Reconnecting...')
@@ -119,18 +149,23 @@ def handle_disconnect():
 
     if not success:
         logger.warning('Failed to reconnect, shutting down the script.')
-        loop = asyncio.get_running_loop()
-        loop.create_task(terminate_all_connections())
-        sys.exit()
+        going_to_shutdown = True
+        return
 
     logger.info('Reconnected successfully.')
 
 
 @client.on(SteamClient.EVENT_LOGGED_ON)
-def handle_after_logon():
+def handle_after_logon():  # called in the Steam thread, on relogins too
     cs.launch()
-    async_scheduler.start()
-    gevent_scheduler.start()
+    event_loop.call_soon_threadsafe(start_async_scheduler)
+    if not gevent_scheduler.running:
+        gevent_scheduler.start()
+
+
+def start_async_scheduler():
+    if not async_scheduler.running:
+        async_scheduler.start()
 
 
 @cs.on(CSGOClient.EVENT_READY)
@@ -144,134 +179,150 @@ def update_gc_status(status):
                 3: States.RELOADING, 4: States.INTERNAL_STEAM_ERROR}
     game_coordinator_state = statuses.get(status, States.UNKNOWN).literal
 
-    caching.dump_cache_changes(config.GC_CACHE_FILE_PATH, {'game_coordinator_state': game_coordinator_state})
+    gc_cache_writer.update({'game_coordinator_state': game_coordinator_state})
 
-    logger.info(f'Successfully dumped game coordinator status: {game_coordinator_state}')
+    logger.info(f'Successfully updated game coordinator status: {game_coordinator_state}')
 
 
-@async_scheduler.scheduled_job('interval', seconds=45)
+@async_scheduler.scheduled_job('interval', seconds=DEPOTS_POLL_INTERVAL)
 async def update_depots():
-    global going_to_shutdown
+    global going_to_shutdown, product_info_timeouts
 
     # noinspection PyBroadException
     try:
-        data = client.get_product_info(apps=[730, 2275500, 2275530], timeout=15)['apps']
-
-        current_branches = data[730]['depots']['branches']
-        cs2_app_change_number = data[2275500]['_change_number']
-        cs2_server_change_number = data[2275530]['_change_number']
+        data = await steam_thread.run(pics_feed.poll, client, timeout=PRODUCT_INFO_TIMEOUT,
+                                      deadline=PRODUCT_INFO_DEADLINE)
+    except (gevent.Timeout, TimeoutError):
+        product_info_timeouts += 1
+        if product_info_timeouts >= PRODUCT_INFO_TIMEOUTS_TO_RESTART:
+            going_to_shutdown = True
+            logger.error(f'Fetching depots has timed out {product_info_timeouts} times in a row, '
+                         f'we\'re going to shutdown...')
+        else:
+            logger.warning('Fetching depots has timed out, skipping...')
+        return
     except Exception:
         logger.exception('Caught an exception while trying to fetch depots!')
         return
-    except gevent.Timeout:  # still no idea how to solve it so just crash and restart the entire thing
-        going_to_shutdown = True
-        logger.exception('Caught gevent.Timeout, we\'re going to shutdown...')
+    product_info_timeouts = 0
+
+    new_data = {}  # only the apps that have changed are there
+    # noinspection PyBroadException
+    try:
+        if CS2_CLIENT_APP_ID in data:
+            new_data['cs2_app_changenumber'] = data[CS2_CLIENT_APP_ID]['_change_number']
+        if CS2_SERVER_APP_ID in data:
+            new_data['cs2_server_changenumber'] = data[CS2_SERVER_APP_ID]['_change_number']
+        branches = data[CS2_APP_ID]['depots']['branches'] if CS2_APP_ID in data else None
+    except Exception:
+        logger.exception('Caught an exception while trying to parse depots!')
+        pics_feed.reset()  # so these changes aren't skipped
         return
 
-    cache = caching.load_cache(config.GC_CACHE_FILE_PATH)
+    if not new_data and branches is None:
+        logger.debug('No PICS changes of the watched apps.')
+        return
+
+    cache = gc_cache_writer.load()
 
-    new_data = {
-        'cs2_app_changenumber': cs2_app_change_number,
-        'cs2_server_changenumber': cs2_server_change_number,
-        'branches': current_branches
-    }
+    if branches is not None:
+        if 'branches' in cache:  # they used to be kept in the GC cache
+            if not branch_snapshot.seeded and cache['branches']:
+                branch_snapshot.seed(cache['branches'])
+            gc_cache_writer.remove('branches')
+        for event in branch_snapshot.diff(branches):
+            await handle_branch_event(cache, event)
 
     for key, new_value in new_data.items():
         old_value = cache.get(key)
         if old_value is None or old_value == new_value:
             continue
 
-        if key == 'branches':
-            await check_for_new_branches(cache, old_value, new_value)
-            await check_for_removed_branches(old_value, new_value)
-            # mutates `cache` var in case of "public" branch update
-            await check_for_branches_updates(cache, old_value, new_value)
-        else:
-            # I am an idiot but oh well
-            await send_branch_alert('<null>', key, new_value)
-
-    cache.update(new_data)
+        # I am an idiot but oh well
+        await send_branch_alert('<null>', key, new_value)
 
-    caching.dump_cache(config.GC_CACHE_FILE_PATH, cache)
+    gc_cache_writer.update(new_data)
 
-    logger.info('Successfully dumped game version data.')
+    logger.info('Successfully updated game version data.')
 
 
-async def check_for_new_branches(cache: dict, cached_branches: dict, current_branches: dict):
+async def handle_branch_event(cache: dict, event: BranchEvent):
     cs2_patch_version = cache.get('cs2_patch_version')
 
-    new_branches = current_branches.keys() - cached_branches.keys()
-    if not new_branches:
+    if event.type == BranchEventType.CREATED:
+        if event.is_backup:
+            alert = 'backup_branch_created_sync' if event.branch == cs2_patch_version else 'backup_branch_created'
+        else:
+            alert = 'misc_branch_created'
+    elif event.type == BranchEventType.DELETED:
+        alert = 'backup_branch_deleted' if event.is_backup else 'branch_deleted'
+    elif event.branch == 'public':
+        start_public_branch_update(cache.get('cs2_client_version'), event)
         return
+    elif event.is_backup:
+        alert = 'backup_branch_updated_sync' if event.branch == cs2_patch_version else 'backup_branch_updated'
+    else:
+        alert = 'misc_branch_updated'
+    await send_branch_alert(event.branch, alert, event.buildid)
 
-    for branch_name in new_branches:
-        branch_data = current_branches[branch_name]
 
-        if is_backup_branch(branch_name):
-            event = 'backup_branch_created_sync' if branch_name == cs2_patch_version else 'backup_branch_created'
-        else:
-            event = 'misc_branch_created'
-        await send_branch_alert(branch_name, event, branch_data['buildid'])
+def start_public_branch_update(cs2_client_version: int | None, event: BranchEvent):
+    """
+    Pulls the game version data of the new public build in the background, then sends the alert.
 
+    The update stays pending in the branch snapshot until the alert is sent,
+    so it's resumed by ``resume_public_branch_update()`` if we get restarted in the meantime.
+    """
 
-async def check_for_removed_branches(cached_branches: dict, current_branches: dict):
-    removed_branches = cached_branches.keys() - current_branches.keys()
-    if not removed_branches:
-        return
-
-    for branch_name in removed_branches:
-        if is_backup_branch(branch_name):
-            event = 'backup_branch_deleted'
-        else:
-            event = 'branch_deleted'
-        await send_branch_alert(branch_name, event)
+    global game_version_task
 
+    if game_version_task is not None and not game_version_task.done():
+        logger.info('Got a newer public build, cancelling the game version update of the previous one...')
+        game_version_task.cancel()
+    game_version_task = asyncio.create_task(update_public_branch(cs2_client_version, event))
 
-async def check_for_branches_updates(cache: dict, cached_branches: dict, current_branches: dict):
-    cs2_patch_version = cache.get('cs2_patch_version')
 
-    for branch_name, branch_data in current_branches.items():
-        cached_branch_data = cached_branches.get(branch_name)
+def resume_public_branch_update():
+    for event in branch_snapshot.pending_events():  # only the public branch is deferred
+        logger.info(f'Resuming the update of the public branch to {event.buildid}...')
+        start_public_branch_update(gc_cache_writer.load().get('cs2_client_version'), event)
 
-        if cached_branch_data is None:  # newly created, ignore
-            continue
-        old_buildid = cached_branch_data['buildid']
-        new_buildid = branch_data['buildid']
-        if old_buildid == new_buildid:
-            continue
 
-        if branch_name == 'public':
-            game_version_data = await get_game_version_loop(cache.get('cs2_client_version'))
-            cache.update(game_version_data.asdict())
-            event = 'public_branch_updated'
-        elif is_backup_branch(branch_name):
-            event = 'backup_branch_updated_sync' if branch_name == cs2_patch_version else 'backup_branch_updated'
-        else:
-            event = 'misc_branch_updated'
-        await send_branch_alert(branch_name, event, new_buildid)
+async def update_public_branch(cs2_client_version: int | None, event: BranchEvent):
+    # noinspection PyBroadException
+    try:
+        game_version_data = await get_game_version_loop(cs2_client_version)
+        gc_cache_writer.update(game_version_data.asdict())
+        await send_branch_alert('public', 'public_branch_updated', event.buildid)
+        branch_snapshot.resolve(event)
+    except Exception:
+        logger.exception('Caught an exception while updating the public branch!')
 
 
 async def get_game_version_loop(cs2_client_version: int | None) -> GameVersionData:
-    timeout = 30 * 60
-    timeout_start = time.time()
-    with requests.Session() as session:
-        while time.time() < timeout_start + timeout:
-            data = await get_game_version(session, cs2_client_version)
+    while True:
+        deadline = time.monotonic() + GAME_VERSION_DEADLINE
+        delay = GAME_VERSION_RETRY_DELAY
+        while True:
+            data = await get_game_version(cs2_client_version)
             if data:
                 return data
-            logger.warning('Failed to pull the game version data, retry in 45 seconds...')
-            await asyncio.sleep(45)
-    # xPaw: Zzz...
-    # because of this, we retry in an hour
-    logger.warning('Reached a timeout while trying to pull the game version data, retry in an hour...')
-    await asyncio.sleep(60 * 60)
-    return await get_game_version_loop(cs2_client_version)
+            if time.monotonic() + delay > deadline:
+                break
+            logger.warning(f'Failed to pull the game version data, retry in {delay} seconds...')
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, GAME_VERSION_MAX_RETRY_DELAY)
 
+        # xPaw: Zzz...
+        # because of this, we retry in an hour
+        logger.warning('Reached a timeout while trying to pull the game version data, retry in an hour...')
+        await asyncio.sleep(GAME_VERSION_IDLE_DELAY)
 
-async def get_game_version(session: requests.Session, cs2_client_version: int | None) -> GameVersionData | None:
+
+async def get_game_version(cs2_client_version: int | None) -> GameVersionData | None:
     # noinspection PyBroadException
     try:
-        data = GameVersion.request(session)
+        data = await game_version_fetcher.fetch()
 
         if cs2_client_version is None:  # *somehow* don't have anything cached
             logger.info('Successfully pulled the game version data.')
@@ -293,9 +344,9 @@ async def get_game_version(session: requests.Session, cs2_client_version: int |
 def online_players():
     player_count = client.get_player_count(730)
 
-    caching.dump_cache_changes(config.GC_CACHE_FILE_PATH, {'online_players': player_count})
+    gc_cache_writer.update({'online_players': player_count})
 
-    logger.info(f'Successfully dumped player count: {player_count}')
+    logger.info(f'Successfully updated player count: {player_count}')
 
 
 async def send_branch_alert(branch: str, event: str, new_buildid: str = None):
@@ -321,10 +372,7 @@ async def send_text_alert(text: str):
     else:
         chat_list = [config.INCS2CHAT, config.CSTRACKER]
 
-    for chat_id in chat_list:
-        msg = await bot.send_message(chat_id, text, disable_web_page_preview=True)
-        if chat_id == config.INCS2CHAT:
-            await msg.pin(disable_notification=True)
+    alert_dispatcher.send(text, chat_list, pin_in={config.INCS2CHAT}, disable_web_page_preview=True)
 
 
 async def mainloop():
@@ -355,33 +403,85 @@ async def mainloop():
             break
 
 
-async def terminate_all_connections():
+def stop_steam_clients():  # called in the Steam thread
     cs.exit()
     if client.connected:
         logger.info('Logout...')
         client.logout()
-    await bot.stop()
-    async_scheduler.shutdown()
-    gevent_scheduler.shutdown()
+    if gevent_scheduler.running:
+        gevent_scheduler.shutdown()
+
+
+async def terminate_all_connections():
+    if steam_thread.running:
+        # noinspection PyBroadException
+        try:
+            await steam_thread.run(stop_steam_clients, deadline=STEAM_STOP_TIMEOUT)
+        except (Exception, gevent.Timeout):
+            logger.exception('Caught an exception while stopping Steam clients!')
+        await asyncio.to_thread(steam_thread.stop, STEAM_STOP_TIMEOUT)
+    if game_version_task is not None:
+        game_version_task.cancel()
+    await alert_dispatcher.close()
+    if owns_bot:
+        await bot.stop()
+    if async_scheduler.running:
+        async_scheduler.shutdown()
+    await game_version_fetcher.close()
+    gc_cache_writer.close()
     logger.info('Terminated.')
 
 
+async def login() -> bool:
+    global event_loop
+
+    event_loop = asyncio.get_running_loop()
+    steam_thread.start()
+
+    logger.info('Logging in...')
+    result = await steam_thread.run(client.login, username=config.STEAM_USERNAME, password=config.STEAM_PASS)
+
+    if result != EResult.OK:
+        logger.error(f"Failed to login: {result!r}")
+        return False
+
+    logger.info('Logged in successfully.')
+    resume_public_branch_update()
+    return True
+
+
 async def main():
     logger.info('Started.')
     try:
-        logger.info('Logging in...')
-        result = client.login(username=config.STEAM_USERNAME, password=config.STEAM_PASS)
-
-        if result != EResult.OK:
-            logger.error(f"Failed to login: {result!r}")
+        if not await login():
             sys.exit(1)
-
-        logger.info('Logged in successfully.')
         await bot.start()
         await mainloop()
     except KeyboardInterrupt:
         await terminate_all_connections()
         raise
+    finally:
+        gc_cache_writer.close()  # flushes the buffered changes, the writer thread is a daemon
+
+
+async def run_embedded(shared_bot: Client):
+    """
+    Runs the game coordinator along with other collectors (see ``collector.py``) until it has to shut down
+    or the task gets cancelled. Alerts are sent with ``shared_bot``, which is started and stopped by the caller.
+    """
+
+    global bot, owns_bot
+
+    bot, owns_bot = shared_bot, False
+    alert_dispatcher.bot = shared_bot
+    logger.info('Started.')
+    try:
+        if not await login():
+            return
+        while not going_to_shutdown:
+            await asyncio.sleep(1)
+    finally:
+        await terminate_all_connections()
 
 
 if __name__ == '__main__':
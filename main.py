@@ -23,17 +23,19 @@ from bottypes.logger import ReplyBackBotLogger
 import config
 from dcatlas import DatacenterAtlas
 from db import db_session
-from functions import caching, info_formatters, utime
+from functions import caching, info_formatters, rendering, utime
+from functions.cache_watcher import CacheChanged, CacheWatcher
 from functions.decorators import ignore_message_not_modified
 from functions.locale import get_available_languages
 from functions.ulogging import *
 import keyboards
 # noinspection PyPep8Naming
 from l10n import LocaleKeys as LK, locale as lc
-from utypes import (DatacenterVariation, ExchangeRate,
-                    GameServers, GameVersion, LeaderboardStats,
+from utypes import (CoreCache, GCCache, GraphCache, LeaderboardCache,
+                    DatacenterVariation, ExchangeRate,
+                    GameServers, LeaderboardStats,
                     ProfileInfo,
-                    States, UserGameStats, drop_cap_reset_timer, LeaderboardCache)
+                    States, UserGameStats, drop_cap_reset_timer)
 from utypes.gun_info import load_gun_infos
 from utypes.profiles import ErrorCode, FACEITRequestsHandler, ParseUserStatsError  # to clearly indicate relation
 
@@ -61,6 +63,8 @@ VALVE_TIMEZONE = ZoneInfo('America/Los_Angeles')
 setup_logging(config.LOGS_CONFIG_FILE_PATH)
 logger = get_logger(config.NAME)
 
+caching.setup_caching(config)
+
 bot = BotClient(config.BOT_NAME,
                 api_id=config.API_ID,
                 api_hash=config.API_HASH,
@@ -72,6 +76,10 @@ bot = BotClient(config.BOT_NAME,
                 navigate_back_callback=LK.bot_back,)
 
 telegraph = Telegraph(access_token=config.TELEGRAPH_ACCESS_TOKEN)
+cache_watcher = CacheWatcher((config.CORE_CACHE_FILE_PATH,
+                              config.GC_CACHE_FILE_PATH,
+                              config.GRAPH_CACHE_FILE_PATH,
+                              config.LEADERBOARD_SEASON3_CACHE_FILE_PATH))
 
 
 # cat: Utilities
@@ -143,15 +151,15 @@ async def server_stats(_, session: UserSession, bot_message: Message):
 async def send_server_status(client: BotClient, session: UserSession, bot_message: Message):
     """Send the status of Counter-Strike servers"""
 
-    core_cache = caching.load_cache(config.CORE_CACHE_FILE_PATH)
-    gc_cache = caching.load_cache(config.GC_CACHE_FILE_PATH)
+    core_cache = CoreCache.from_dict(await caching.aload_cache_snapshot(config.CORE_CACHE_FILE_PATH))
+    gc_cache = GCCache.from_dict(await caching.aload_cache_snapshot(config.GC_CACHE_FILE_PATH))
 
     data = GameServers.cached_server_status(core_cache, gc_cache)
 
     if data is States.UNKNOWN:
         return await something_went_wrong(client, session, bot_message)
 
-    text = info_formatters.format_server_status(data, session.locale)
+    text = rendering.server_status(core_cache, gc_cache, session.locale)
 
     await bot_message.edit(text, reply_markup=keyboards.ss_markup(session.locale))
 
@@ -160,16 +168,16 @@ async def send_server_status(client: BotClient, session: UserSession, bot_messag
 async def send_matchmaking_stats(client: BotClient, session: UserSession, bot_message: Message):
     """Send Counter-Strike matchamaking statistics"""
 
-    core_cache = caching.load_cache(config.CORE_CACHE_FILE_PATH)
-    gc_cache = caching.load_cache(config.GC_CACHE_FILE_PATH)
-    graph_cache = caching.load_cache(config.GRAPH_CACHE_FILE_PATH)
+    core_cache = CoreCache.from_dict(await caching.aload_cache_snapshot(config.CORE_CACHE_FILE_PATH))
+    gc_cache = GCCache.from_dict(await caching.aload_cache_snapshot(config.GC_CACHE_FILE_PATH))
+    graph_cache = GraphCache.from_dict(await caching.aload_cache_snapshot(config.GRAPH_CACHE_FILE_PATH))
 
-    data = GameServers.cached_matchmaking_stats(core_cache, gc_cache, graph_cache.get('link', ''))
+    data = GameServers.cached_matchmaking_stats(core_cache, gc_cache, graph_cache.link)
 
     if data is States.UNKNOWN:
         return await something_went_wrong(client, session, bot_message)
 
-    text = info_formatters.format_matchmaking_stats(data, session.locale)
+    text = rendering.matchmaking_stats(core_cache, gc_cache, graph_cache, session.locale)
 
     await bot_message.edit(text, reply_markup=keyboards.ss_markup(session.locale))
 
@@ -330,14 +338,12 @@ async def send_dc_south_korea(client: BotClient, session: UserSession, bot_messa
 async def send_dc_state(client: BotClient, session: UserSession, bot_message: Message,
                         datacenter: DatacenterVariation, reply_markup: ExtendedIKM):
     try:
-        cache = caching.load_cache(config.CORE_CACHE_FILE_PATH)
+        cache = CoreCache.from_dict(await caching.aload_cache_snapshot(config.CORE_CACHE_FILE_PATH))
 
-        game_servers_datetime = GameServers.latest_info_update(cache)
-        if game_servers_datetime is States.UNKNOWN:
+        if cache.latest_info_update is States.UNKNOWN:
             return await something_went_wrong(client, session, bot_message)
 
-        state = datacenter.cached_state(cache['datacenters'])
-        text = info_formatters.format_datacenter_state(state, session.locale, game_servers_datetime)
+        text = rendering.datacenter_state(cache, datacenter, session.locale)
 
         await bot_message.edit(text, reply_markup=reply_markup(session.locale))
     except MessageNotModified:
@@ -351,9 +357,9 @@ async def send_dc_state(client: BotClient, session: UserSession, bot_message: Me
 
 @bot.navmenu(LK.bot_profile_info, came_from=main_menu, ignore_message_not_modified=True)
 async def profile_info(client: BotClient, session: UserSession, bot_message: Message):
-    cache = caching.load_cache(config.CORE_CACHE_FILE_PATH)
+    cache = CoreCache.from_dict(await caching.aload_cache_snapshot(config.CORE_CACHE_FILE_PATH))
 
-    if States.get(cache.get('webapi_state')) != States.NORMAL:
+    if cache.webapi_state != States.NORMAL:
         return await send_about_maintenance(client, session, bot_message)
 
     await bot_message.edit(session.locale.bot_choose_cmd,
@@ -548,7 +554,7 @@ async def decode_crosshair_process(client: BotClient, session: UserSession, bot_
 
 @bot.funcmenu(LK.exchangerate_button_title, came_from=extra_features, ignore_message_not_modified=True)
 async def send_exchange_rate(_, session: UserSession, bot_message: Message):
-    core_cache = caching.load_cache(config.CORE_CACHE_FILE_PATH)
+    core_cache = CoreCache.from_dict(await caching.aload_cache_snapshot(config.CORE_CACHE_FILE_PATH))
 
     prices = ExchangeRate.cached_data(core_cache).asdict()
 
@@ -578,10 +584,9 @@ async def send_dropcap_timer(_, session: UserSession, bot_message: Message):
 async def send_game_version(_, session: UserSession, bot_message: Message):
     """Send a current version of CS:GO/CS 2"""
 
-    gc_cache = caching.load_cache(config.GC_CACHE_FILE_PATH)
+    gc_cache = GCCache.from_dict(await caching.aload_cache_snapshot(config.GC_CACHE_FILE_PATH))
 
-    data = GameVersion.cached_data(gc_cache)
-    text = info_formatters.format_game_version_info(data, session.locale)
+    text = rendering.game_version(gc_cache, session.locale)
 
     await bot_message.edit(text, reply_markup=keyboards.extra_markup(session.locale),
                            disable_web_page_preview=True)
@@ -589,9 +594,8 @@ async def send_game_version(_, session: UserSession, bot_message: Message):
 
 @bot.navmenu(LK.game_leaderboard_button_title, came_from=extra_features, ignore_message_not_modified=True)
 async def game_leaderboard(_, session: UserSession, bot_message: Message):
-    # todo: make it so we don't have to set it manually here
-    # noinspection PyTypeChecker
-    leaderboard_cache: LeaderboardCache = caching.load_cache(config.LEADERBOARD_SEASON3_CACHE_FILE_PATH)
+    leaderboard_cache = LeaderboardCache.from_dict(
+        await caching.aload_cache_snapshot(config.LEADERBOARD_SEASON3_CACHE_FILE_PATH))
 
     keyboards.leaderboard_markup.select_button_by_key(LK.game_leaderboard_world)
 
@@ -651,8 +655,8 @@ async def send_game_leaderboard(_, session: UserSession, bot_message: Message,
     await bot_message.edit(session.locale.bot_loading,
                            reply_markup=keyboards.leaderboard_markup(session.locale))
 
-    # noinspection PyTypeChecker
-    lb_cache: LeaderboardCache = caching.load_cache(config.LEADERBOARD_SEASON3_CACHE_FILE_PATH)  # todo: and here!
+    lb_cache = LeaderboardCache.from_dict(
+        await caching.aload_cache_snapshot(config.LEADERBOARD_SEASON3_CACHE_FILE_PATH))
 
     region = region.split('_')[-1]
     if region == 'world':
@@ -1040,6 +1044,21 @@ async def regular_stats_report(client: BotClient):
     client.rstats.clear()
 
 
+@cache_watcher.on_change
+async def warm_up_responses(event: CacheChanged):
+    """Prerender responses for all languages as soon as the collectors write new data."""
+
+    logger.debug(f'{event.path.name} changed to generation {event.generation}, warming up responses...')
+
+    core_cache = CoreCache.from_dict(await caching.aload_cache_snapshot(config.CORE_CACHE_FILE_PATH))
+    gc_cache = GCCache.from_dict(await caching.aload_cache_snapshot(config.GC_CACHE_FILE_PATH))
+    graph_cache = GraphCache.from_dict(await caching.aload_cache_snapshot(config.GRAPH_CACHE_FILE_PATH))
+    locales = [lc(lang_code) for lang_code in AVAILABLE_LANGUAGES]
+
+    await asyncio.to_thread(rendering.prerender_all, core_cache, gc_cache, graph_cache,
+                            DatacenterAtlas.available_dcs(), locales)
+
+
 # cat: Main
 
 
@@ -1053,6 +1072,7 @@ async def main():
         await db_session.init(config.USER_DB_FILE_PATH)
         await bot.start()
         scheduler.start()
+        await cache_watcher.start()
         await bot.log('Bot started.', instant=True)
         await bot.mainloop()
     except Exception as e:
@@ -1063,6 +1083,7 @@ async def main():
                       disable_notification=False, parse_mode=ParseMode.DISABLED)
     finally:
         logger.info('Shutting down the bot...')
+        await cache_watcher.stop()
         await bot.log('Bot is shutting down...', instant=True)
         await bot.dump_sessions()
         await bot.stop()
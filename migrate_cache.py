@@ -0,0 +1,40 @@
+"""
+Copies the JSON cache files into the SQLite cache database (``CACHE_DB_FILE_PATH``),
+keeping their generations. Run it once with the collectors stopped before switching ``CACHE_BACKEND`` to ``'sqlite'``.
+"""
+
+import json
+import logging
+
+import config
+from functions.cache_backends import GENERATION_KEY, JSONCacheBackend, SQLiteCacheBackend
+
+CACHE_FILE_PATHS = (config.CORE_CACHE_FILE_PATH,
+                    config.GC_CACHE_FILE_PATH,
+                    config.GRAPH_CACHE_FILE_PATH,
+                    config.LEADERBOARD_SEASON3_CACHE_FILE_PATH)
+
+logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+logger = logging.getLogger(f'{config.NAME}.migrate_cache')
+
+
+def main():
+    source = JSONCacheBackend()
+    target = SQLiteCacheBackend(config.CACHE_DB_FILE_PATH)
+
+    try:
+        for path in CACHE_FILE_PATHS:
+            try:
+                cache = source.load(path)
+            except (FileNotFoundError, json.JSONDecodeError):
+                logger.warning(f'Skipping {path.name}: no valid cache file')
+                continue
+
+            target.restore(path, cache)
+            logger.info(f'Migrated {path.name} (generation {cache.get(GENERATION_KEY, 0)})')
+    finally:
+        target.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import json
 import time
 from typing import TYPE_CHECKING
 
@@ -23,10 +22,13 @@ if TYPE_CHECKING:
 
 MINUTE = 60
 MAX_ONLINE_MARKS = (MINUTE // 10) * 24 * 7 * 2  # = 2016 marks - every 10 minutes for the last two weeks
+GRAPH_MAKER_ATTEMPTS = 5  # retried every minute, so it's done before the next run
 
 setup_logging(config.LOGS_CONFIG_FILE_PATH)
 logger = get_logger(f'{config.NAME}.graph')
 
+caching.setup_caching(config)
+
 scheduler = BlockingScheduler()
 
 cmap = LinearSegmentedColormap.from_list('custom', [(1, 1, 0), (1, 0, 0)], N=100)
@@ -69,96 +71,100 @@ def delete_uploaded_image(host: str, image_key: str) -> bool:
 
 @scheduler.scheduled_job('cron', hour='*', minute='0,10,20,30,40,50', second='0')
 def graph_maker():
-    # noinspection PyBroadException
-    try:
-        old_player_data = pd.read_csv(config.PLAYER_CHART_FILE_PATH, parse_dates=['DateTime'])
+    for attempt in range(1, GRAPH_MAKER_ATTEMPTS + 1):
+        # noinspection PyBroadException
+        try:
+            return plot_player_count_graph()
+        except Exception:
+            logger.exception('Caught exception in graph maker!')
+        if attempt < GRAPH_MAKER_ATTEMPTS:
+            time.sleep(MINUTE)
 
-        marks_count = len(old_player_data.index)
-        if marks_count >= MAX_ONLINE_MARKS:
-            remove_marks = marks_count - MAX_ONLINE_MARKS
-            old_player_data.drop(range(remove_marks + 1), axis=0, inplace=True)
 
-        with open(config.GC_CACHE_FILE_PATH, encoding='utf-8') as f:
-            player_count = json.load(f).get('online_players', 0)
+def plot_player_count_graph():
+    old_player_data = pd.read_csv(config.PLAYER_CHART_FILE_PATH, parse_dates=['DateTime'])
 
-        if player_count < 50_000:  # potentially Steam maintenance
-            player_count = old_player_data.iloc[-1]['Players']
+    marks_count = len(old_player_data.index)
+    if marks_count >= MAX_ONLINE_MARKS:
+        remove_marks = marks_count - MAX_ONLINE_MARKS
+        old_player_data.drop(range(remove_marks + 1), axis=0, inplace=True)
 
-        temp_player_data = pd.DataFrame(
-            [[f'{utime.utcnow():%Y-%m-%d %H:%M:%S}', player_count]],
-            columns=['DateTime', 'Players'],
-        )
+    player_count = caching.load_cache_snapshot(config.GC_CACHE_FILE_PATH).get('online_players', 0)
 
-        new_player_data = pd.concat([old_player_data, temp_player_data])
+    if player_count < 50_000:  # potentially Steam maintenance
+        player_count = old_player_data.iloc[-1]['Players']
 
-        new_player_data.to_csv(config.PLAYER_CHART_FILE_PATH, index=False)
+    temp_player_data = pd.DataFrame(
+        [[f'{utime.utcnow():%Y-%m-%d %H:%M:%S}', player_count]],
+        columns=['DateTime', 'Players'],
+    )
 
-        fig: plt.Figure
-        ax: plt.Axes
+    new_player_data = pd.concat([old_player_data, temp_player_data])
 
-        sns.set_style('whitegrid')
+    new_player_data.to_csv(config.PLAYER_CHART_FILE_PATH, index=False)
 
-        fig, ax = plt.subplots(figsize=(10, 2.5))
-        ax.scatter('DateTime', 'Players',
-                   data=new_player_data,
-                   c='Players', cmap=cmap, s=10, norm=norm, linewidths=0.7)
-        ax.fill_between(new_player_data['DateTime'],
-                        new_player_data['Players'] - 20_000,
-                        color=cmap(0.5), alpha=0.4)
-        ax.margins(x=0)
+    fig: plt.Figure
+    ax: plt.Axes
 
-        ax.grid(visible=True, axis='y', linestyle='--', alpha=0.3)
-        ax.grid(visible=False, axis='x')
-        ax.spines['bottom'].set_position('zero')
-        ax.spines['bottom'].set_color('black')
-        ax.set(xlabel='', ylabel='')
-        ax.xaxis.set_ticks_position('bottom')
-        ax.xaxis.set_major_locator(x_major_locator)
-        ax.xaxis.set_major_formatter(x_major_formatter)
-        ax.legend(loc='upper left')
-        ax.text(0.20, 0.88,
-                'Made by @INCS2\n'
-                'updates every 10 min',
-                ha='center', transform=ax.transAxes, color='black', size='8')
-        ax.set_yticks(ticks, fig_ticks_format)
+    sns.set_style('whitegrid')
 
-        fig.colorbar(mappable, ax=ax,
-                     ticks=ticks,
-                     format=colorbar_ticks_format,
-                     pad=0.01)
+    fig, ax = plt.subplots(figsize=(10, 2.5))
+    ax.scatter('DateTime', 'Players',
+               data=new_player_data,
+               c='Players', cmap=cmap, s=10, norm=norm, linewidths=0.7)
+    ax.fill_between(new_player_data['DateTime'],
+                    new_player_data['Players'] - 20_000,
+                    color=cmap(0.5), alpha=0.4)
+    ax.margins(x=0)
 
-        fig.subplots_adjust(top=0.933, bottom=0.077, left=0.03, right=1.07)
+    ax.grid(visible=True, axis='y', linestyle='--', alpha=0.3)
+    ax.grid(visible=False, axis='x')
+    ax.spines['bottom'].set_position('zero')
+    ax.spines['bottom'].set_color('black')
+    ax.set(xlabel='', ylabel='')
+    ax.xaxis.set_ticks_position('bottom')
+    ax.xaxis.set_major_locator(x_major_locator)
+    ax.xaxis.set_major_formatter(x_major_formatter)
+    ax.legend(loc='upper left')
+    ax.text(0.20, 0.88,
+            'Made by @INCS2\n'
+            'updates every 10 min',
+            ha='center', transform=ax.transAxes, color='black', size='8')
+    ax.set_yticks(ticks, fig_ticks_format)
 
-        fig.savefig(config.GRAPH_IMG_FILE_PATH, dpi=200)
-        plt.close()
+    fig.colorbar(mappable, ax=ax,
+                 ticks=ticks,
+                 format=colorbar_ticks_format,
+                 pad=0.01)
 
-        cache = caching.load_cache(config.GRAPH_CACHE_FILE_PATH)
+    fig.subplots_adjust(top=0.933, bottom=0.077, left=0.03, right=1.07)
 
-        try:
-            response = delete_uploaded_image('kappa.lol', cache['key'])
-        except (requests.HTTPError, requests.ConnectionError):
-            logger.exception('Caught exception while deleting old graph image from the file uploader!')
-            response = False
-        except KeyError:
-            logger.warning('No deletion key was in the cache file, ignoring the deletion sequence...')
-            response = True
+    fig.savefig(config.GRAPH_IMG_FILE_PATH, dpi=200)
+    plt.close()
 
-        if not response:
-            logger.error('Failed to delete old graph image from the file uploader!')
+    cache = caching.load_cache(config.GRAPH_CACHE_FILE_PATH)
 
-        try:
-            with open(config.GRAPH_IMG_FILE_PATH, 'rb') as f:
-                response = upload_image_online(f, 'kappa.lol')
-        except (requests.HTTPError, requests.ConnectionError):
-            logger.exception('Caught exception while uploading graph image to the file uploader!')
-            response = {'link': '', 'key': ''}
-
-        caching.dump_cache(config.GRAPH_CACHE_FILE_PATH, response)
-        logger.info('Successfully plotted the player count graph.')
-    except Exception:
-        logger.exception('Caught exception in graph maker!')
-        time.sleep(MINUTE)
-        return graph_maker()
+    try:
+        response = delete_uploaded_image('kappa.lol', cache['key'])
+    except (requests.HTTPError, requests.ConnectionError):
+        logger.exception('Caught exception while deleting old graph image from the file uploader!')
+        response = False
+    except KeyError:
+        logger.warning('No deletion key was in the cache file, ignoring the deletion sequence...')
+        response = True
+
+    if not response:
+        logger.error('Failed to delete old graph image from the file uploader!')
+
+    try:
+        with open(config.GRAPH_IMG_FILE_PATH, 'rb') as f:
+            response = upload_image_online(f, 'kappa.lol')
+    except (requests.HTTPError, requests.ConnectionError):
+        logger.exception('Caught exception while uploading graph image to the file uploader!')
+        response = {'link': '', 'key': ''}
+
+    caching.dump_cache(config.GRAPH_CACHE_FILE_PATH, response)
+    logger.info('Successfully plotted the player count graph.')
 
 
 def main():
@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import datetime as dt
 import logging
 import re
 import traceback
@@ -12,11 +11,11 @@ from pyrogram.types import InlineQuery, InlineQueryResultArticle, InputTextMessa
 from bottypes import BotClient, UserSession
 import config
 from dcatlas import DatacenterAtlas
-from functions import info_formatters, caching
+from functions import info_formatters, caching, rendering
 import keyboards
 from l10n import load_tags
-from utypes import (DatacenterInlineResult, ExchangeRate,
-                    GameServers, GameVersion,
+from utypes import (CoreCache, GCCache, GraphCache,
+                    DatacenterInlineResult, ExchangeRate,
                     drop_cap_reset_timer)
 
 if TYPE_CHECKING:
@@ -71,14 +70,16 @@ def get_triggered_tags(query: str):
 
 def dc_articles_factory(dcs: list[DatacenterInlineResult],
                         locale: Locale,
-                        last_info_update_at: dt.datetime,
+                        core_cache: CoreCache,
                         reply_markup: ExtendedIKM) -> list[InlineQueryResultArticle]:
     result = []
     for i, dc in enumerate(dcs):
+        datacenter = dc.state[0]  # datacenter, region or group the state belongs to
+        text = rendering.datacenter_state(core_cache, datacenter, locale)
         result.append(
             InlineQueryResultArticle(
                 dc.title,
-                InputTextMessageContent(info_formatters.format_datacenter_state(dc.state, locale, last_info_update_at)),
+                InputTextMessageContent(text),
                 f'{i}',
                 description=locale.dc_status_inline_description,
                 reply_markup=reply_markup,
@@ -119,7 +120,7 @@ async def share_inline(_, session: UserSession, inline_query: InlineQuery):
 
 @log_exception_inline
 async def inline_exchange_rate(_, session: UserSession, inline_query: InlineQuery):
-    core_cache = caching.load_cache(config.CORE_CACHE_FILE_PATH)
+    core_cache = CoreCache.from_dict(await caching.aload_cache_snapshot(config.CORE_CACHE_FILE_PATH))
     data = ExchangeRate.cached_data(core_cache).asdict()
 
     try:
@@ -172,141 +173,134 @@ async def inline_exchange_rate(_, session: UserSession, inline_query: InlineQuer
 
 @log_exception_inline
 async def inline_datacenters(_, session: UserSession, inline_query: InlineQuery):
-    cache = caching.load_cache(config.CORE_CACHE_FILE_PATH)
-    dc_cache = cache['datacenters']
+    cache = CoreCache.from_dict(await caching.aload_cache_snapshot(config.CORE_CACHE_FILE_PATH))
 
     dcs = [
         DatacenterInlineResult(session.locale.dc_china_inline_title,
                                'https://telegra.ph/file/ff0dad30ae32144d7cd0c.jpg',
-                               DatacenterAtlas.CHINA.cached_state(dc_cache),
+                               cache.datacenter_state(DatacenterAtlas.CHINA),
                                TAGS.dc_asia_china),
         DatacenterInlineResult(session.locale.dc_emirates_inline_title,
                                'https://telegra.ph/file/1de1e51e62b79cae5181a.jpg',
-                               DatacenterAtlas.EMIRATES.cached_state(dc_cache),
+                               cache.datacenter_state(DatacenterAtlas.EMIRATES),
                                TAGS.dc_asia_emirates),
         DatacenterInlineResult(session.locale.dc_hongkong_inline_title,
                                'https://telegra.ph/file/0b209e65c421910419f34.jpg',
-                               DatacenterAtlas.HONGKONG.cached_state(dc_cache),
+                               cache.datacenter_state(DatacenterAtlas.HONGKONG),
                                TAGS.dc_asia_hongkong),
         DatacenterInlineResult(session.locale.dc_india_inline_title,
                                'https://telegra.ph/file/b2213992b750940113b69.jpg',
-                               DatacenterAtlas.INDIA.cached_state(dc_cache),
+                               cache.datacenter_state(DatacenterAtlas.INDIA),
                                TAGS.dc_asia_india),
         DatacenterInlineResult(session.locale.dc_japan_inline_title,
                                'https://telegra.ph/file/11b6601a3e60940d59c88.jpg',
-                               DatacenterAtlas.JAPAN.cached_state(dc_cache),
+                               cache.datacenter_state(DatacenterAtlas.JAPAN),
                                TAGS.dc_asia_japan),
         DatacenterInlineResult(session.locale.dc_singapore_inline_title,
                                'https://telegra.ph/file/1c2121ceec5d1482173d5.jpg',
-                               DatacenterAtlas.SINGAPORE.cached_state(dc_cache),
+                               cache.datacenter_state(DatacenterAtlas.SINGAPORE),
                                TAGS.dc_asia_singapore),
         DatacenterInlineResult(session.locale.dc_southkorea_inline_title,
                                'https://telegra.ph/file/2265e9728d06632773537.png',
-                               DatacenterAtlas.SOUTH_KOREA.cached_state(dc_cache),
+                               cache.datacenter_state(DatacenterAtlas.SOUTH_KOREA),
                                TAGS.dc_asia_southkorea),
         DatacenterInlineResult(session.locale.dc_austria_inline_title,
                                'https://telegra.ph/file/2287811648e78e851867f.png',
-                               DatacenterAtlas.AUSTRIA.cached_state(dc_cache),
+                               cache.datacenter_state(DatacenterAtlas.AUSTRIA),
                                TAGS.dc_europe_austria),
         DatacenterInlineResult(session.locale.dc_finland_inline_title,
                                'https://telegra.ph/file/679a01598932aeebceb55.png',
-                               DatacenterAtlas.FINLAND.cached_state(dc_cache),
+                               cache.datacenter_state(DatacenterAtlas.FINLAND),
                                TAGS.dc_europe_finland),
         DatacenterInlineResult(session.locale.dc_germany_inline_title,
                                'https://telegra.ph/file/e19c71673c65a791f1e7b.png',
-                               DatacenterAtlas.GERMANY.cached_state(dc_cache),
+                               cache.datacenter_state(DatacenterAtlas.GERMANY),
                                TAGS.dc_europe_germany),
         # DatacenterInlineResult(session.locale.dc_netherlands_inline_title,
         #                        'https://telegra.ph/file/984b82bbf8bcff40d7e74.png',
-        #                        DatacenterAtlas.NETHERLANDS.cached_state(cache),
+        #                        cache.datacenter_state(DatacenterAtlas.NETHERLANDS),
         #                        TAGS.dc_europe_netherlands),
         DatacenterInlineResult(session.locale.dc_poland_inline_title,
                                'https://telegra.ph/file/485df799a416149642142.png',
-                               DatacenterAtlas.POLAND.cached_state(dc_cache),
+                               cache.datacenter_state(DatacenterAtlas.POLAND),
                                TAGS.dc_europe_poland),
         DatacenterInlineResult(session.locale.dc_spain_inline_title,
                                'https://telegra.ph/file/72b3dfb6830aa95f48064.png',
-                               DatacenterAtlas.SPAIN.cached_state(dc_cache),
+                               cache.datacenter_state(DatacenterAtlas.SPAIN),
                                TAGS.dc_europe_spain),
         DatacenterInlineResult(session.locale.dc_sweden_inline_title,
                                'https://telegra.ph/file/f552dc251f2c0a4e5be53.png',
-                               DatacenterAtlas.SWEDEN.cached_state(dc_cache),
+                               cache.datacenter_state(DatacenterAtlas.SWEDEN),
                                TAGS.dc_europe_sweden),
         DatacenterInlineResult(session.locale.dc_uk_inline_title,
                                'https://telegra.ph/file/f92ba1d5bd6f2b01e0ad8.png',
-                               DatacenterAtlas.UK.cached_state(dc_cache),
+                               cache.datacenter_state(DatacenterAtlas.UK),
                                TAGS.dc_europe_uk),
         DatacenterInlineResult(session.locale.dc_us_east_inline_title,
                                'https://telegra.ph/file/06119c30872031d1047d0.jpg',
-                               DatacenterAtlas.US_EAST.cached_state(dc_cache),
+                               cache.datacenter_state(DatacenterAtlas.US_EAST),
                                TAGS.dc_us_east),
         DatacenterInlineResult(session.locale.dc_us_west_inline_title,
                                'https://telegra.ph/file/06119c30872031d1047d0.jpg',
-                               DatacenterAtlas.US_WEST.cached_state(dc_cache),
+                               cache.datacenter_state(DatacenterAtlas.US_WEST),
                                TAGS.dc_us_west),
         DatacenterInlineResult(session.locale.dc_us_south_inline_title,
                                'https://telegra.ph/file/06119c30872031d1047d0.jpg',
-                               DatacenterAtlas.US_SOUTH.cached_state(dc_cache),
+                               cache.datacenter_state(DatacenterAtlas.US_SOUTH),
                                TAGS.dc_us_south),
         DatacenterInlineResult(session.locale.dc_australia_inline_title,
                                'https://telegra.ph/file/5dc6beef1556ea852284c.jpg',
-                               DatacenterAtlas.AUSTRALIA.cached_state(dc_cache),
+                               cache.datacenter_state(DatacenterAtlas.AUSTRALIA),
                                TAGS.dc_australia),
         DatacenterInlineResult(session.locale.dc_africa_inline_title,
                                'https://telegra.ph/file/12628c8193b48302722e8.jpg',
-                               DatacenterAtlas.AFRICA.cached_state(dc_cache),
+                               cache.datacenter_state(DatacenterAtlas.AFRICA),
                                TAGS.dc_africa),
         DatacenterInlineResult(session.locale.dc_brazil_inline_title,
                                'https://telegra.ph/file/71264c82d0f7f6b8cb848.png',
-                               DatacenterAtlas.BRAZIL.cached_state(dc_cache),
+                               cache.datacenter_state(DatacenterAtlas.BRAZIL),
                                TAGS.dc_southamerica_brazil),
         DatacenterInlineResult(session.locale.dc_peru_inline_title,
                                'https://telegra.ph/file/df707dd2664bdfcaef66f.png',
-                               DatacenterAtlas.PERU.cached_state(dc_cache),
+                               cache.datacenter_state(DatacenterAtlas.PERU),
                                TAGS.dc_southamerica_peru),
         DatacenterInlineResult(session.locale.dc_chile_inline_title,
                                'https://telegra.ph/file/85f0997f445ddf5f2e56a.png',
-                               DatacenterAtlas.CHILE.cached_state(dc_cache),
+                               cache.datacenter_state(DatacenterAtlas.CHILE),
                                TAGS.dc_southamerica_chile),
         DatacenterInlineResult(session.locale.dc_argentina_inline_title,
                                'https://telegra.ph/file/3a2333e7effcc377e3848.png',
-                               DatacenterAtlas.ARGENTINA.cached_state(dc_cache),
+                               cache.datacenter_state(DatacenterAtlas.ARGENTINA),
                                TAGS.dc_southamerica_argentina)
     ]
     dcs.sort(key=lambda x: x.title)
 
-    last_info_updated_at = GameServers.latest_info_update(cache)  # fixme: what happens if returns States.UNKNOWN?
-
     inline_btn = keyboards.markup_inline_button(session.locale)
 
     try:
         query = inline_query.query.split()[1].strip().lower()
     except IndexError:  # no query, return all DCs
-        resulted_articles = dc_articles_factory(dcs, session.locale, last_info_updated_at, inline_btn)
+        resulted_articles = dc_articles_factory(dcs, session.locale, cache, inline_btn)
         return await inline_query.answer(resulted_articles, cache_time=5)
 
     triggered_tags = get_triggered_tags(query)
     resulted_dcs = [dc for dc in dcs if dc.tags & triggered_tags]
 
-    resulted_articles = dc_articles_factory(resulted_dcs, session.locale, last_info_updated_at, inline_btn)
+    resulted_articles = dc_articles_factory(resulted_dcs, session.locale, cache, inline_btn)
     await inline_query.answer(resulted_articles, cache_time=10)
 
 
 @log_exception_inline
 async def default_inline(_, session: UserSession, inline_query: InlineQuery):
-    core_cache = caching.load_cache(config.CORE_CACHE_FILE_PATH)
-    gc_cache = caching.load_cache(config.GC_CACHE_FILE_PATH)
-    graph_cache = caching.load_cache(config.GRAPH_CACHE_FILE_PATH)
-
-    servers_status_data = GameServers.cached_server_status(core_cache, gc_cache)
-    matchmaking_stats_data = GameServers.cached_matchmaking_stats(core_cache, gc_cache, graph_cache.get('link', ''))
-    game_version_data = GameVersion.cached_data(gc_cache)
+    core_cache = CoreCache.from_dict(await caching.aload_cache_snapshot(config.CORE_CACHE_FILE_PATH))
+    gc_cache = GCCache.from_dict(await caching.aload_cache_snapshot(config.GC_CACHE_FILE_PATH))
+    graph_cache = GraphCache.from_dict(await caching.aload_cache_snapshot(config.GRAPH_CACHE_FILE_PATH))
 
-    server_status_text = info_formatters.format_server_status(servers_status_data, session.locale)
-    matchmaking_stats_text = info_formatters.format_matchmaking_stats(matchmaking_stats_data, session.locale)
+    server_status_text = rendering.server_status(core_cache, gc_cache, session.locale)
+    matchmaking_stats_text = rendering.matchmaking_stats(core_cache, gc_cache, graph_cache, session.locale)
     valve_hq_time_text = info_formatters.format_valve_hq_time(session.locale)
     drop_cap_reset_timer_text = session.locale.game_dropcaptimer_text.format(*drop_cap_reset_timer())
-    game_version_text = info_formatters.format_game_version_info(game_version_data, session.locale)
+    game_version_text = rendering.game_version(gc_cache, session.locale)
 
     inline_btn = keyboards.markup_inline_button(session.locale)
 
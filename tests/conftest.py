@@ -0,0 +1,84 @@
+"""
+Shared fixtures.
+
+Modules under test are imported straight from their files, without running ``functions/__init__.py``
+or ``utypes/__init__.py``: both need ``config.py`` and the whole bot.
+"""
+
+from __future__ import annotations
+
+import importlib.util
+from pathlib import Path
+import sys
+import types
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _stub_package(package: str):
+    if package not in sys.modules:
+        stub = types.ModuleType(package)
+        stub.__path__ = [str(ROOT / package)]
+        sys.modules[package] = stub
+
+
+# so modules can also import each other absolutely (e.g. ``from utypes.sqlite_db import ...``)
+for _package in ('functions', 'utypes'):
+    _stub_package(_package)
+
+
+def import_isolated(package: str, name: str, *, export: bool = False) -> types.ModuleType:
+    """
+    Imports ``package.name`` (and whatever it imports relatively) without running the package's ``__init__``.
+    With ``export``, names of the module's ``__all__`` can be imported from the package, as its ``__init__`` does.
+    """
+
+    _stub_package(package)
+
+    module = sys.modules.get(f'{package}.{name}')
+    if module is None:
+        spec = importlib.util.spec_from_file_location(f'{package}.{name}', ROOT / package / f'{name}.py')
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[spec.name] = module
+        spec.loader.exec_module(module)
+        setattr(sys.modules[package], name, module)
+    if export:
+        vars(sys.modules[package]).update({attr: getattr(module, attr) for attr in module.__all__})
+    return module
+
+
+class FakeClock:
+    """Stands for ``time.time()`` and ``time.monotonic()``, only moves when told to."""
+
+    def __init__(self, now: float = 1_000_000):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+@pytest.fixture
+def caching(monkeypatch):
+    """``functions.caching`` with the default JSON backend, no cache bus and no write-through."""
+
+    module = import_isolated('functions', 'caching')
+    backends = import_isolated('functions', 'cache_backends')
+
+    monkeypatch.setattr(module, '_backend', backends.JSONCacheBackend())
+    monkeypatch.setattr(module, '_bus', None)
+    monkeypatch.setattr(module, '_write_through', False)
+    monkeypatch.setattr(module, '_snapshots', {})
+    yield module
+    module.get_backend().close()
+    if module._bus is not None:
+        module._bus.close()
@@ -0,0 +1,142 @@
+import asyncio
+import types
+
+from pyrogram.errors import BadRequest, FloodWait
+import pytest
+
+from conftest import import_isolated
+
+alerts = import_isolated('functions', 'alerts')
+
+
+def flood_wait(seconds: float) -> FloodWait:
+    e = FloodWait(value=0)
+    e.value = seconds  # real ones are whole seconds, too long for tests
+    return e
+
+
+class FakeMessage:
+    def __init__(self, bot: 'FakeBot', chat_id: int):
+        self.bot = bot
+        self.chat = types.SimpleNamespace(id=chat_id)
+
+    async def pin(self, disable_notification: bool = False):
+        self.bot.pinned.append(self.chat.id)
+
+
+class FakeBot:
+    """Records the sent messages, raising the queued up errors of a chat first."""
+
+    def __init__(self):
+        self.sent: list[tuple[int, str]] = []
+        self.pinned: list[int] = []
+        self.errors: dict[int, list[Exception]] = {}
+        self.calls = 0
+
+    async def send_message(self, chat_id: int, text: str, **kwargs) -> FakeMessage:
+        self.calls += 1
+        await asyncio.sleep(0)
+        errors = self.errors.get(chat_id)
+        if errors:
+            raise errors.pop(0)
+        self.sent.append((chat_id, text))
+        return FakeMessage(self, chat_id)
+
+    def texts(self, chat_id: int) -> list[str]:
+        return [text for chat, text in self.sent if chat == chat_id]
+
+
+@pytest.fixture
+def bot():
+    return FakeBot()
+
+
+@pytest.fixture
+def dispatcher(bot, clock, monkeypatch):
+    monkeypatch.setattr(alerts, 'time', types.SimpleNamespace(monotonic=clock))
+    dispatcher = alerts.AlertDispatcher(bot, dedupe_window=60)
+    dispatcher.RETRY_DELAY = 0
+    return dispatcher
+
+
+def test_per_chat_order(dispatcher, bot):
+    async def main():
+        bot.errors[1] = [OSError('connection reset')]
+        for text in ('a', 'b', 'c'):
+            dispatcher.send(text, [1, 2])
+        await dispatcher.close()
+
+    asyncio.run(main())
+    assert bot.texts(1) == ['a', 'b', 'c']
+    assert bot.texts(2) == ['a', 'b', 'c']
+
+
+def test_flood_wait_holds_back_one_chat_only(dispatcher, bot):
+    async def main():
+        bot.errors[1] = [flood_wait(0.2)]
+        dispatcher.send('a', [1, 2], pin_in={1})
+        dispatcher.send('b', [1, 2])
+        await dispatcher.close()
+
+    asyncio.run(main())
+    assert bot.sent == [(2, 'a'), (2, 'b'), (1, 'a'), (1, 'b')]
+    assert bot.pinned == [1]
+
+
+def test_dedupe_window(dispatcher, bot, clock):
+    async def main():
+        assert dispatcher.send('a', [1])
+        assert not dispatcher.send('a', [1])  # still queued
+        await dispatcher.join()
+        assert not dispatcher.send('a', [1])  # delivered
+
+        assert dispatcher.send('a', [1, 2])  # only to the new chat
+        await dispatcher.join()
+
+        clock.advance(60)
+        assert dispatcher.send('a', [1])
+        await dispatcher.close()
+
+    asyncio.run(main())
+    assert bot.sent == [(1, 'a'), (2, 'a'), (1, 'a')]
+
+
+def test_failed_alert_is_not_a_duplicate(dispatcher, bot):
+    async def main():
+        bot.errors[1] = [BadRequest()]
+        assert dispatcher.send('a', [1])
+        await dispatcher.join()
+        assert bot.sent == []
+
+        assert dispatcher.send('a', [1])
+        await dispatcher.close()
+
+    asyncio.run(main())
+    assert bot.sent == [(1, 'a')]
+    assert bot.calls == 2  # rejected alerts aren't retried
+
+
+def test_bounded_retries(dispatcher, bot):
+    async def main():
+        bot.errors[1] = [OSError('connection reset')] * dispatcher.MAX_ATTEMPTS
+        dispatcher.send('a', [1])
+        dispatcher.send('b', [1])
+        await dispatcher.close()
+
+    asyncio.run(main())
+    assert bot.sent == [(1, 'b')]
+    assert bot.calls == dispatcher.MAX_ATTEMPTS + 1
+
+
+def test_close_drains_queues(dispatcher, bot):
+    async def main():
+        for i in range(10):
+            dispatcher.send(str(i), [1, 2, 3], pin_in={3})
+        workers = list(dispatcher._workers.values())
+        await dispatcher.close()
+        assert all(worker.done() for worker in workers)
+
+    asyncio.run(main())
+    assert len(bot.sent) == 30
+    assert bot.pinned == [3] * 10
+    assert dispatcher._workers == {}
@@ -0,0 +1,84 @@
+import pytest
+
+from conftest import import_isolated
+
+branches = import_isolated('functions', 'branches')
+BranchSnapshot, BranchEvent, BranchEventType = branches.BranchSnapshot, branches.BranchEvent, branches.BranchEventType
+
+
+def branch(buildid, **data):
+    return {'buildid': str(buildid), 'timeupdated': '1700000000'} | data
+
+
+@pytest.fixture
+def snapshot_path(tmp_path):
+    return tmp_path / 'gc.branches.json'
+
+
+def test_first_diff_seeds(snapshot_path):
+    snapshot = BranchSnapshot(snapshot_path)
+    assert not snapshot.seeded
+
+    assert snapshot.diff({'public': branch(1)}) == []
+    assert snapshot.seeded
+    assert BranchSnapshot(snapshot_path).branches == snapshot.branches
+
+
+def test_diff_events(snapshot_path):
+    snapshot = BranchSnapshot(snapshot_path)
+    snapshot.seed({'public': branch(1), 'beta': branch(1), '1.40.0.0': branch(1)})
+
+    events = snapshot.diff({'public': branch(2), 'beta': branch(1), 'new': branch(3)})
+    assert events == [BranchEvent(BranchEventType.UPDATED, 'public', buildid='2', old_buildid='1'),
+                      BranchEvent(BranchEventType.CREATED, 'new', buildid='3'),
+                      BranchEvent(BranchEventType.DELETED, '1.40.0.0', old_buildid='1')]
+    assert events[2].is_backup
+    assert snapshot.diff({'public': branch(2), 'beta': branch(1), 'new': branch(3)}) == []
+
+
+def test_other_changes_only_update_snapshot(snapshot_path):
+    snapshot = BranchSnapshot(snapshot_path)
+    snapshot.seed({'beta': branch(1)})
+
+    assert snapshot.diff({'beta': branch(1, description='Beta')}) == []
+    assert BranchSnapshot(snapshot_path).branches == snapshot.branches
+
+
+def test_broken_snapshot(snapshot_path):
+    snapshot_path.write_text('{"public": ["1", null, "abc"]}')
+    assert not BranchSnapshot(snapshot_path).seeded
+
+
+def test_deferred_updates_stay_pending(snapshot_path):
+    snapshot = BranchSnapshot(snapshot_path, deferred=('public',))
+    snapshot.seed({'public': branch(1), 'beta': branch(1)})
+
+    snapshot.diff({'public': branch(2), 'beta': branch(2)})
+    event = BranchEvent(BranchEventType.UPDATED, 'public', buildid='2', old_buildid='1')
+
+    restarted = BranchSnapshot(snapshot_path, deferred=('public',))
+    assert restarted.pending_events() == [event]
+    assert restarted.diff({'public': branch(2), 'beta': branch(2)}) == []  # not emitted twice
+
+    restarted.resolve(event)
+    assert BranchSnapshot(snapshot_path, deferred=('public',)).pending_events() == []
+
+
+def test_resolving_outdated_update(snapshot_path):
+    snapshot = BranchSnapshot(snapshot_path, deferred=('public',))
+    snapshot.seed({'public': branch(1)})
+
+    [first] = snapshot.diff({'public': branch(2)})
+    [second] = snapshot.diff({'public': branch(3)})
+    snapshot.resolve(first)  # e.g. its alert was sent after all
+    assert snapshot.pending_events() == [second]
+
+
+def test_save_keeps_file_mode(snapshot_path):
+    snapshot = BranchSnapshot(snapshot_path)
+    snapshot.seed({'public': branch(1)})
+    snapshot_path.chmod(0o640)
+
+    snapshot.diff({'public': branch(2)})
+    assert snapshot_path.stat().st_mode & 0o777 == 0o640
+    assert [p.name for p in snapshot_path.parent.iterdir()] == [snapshot_path.name]
@@ -0,0 +1,131 @@
+import pytest
+
+from conftest import import_isolated
+
+cache_backends = import_isolated('functions', 'cache_backends')
+GENERATION_KEY = cache_backends.GENERATION_KEY
+
+
+@pytest.fixture(params=['json', 'sqlite'])
+def backend(request, tmp_path):
+    if request.param == 'json':
+        backend = cache_backends.JSONCacheBackend()
+    else:
+        backend = cache_backends.SQLiteCacheBackend(tmp_path / 'caches.sqlite')
+    yield backend
+    backend.close()
+
+
+@pytest.fixture
+def json_backend():
+    backend = cache_backends.JSONCacheBackend()
+    yield backend
+    backend.close()
+
+
+def test_replace_round_trip(backend, tmp_path):
+    path = tmp_path / 'core.json'
+
+    cache = {'a': 1, 'b': {'c': 'тест'}}
+    assert backend.replace(path, cache, timeout=5) == cache | {GENERATION_KEY: 1}
+    assert backend.load(path) == cache | {GENERATION_KEY: 1}
+
+    backend.replace(path, {'d': 2}, timeout=5)
+    assert backend.load(path) == {'d': 2, GENERATION_KEY: 2}
+
+
+def test_update_bumps_generation(backend, tmp_path):
+    path = tmp_path / 'core.json'
+
+    assert backend.update(path, {'a': 1}, timeout=5) == {'a': 1, GENERATION_KEY: 1}
+    assert backend.update(path, {'b': 2}, timeout=5) == {'a': 1, 'b': 2, GENERATION_KEY: 2}
+    assert backend.load(path) == {'a': 1, 'b': 2, GENERATION_KEY: 2}
+
+
+def test_fingerprint_changes_on_write(backend, tmp_path):
+    path = tmp_path / 'core.json'
+    backend.replace(path, {'a': 1}, timeout=5)
+
+    cache, fingerprint = backend.load_with_fingerprint(path)
+    assert backend.fingerprint(path) == fingerprint
+
+    backend.update(path, {'a': 2}, timeout=5)
+    assert backend.fingerprint(path) != fingerprint
+
+
+def test_load_missing(backend, tmp_path):
+    with pytest.raises(FileNotFoundError):
+        backend.load(tmp_path / 'core.json')
+
+
+def test_caches_are_separate(backend, tmp_path):
+    backend.replace(tmp_path / 'core.json', {'a': 1}, timeout=5)
+    backend.replace(tmp_path / 'gc.json', {'b': 2}, timeout=5)
+    backend.update(tmp_path / 'gc.json', {'c': 3}, timeout=5)
+
+    assert backend.load(tmp_path / 'core.json') == {'a': 1, GENERATION_KEY: 1}
+    assert backend.load(tmp_path / 'gc.json') == {'b': 2, 'c': 3, GENERATION_KEY: 2}
+
+
+def test_sqlite_restore_keeps_generation(tmp_path):
+    backend = cache_backends.SQLiteCacheBackend(tmp_path / 'caches.sqlite')
+    try:
+        path = tmp_path / 'core.json'
+        backend.replace(path, {'a': 1}, timeout=5)
+
+        backend.restore(path, {'b': 2, GENERATION_KEY: 41})
+        assert backend.load(path) == {'b': 2, GENERATION_KEY: 41}
+        assert backend.update(path, {}, timeout=5)[GENERATION_KEY] == 42
+    finally:
+        backend.close()
+
+
+def test_publish_keeps_file_mode(json_backend, tmp_path):
+    path = tmp_path / 'core.json'
+    json_backend.replace(path, {'a': 1}, timeout=5)
+    assert path.stat().st_mode & 0o777 == 0o666 & ~cache_backends._UMASK  # not 0o600 of temporary files
+
+    path.chmod(0o640)
+    json_backend.update(path, {'a': 2}, timeout=5)
+    assert path.stat().st_mode & 0o777 == 0o640
+    assert [p.name for p in tmp_path.iterdir() if p.suffix == '.tmp'] == []
+
+
+def test_replace_does_not_parse_own_writes(json_backend, tmp_path, monkeypatch):
+    path = tmp_path / 'core.json'
+    json_backend.replace(path, {'a': 1}, timeout=5)
+
+    def fail(_):
+        raise AssertionError('the cache was parsed')
+
+    monkeypatch.setattr(json_backend, 'load', fail)
+    assert json_backend.replace(path, {'a': 2}, timeout=5)[GENERATION_KEY] == 2
+    assert json_backend.replace(path, {'a': 3}, timeout=5)[GENERATION_KEY] == 3
+
+
+def test_replace_after_another_writer(json_backend, tmp_path):
+    path = tmp_path / 'core.json'
+    json_backend.replace(path, {'a': 1}, timeout=5)
+
+    other = cache_backends.JSONCacheBackend()
+    other.replace(path, {'a': 2}, timeout=5)
+    other.update(path, {'b': 3}, timeout=5)
+    assert json_backend.replace(path, {'a': 4}, timeout=5)[GENERATION_KEY] == 4
+
+
+def test_update_refuses_corrupted_cache(json_backend, tmp_path):
+    path = tmp_path / 'core.json'
+    path.write_text('{"a": 1, "b": ')
+
+    with pytest.raises(cache_backends.CacheCorruptedError):
+        json_backend.update(path, {'c': 3}, timeout=5)
+    assert path.read_text() == '{"a": 1, "b": '
+
+
+def test_replace_overwrites_corrupted_cache(json_backend, tmp_path):
+    path = tmp_path / 'core.json'
+    json_backend.replace(path, {'a': 1}, timeout=5)
+    path.write_text('{"a": 1, "b": ')
+
+    assert json_backend.replace(path, {'a': 2}, timeout=5) == {'a': 2, GENERATION_KEY: 2}
+    assert json_backend.load(path) == {'a': 2, GENERATION_KEY: 2}
@@ -0,0 +1,50 @@
+from conftest import import_isolated
+
+GENERATION_KEY = import_isolated('functions', 'cache_backends').GENERATION_KEY
+cache = import_isolated('utypes', 'cache')
+CoreCache, GCCache, LeaderboardCache = cache.CoreCache, cache.GCCache, cache.LeaderboardCache
+
+
+class Counter:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self) -> int:
+        self.calls += 1
+        return self.calls
+
+
+def test_decoded_once_per_snapshot():
+    data = {GENERATION_KEY: 3, 'api_timestamp': 1700000000, 'online_servers': 10}
+
+    core_cache = CoreCache.from_dict(data)
+    assert core_cache.generation == 3
+    assert core_cache.online_servers == 10
+    assert CoreCache.from_dict(data) is core_cache
+    assert CoreCache.from_dict(dict(data)) is not core_cache
+
+
+def test_generation_is_not_an_entry():
+    lb_cache = LeaderboardCache.from_dict({GENERATION_KEY: 7, 'world_leaderboard_stats': []})
+    assert lb_cache.generation == 7
+    assert lb_cache.entries == {'world_leaderboard_stats': []}
+
+
+def test_derive_once_per_model():
+    core_cache = CoreCache.from_dict({GENERATION_KEY: 1})
+    factory = Counter()
+
+    assert core_cache.derive('value', factory) == 1
+    assert core_cache.derive('value', factory) == 1
+    assert CoreCache.from_dict({GENERATION_KEY: 2}).derive('value', factory) == 2
+
+
+def test_derive_keeps_latest_dependency_only():
+    core_cache = CoreCache.from_dict({GENERATION_KEY: 1})
+    factory = Counter()
+
+    for gc_generation in range(1, 100):
+        gc_cache = GCCache.from_dict({GENERATION_KEY: gc_generation})
+        assert core_cache.derive('server_status', factory, depends_on=gc_cache.generation) == gc_generation
+        assert core_cache.derive('server_status', factory, depends_on=gc_cache.generation) == gc_generation
+    assert len(core_cache._derived) == 1
@@ -0,0 +1,102 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+from conftest import import_isolated
+
+cache_watcher = import_isolated('functions', 'cache_watcher')
+CacheChanged, CacheWatcher = cache_watcher.CacheChanged, cache_watcher.CacheWatcher
+
+needs_inotify = pytest.mark.skipif(cache_watcher._load_libc() is None, reason='inotify is unavailable')
+
+
+def replace_cache(path, cache: dict):
+    """Publishes the cache like the collectors do: writes a temporary file and renames it over the old one."""
+
+    temp_path = path.with_name(f'.{path.name}.tmp')
+    temp_path.write_text(json.dumps(cache))
+    os.replace(temp_path, path)
+
+
+async def wait_for(condition, timeout: float = 5):
+    async with asyncio.timeout(timeout):
+        while not condition():
+            await asyncio.sleep(0.01)
+
+
+@pytest.fixture
+def cache_path(caching, tmp_path):
+    path = tmp_path / 'gc.json'
+    caching.dump_cache(path, {'a': 1})
+    return path
+
+
+@needs_inotify
+def test_replace_fires_callback(caching, cache_path):
+    events = []
+
+    async def main():
+        watcher = CacheWatcher([cache_path])
+        watcher.on_change(events.append)
+        await watcher.start()
+        assert watcher.uses_inotify
+
+        try:
+            replace_cache(cache_path, {'a': 2, caching.GENERATION_KEY: 2})
+            await wait_for(lambda: events)
+            assert caching.load_cache_snapshot(cache_path) == {'a': 2, caching.GENERATION_KEY: 2}
+
+            replace_cache(cache_path.with_name('core.json'), {caching.GENERATION_KEY: 7})  # not watched
+            replace_cache(cache_path, {'a': 3, caching.GENERATION_KEY: 2})  # same generation
+            await asyncio.sleep(0.1)
+        finally:
+            await watcher.stop()
+
+    asyncio.run(main())
+    assert events == [CacheChanged(cache_path, 2)]
+
+
+@needs_inotify
+def test_stop_closes_inotify(caching, cache_path):
+    events = []
+
+    async def main():
+        watcher = CacheWatcher([cache_path])
+        watcher.on_change(events.append)
+        await watcher.start()
+
+        fd = watcher._inotify_fd
+        await watcher.stop()
+        assert not watcher.uses_inotify
+        with pytest.raises(OSError):
+            os.fstat(fd)
+
+        replace_cache(cache_path, {'a': 2, caching.GENERATION_KEY: 2})
+        await asyncio.sleep(0.1)
+
+    asyncio.run(main())
+    assert events == []
+
+
+def test_polling_fallback(caching, cache_path, monkeypatch):
+    monkeypatch.setattr(cache_watcher, '_load_libc', lambda: None)
+    events = []
+
+    async def main():
+        watcher = CacheWatcher([cache_path], poll_interval=0.01)
+        watcher.on_change(events.append)
+        await watcher.start()
+        assert not watcher.uses_inotify
+
+        caching.dump_cache_changes(cache_path, {'a': 2})
+        await wait_for(lambda: events)
+
+        poll_task = watcher._poll_task
+        await watcher.stop()
+        await asyncio.sleep(0)
+        assert poll_task.cancelled()
+
+    asyncio.run(main())
+    assert events == [CacheChanged(cache_path, 2)]
@@ -0,0 +1,86 @@
+import pytest
+
+from conftest import import_isolated
+
+cachebus = import_isolated('functions', 'cachebus')
+CacheBus, CacheBusError = cachebus.CacheBus, cachebus.CacheBusError
+
+
+@pytest.fixture
+def bus_path(tmp_path):
+    return tmp_path / 'cache.bus'
+
+
+def open_bus(path, **kwargs):
+    return CacheBus(path, sections=kwargs.pop('sections', 2), section_capacity=kwargs.pop('section_capacity', 1024),
+                    **kwargs)
+
+
+def test_publish_and_read(bus_path):
+    writer, reader = open_bus(bus_path), open_bus(bus_path)
+    try:
+        assert reader.read('core.json') is None
+
+        assert writer.publish('core.json', {'a': 1}, 1)
+        assert reader.read('core.json') == (1, {'a': 1})
+
+        assert writer.publish('core.json', {'a': 2, 'b': [1, 2]}, 2)
+        assert reader.read('core.json') == (2, {'a': 2, 'b': [1, 2]})
+    finally:
+        writer.close()
+        reader.close()
+
+
+def test_read_keeps_decoded_data(bus_path):
+    bus = open_bus(bus_path)
+    try:
+        bus.publish('core.json', {'a': 1}, 1)
+        assert bus.read('core.json')[1] is bus.read('core.json')[1]
+    finally:
+        bus.close()
+
+
+def test_failed_publish_invalidates_section(bus_path):
+    writer, reader = open_bus(bus_path, section_capacity=64), open_bus(bus_path, section_capacity=64)
+    try:
+        assert writer.publish('core.json', {'a': 1}, 1)
+        assert reader.read('core.json') == (1, {'a': 1})
+
+        assert not writer.publish('core.json', {'a': 'x' * 100}, 2)  # too big
+        assert reader.read('core.json') is None
+
+        assert not writer.publish('core.json', {'a': object()}, 3)  # not marshallable
+        assert reader.read('core.json') is None
+
+        assert writer.publish('core.json', {'a': 4}, 4)
+        assert reader.read('core.json') == (4, {'a': 4})
+    finally:
+        writer.close()
+        reader.close()
+
+
+def test_layout_mismatch(bus_path):
+    open_bus(bus_path).close()
+    with pytest.raises(CacheBusError):
+        open_bus(bus_path, sections=4)
+
+
+def test_no_free_sections(bus_path):
+    bus = open_bus(bus_path, sections=1)
+    try:
+        bus.publish('core.json', {}, 1)
+        with pytest.raises(CacheBusError):
+            bus.publish('gc.json', {}, 1)
+    finally:
+        bus.close()
+
+
+def test_snapshot_falls_back_to_backend(caching, monkeypatch, tmp_path, bus_path):
+    path = tmp_path / 'core.json'
+    monkeypatch.setattr(caching, '_bus', open_bus(bus_path, section_capacity=64))
+
+    caching.dump_cache(path, {'a': 1})
+    assert caching.load_cache_snapshot(path) == {'a': 1, caching.GENERATION_KEY: 1}
+
+    caching.dump_cache(path, {'a': 'x' * 100})  # outgrows the section
+    assert caching.load_cache_snapshot(path) == {'a': 'x' * 100, caching.GENERATION_KEY: 2}
@@ -0,0 +1,69 @@
+import pytest
+
+
+@pytest.fixture
+def writer(caching, tmp_path):
+    writer = caching.CacheWriter(tmp_path / 'gc.json', interval=0.05)
+    yield writer
+    if not writer._closed:
+        writer.close()
+
+
+def test_writer_close_flushes(caching, writer):
+    writer.update({'a': 1})
+    writer.update({'a': 2, 'b': 3})
+    writer.close()
+
+    # buffered changes are coalesced into a single write
+    assert caching.load_cache(writer.path) == {'a': 2, 'b': 3, caching.GENERATION_KEY: 1}
+
+
+def test_writer_load_applies_pending_changes(caching, writer):
+    caching.dump_cache(writer.path, {'a': 1, 'b': 2})
+    writer.interval = 60  # so nothing gets written in the meantime
+
+    writer.update({'b': 3})
+    assert writer.load() == {'a': 1, 'b': 3, caching.GENERATION_KEY: 1}
+    assert caching.load_cache(writer.path) == {'a': 1, 'b': 2, caching.GENERATION_KEY: 1}
+
+
+def test_writer_keeps_changes_of_failed_flush(caching, writer, monkeypatch):
+    def fail(*_, **__):
+        raise TimeoutError
+
+    writer.interval = 60
+    writer.update({'a': 1})
+    with monkeypatch.context() as m:
+        m.setattr(caching, 'dump_cache_changes', fail)
+        with pytest.raises(TimeoutError):
+            writer.flush()
+
+    writer.update({'b': 2})
+    writer.flush()
+    assert caching.load_cache(writer.path) == {'a': 1, 'b': 2, caching.GENERATION_KEY: 1}
+
+
+def test_writer_remove(caching, tmp_path):
+    path = tmp_path / 'gc.json'
+    caching.dump_cache(path, {'branches': {'public': {'buildid': '1'}}, 'a': 1})
+
+    writer = caching.CacheWriter(path, interval=0.05)
+    writer.remove('branches')
+    assert writer.load() == {'a': 1, caching.GENERATION_KEY: 1}
+    writer.update({'b': 2})
+    writer.close()
+
+    assert caching.load_cache(path) == {'a': 1, 'b': 2, caching.GENERATION_KEY: 2}
+
+
+def test_writer_update_after_close(writer):
+    writer.close()
+    with pytest.raises(RuntimeError):
+        writer.update({'a': 1})
+
+
+def test_writer_load_corrupted_cache(caching, writer):
+    writer.path.write_text('{"a": 1, "b": ')
+
+    with pytest.raises(ValueError):
+        writer.load()
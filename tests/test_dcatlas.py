@@ -0,0 +1,52 @@
+import importlib.util
+import json
+
+from conftest import import_isolated, ROOT
+
+FIXTURES = ROOT / 'tests' / 'fixtures'
+
+# dcatlas imports the datacenter types from the utypes package itself
+datacenters = import_isolated('utypes', 'datacenters', export=True)
+_spec = importlib.util.spec_from_file_location('dcatlas', ROOT / 'dcatlas.py')
+dcatlas = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(dcatlas)
+DatacenterAtlas = dcatlas.DatacenterAtlas
+
+UNKNOWN_DC_STATE = datacenters.UNKNOWN_DC_STATE
+
+
+def load_fixture(name: str):
+    with open(FIXTURES / name, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def remap_per_datacenter(info: dict[str, dict[str, str]]) -> dict[str, ...]:
+    """How the datacenters used to be remapped, walking the atlas on every call."""
+
+    return {dc.id: dc.remap(info) for dc in DatacenterAtlas.available_dcs()}
+
+
+def test_remap_matches_previous_output():
+    # "EU Vienna" is reported as "Vienna" and "Mars Olympus" isn't in the atlas at all
+    info = load_fixture('datacenters_response.json')
+    expected = load_fixture('datacenters_remapped.json')
+
+    remapped = DatacenterAtlas.remap(info)
+    assert json.dumps(remapped) == json.dumps(expected)  # same order of the keys too, so the cache file is the same
+    assert remapped == remap_per_datacenter(info)
+    assert remapped['austria']['vienna'] == UNKNOWN_DC_STATE
+
+
+def test_remap_without_datacenters():
+    remapped = DatacenterAtlas.remap({})
+
+    assert remapped == remap_per_datacenter({})
+    assert remapped['south_africa'] == {'johannesburg': UNKNOWN_DC_STATE}
+
+
+def test_unknown_api_datacenters():
+    info = load_fixture('datacenters_response.json')
+
+    assert DatacenterAtlas.unknown_api_datacenters(info) == {'Vienna', 'Mars Olympus'}
+    assert DatacenterAtlas.by_api_id('Vienna') is None
+    assert DatacenterAtlas.by_api_id('EU Vienna').path == ('austria', 'vienna')
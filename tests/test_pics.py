@@ -0,0 +1,128 @@
+import types
+
+import pytest
+
+from conftest import import_isolated
+
+pics = import_isolated('functions', 'pics')
+PICSChangeFeed = pics.PICSChangeFeed
+
+APPS = (730, 2275500, 2275530)
+
+
+class FakeSteamClient:
+    """Answers PICS requests like ``SteamClient`` does, ``None`` standing for a timed out request."""
+
+    def __init__(self, change_number: int = 100):
+        self.change_number = change_number
+        self.app_changes: list[int] = []
+        self.force_full_update = False
+        self.timed_out = False
+        self.product_info_requests: list[list[int]] = []
+
+    def change(self, *appids: int):
+        self.change_number += 1
+        self.app_changes.extend(appids)
+
+    def get_changes_since(self, change_number, app_changes=True, package_changes=False):
+        if self.timed_out:
+            return
+        changes = types.SimpleNamespace(current_change_number=self.change_number,
+                                        force_full_update=self.force_full_update,
+                                        force_full_app_update=False,
+                                        app_changes=[types.SimpleNamespace(appid=appid) for appid in self.app_changes])
+        self.app_changes = []
+        return changes
+
+    def get_product_info(self, apps=(), timeout=15):
+        if self.timed_out:
+            return
+        self.product_info_requests.append(list(apps))
+        return {'apps': {appid: {'appid': appid, 'change_number': self.change_number} for appid in apps}}
+
+
+@pytest.fixture
+def client():
+    return FakeSteamClient()
+
+
+@pytest.fixture
+def feed():
+    return PICSChangeFeed(APPS)
+
+
+def test_first_poll_fetches_everything(feed, client):
+    assert sorted(feed.poll(client)) == sorted(APPS)
+    assert client.product_info_requests == [sorted(APPS)]
+    assert feed.change_number == 100
+
+
+def test_unchanged_change_number(feed, client):
+    feed.poll(client)
+
+    assert feed.poll(client) == {}
+    assert len(client.product_info_requests) == 1
+
+
+def test_only_changed_apps_are_fetched(feed, client):
+    feed.poll(client)
+
+    client.change(2275500, 440)  # not watched
+    assert list(feed.poll(client)) == [2275500]
+    assert client.product_info_requests[-1] == [2275500]
+    assert feed.change_number == 101
+
+
+def test_unwatched_changes_only(feed, client):
+    feed.poll(client)
+
+    client.change(440)
+    assert feed.poll(client) == {}
+    assert len(client.product_info_requests) == 1
+    assert feed.change_number == 101
+
+
+def test_force_full_update(feed, client):
+    feed.poll(client)
+
+    client.change(730)
+    client.force_full_update = True
+    assert sorted(feed.poll(client)) == sorted(APPS)
+
+
+def test_reset(feed, client):
+    feed.poll(client)
+
+    feed.reset()
+    assert sorted(feed.poll(client)) == sorted(APPS)
+
+
+def test_timeout(feed, client):
+    feed.poll(client)
+    client.change(730)
+
+    client.timed_out = True
+    with pytest.raises(TimeoutError):
+        feed.poll(client)
+    assert feed.change_number == 100
+
+    client.timed_out = False
+    assert list(feed.poll(client)) == [730]
+
+
+def test_product_info_timeout_keeps_change_number(feed, client):
+    feed.poll(client)
+    client.change(730)
+
+    client.get_product_info = lambda apps=(), timeout=15: None
+    with pytest.raises(TimeoutError):
+        feed.poll(client)
+    assert feed.change_number == 100
+
+
+def test_without_changes(client):
+    feed = PICSChangeFeed(APPS, use_changes=False)
+
+    feed.poll(client)
+    feed.poll(client)
+    assert client.product_info_requests == [sorted(APPS)] * 2
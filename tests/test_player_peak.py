@@ -0,0 +1,105 @@
+import datetime as dt
+import types
+
+import pytest
+
+from conftest import import_isolated
+
+player_peak = import_isolated('functions', 'player_peak')
+RollingMax, PlayerPeakTracker = player_peak.RollingMax, player_peak.PlayerPeakTracker
+
+START = dt.datetime(2026, 1, 1, tzinfo=dt.UTC)
+MARK = 10 * 60  # the chart is updated every 10 minutes
+
+
+def test_rolling_max_window_edge():
+    rolling_max = RollingMax(100)
+    rolling_max.push(0, 5)
+    rolling_max.push(50, 3)
+
+    assert rolling_max.max(99) == 5
+    assert rolling_max.max(100) == 3  # exactly ``window`` seconds old is out
+    assert rolling_max.max(150) == 0
+
+
+def test_rolling_max_ties_keep_latest():
+    rolling_max = RollingMax(100)
+    rolling_max.push(0, 5)
+    rolling_max.push(50, 5)
+
+    assert rolling_max.items() == [(50, 5)]
+    assert rolling_max.max(120) == 5
+
+
+def test_rolling_max_drops_smaller_values():
+    rolling_max = RollingMax(100)
+    for timestamp, value in ((0, 1), (10, 7), (20, 3), (30, 2), (40, 4)):
+        rolling_max.push(timestamp, value)
+
+    assert rolling_max.items() == [(10, 7), (40, 4)]
+    assert rolling_max.max(110) == 4
+
+
+class Chart:
+    """Player chart CSV like the one written by ``online_players_graph.py``."""
+
+    def __init__(self, path):
+        self.path = path
+        self.marks = 0
+        path.write_text('DateTime,Players\n')
+
+    def add(self, *players: int):
+        with open(self.path, 'a') as f:
+            for value in players:
+                f.write(f'{self.time(self.marks):%Y-%m-%d %H:%M:%S},{value}\n')
+                self.marks += 1
+
+    @staticmethod
+    def time(mark: int) -> dt.datetime:
+        return START + dt.timedelta(seconds=mark * MARK)
+
+
+@pytest.fixture
+def chart(tmp_path):
+    return Chart(tmp_path / 'player_count.csv')
+
+
+@pytest.fixture
+def now(chart, monkeypatch):
+    """Makes the tracker think it's the time of the last chart mark."""
+
+    monkeypatch.setattr(player_peak, 'utime',
+                        types.SimpleNamespace(utcnow=lambda: chart.time(chart.marks - 1)))
+
+
+def test_tracker_peak(chart, now):
+    tracker = PlayerPeakTracker(chart.path, window=3 * MARK)
+    chart.add(10, 30, 20)
+    assert tracker.peak() == 30
+
+    chart.add(15, 5)
+    assert tracker.peak() == 20  # the 30 mark is out of the window
+
+
+def test_tracker_restores_checkpoint(chart, now):
+    chart.add(10, 30, 20)
+    PlayerPeakTracker(chart.path, window=6 * MARK).peak()
+
+    restarted = PlayerPeakTracker(chart.path, window=6 * MARK)
+    assert restarted.rolling_max.items() == [(chart.time(1).timestamp(), 30), (chart.time(2).timestamp(), 20)]
+    assert restarted.last_timestamp == chart.time(2).timestamp()
+
+    # old marks get dropped from the start of the chart, the peak is still known from the checkpoint
+    header, *rows = chart.path.read_text().splitlines(keepends=True)
+    chart.path.write_text(header + rows[-1])
+    chart.add(25)
+    assert restarted.peak() == 30
+    assert restarted.rolling_max.items()[-1] == (chart.time(3).timestamp(), 25)
+
+
+def test_tracker_broken_checkpoint(chart, now):
+    tracker = PlayerPeakTracker(chart.path)
+    tracker.checkpoint_path.write_text('{"items": ')
+    chart.add(10, 30)
+
+    assert PlayerPeakTracker(chart.path).peak() == 30
@@ -0,0 +1,80 @@
+import pytest
+
+from conftest import import_isolated
+
+AdaptivePollingPolicy = import_isolated('functions', 'polling').AdaptivePollingPolicy
+
+DEFAULT, MIN, MAX = 40, 15, 120
+
+
+@pytest.fixture
+def policy():
+    return AdaptivePollingPolicy(DEFAULT, min_interval=MIN, max_interval=MAX)
+
+
+def poll_until(policy, clock, until: float, outcome=lambda now: {}) -> list[tuple[float, float]]:
+    """
+    Polls like the collector's rescheduled job does: observes what ``outcome(now)`` returns and waits
+    for the interval. Returns ``(poll time, next interval)`` of every poll, times relative to the start.
+    """
+
+    start = clock()
+    polls = []
+    while clock() - start < until:
+        interval = policy.observe(**outcome(clock() - start))
+        polls.append((clock() - start, interval))
+        clock.advance(interval)
+    return polls
+
+
+def test_bounds_are_checked():
+    with pytest.raises(ValueError):
+        AdaptivePollingPolicy(10, min_interval=MIN, max_interval=MAX)
+
+
+def test_backoff_while_nothing_changes(policy, clock):
+    polls = poll_until(policy, clock, 3600)
+    intervals = [interval for _, interval in polls]
+
+    assert intervals[:policy.stable_polls - 1] == [DEFAULT] * (policy.stable_polls - 1)
+    assert intervals[policy.stable_polls - 1:policy.stable_polls + 2] == [60, 90, MAX]
+    assert set(intervals[policy.stable_polls + 1:]) == {MAX}
+    assert len(polls) < 3600 / DEFAULT / 2
+
+
+def test_recovery_on_change(policy, clock):
+    poll_until(policy, clock, 600)
+    assert policy.interval == MAX
+
+    polls = poll_until(policy, clock, 600, lambda now: {'changed': now == 0})
+    assert polls[0][1] == DEFAULT
+    assert polls[1][0] == DEFAULT  # the next poll comes after the default interval again
+
+
+def test_important_change_polls_fast(policy, clock):
+    poll_until(policy, clock, 600)
+
+    polls = poll_until(policy, clock, 600, lambda now: {'important': now == 0})
+    hot_polls = policy.hot_polls
+    assert [interval for _, interval in polls[:hot_polls]] == [MIN] * hot_polls
+    assert polls[hot_polls - 1][0] == MIN * (hot_polls - 1)
+    # then nothing changes: back to the default interval and backing off again
+    assert [interval for _, interval in polls[hot_polls:hot_polls + policy.stable_polls]] == [DEFAULT, DEFAULT, 60]
+
+
+def test_important_change_extends_hot_polls(policy, clock):
+    polls = poll_until(policy, clock, MIN * 7, lambda now: {'important': now in (0, MIN * 3)})
+    assert {interval for _, interval in polls} == {MIN}
+
+
+def test_errors_back_off_and_recover(policy, clock):
+    polls = poll_until(policy, clock, 600, lambda now: {'error': True})
+    assert [interval for _, interval in polls[:3]] == [60, 90, MAX]
+
+    assert policy.observe(changed=True) == DEFAULT
+
+
+def test_errors_during_hot_polls(policy, clock):
+    policy.observe(important=True)
+    assert policy.observe(error=True) == DEFAULT * policy.backoff_factor
+    assert policy.observe() == MIN  # hot polls aren't over yet
@@ -0,0 +1,82 @@
+import types
+
+import pytest
+
+from conftest import import_isolated
+
+# rendering imports the cache models from the utypes package itself
+for _name in ('states', 'datacenters', 'cache', 'game_data'):
+    import_isolated('utypes', _name, export=True)
+rendering = import_isolated('functions', 'rendering')
+RenderStore = rendering.RenderStore
+
+EN = types.SimpleNamespace(lang_code='en')
+RU = types.SimpleNamespace(lang_code='ru')
+
+
+class Renderer:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, *_) -> str:
+        self.calls += 1
+        return f'render #{self.calls}'
+
+
+def test_store_hit():
+    store = RenderStore()
+    render = Renderer()
+
+    assert store.get('game_version', EN, 1, render) == 'render #1'
+    assert store.get('game_version', EN, 1, render) == 'render #1'
+    assert store.get('game_version', RU, 1, render) == 'render #2'
+    assert store.get('server_status', EN, 1, render) == 'render #3'
+    assert render.calls == 3
+
+
+def test_store_generation_bump():
+    store = RenderStore()
+    render = Renderer()
+    store.get('game_version', EN, 1, render)
+    store.get('game_version', RU, 1, render)
+
+    assert store.get('game_version', EN, 2, render) == 'render #3'
+    assert store._store['game_version'] == (2, {'en': 'render #3'})  # only the latest generation is kept
+    assert store.get('game_version', EN, 1, render) == 'render #4'
+
+
+class FakeStatus:
+    def __init__(self):
+        self.maintenance = False
+
+    def is_maintenance(self) -> bool:
+        return self.maintenance
+
+
+@pytest.fixture
+def status(monkeypatch):
+    status = FakeStatus()
+    monkeypatch.setattr(rendering, 'render_store', RenderStore())
+    monkeypatch.setattr(rendering, 'GameServers',
+                        types.SimpleNamespace(cached_server_status=lambda core_cache, gc_cache: status))
+    return status
+
+
+def test_server_status_generation_key(status, monkeypatch):
+    render = Renderer()
+    monkeypatch.setattr(rendering.info_formatters, 'format_server_status', render)
+    core_cache = types.SimpleNamespace(generation=1)
+    gc_cache = types.SimpleNamespace(generation=1)
+
+    assert rendering.server_status(core_cache, gc_cache, EN) == 'render #1'
+    assert rendering.server_status(core_cache, gc_cache, EN) == 'render #1'
+
+    status.maintenance = True  # the weekly maintenance window has started, nothing was written to the caches
+    assert rendering.server_status(core_cache, gc_cache, EN) == 'render #2'
+    assert rendering.server_status(core_cache, gc_cache, EN) == 'render #2'
+
+    gc_cache.generation = 2
+    assert rendering.server_status(core_cache, gc_cache, EN) == 'render #3'
+    core_cache.generation = 2
+    assert rendering.server_status(core_cache, gc_cache, EN) == 'render #4'
+    assert render.calls == 4
@@ -0,0 +1,120 @@
+import asyncio
+
+import httpx
+import pytest
+import requests
+import requests.adapters
+
+from conftest import import_isolated
+
+steam_webapi = import_isolated('utypes', 'steam_webapi')
+webapi_policy = import_isolated('utypes', 'webapi_policy')
+
+NO_DELAYS = webapi_policy.RetryPolicy(attempts=3, base_delay=0, max_delay=0, deadline=60)
+
+
+class FakeAdapter(requests.adapters.BaseAdapter):
+    """Answers every request with the next of ``statuses``, repeating the last one."""
+
+    def __init__(self, *statuses: int):
+        super().__init__()
+        self.statuses = list(statuses)
+        self.calls = 0
+
+    def send(self, request, **kwargs):
+        status = self.statuses[min(self.calls, len(self.statuses) - 1)]
+        self.calls += 1
+
+        response = requests.Response()
+        response.status_code = status
+        response._content = b'{"response": {}}' if status == 200 else b'<html>Internal Server Error</html>'
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+def fake_transport(*statuses: int) -> httpx.MockTransport:
+    calls = []
+
+    def handle(request):
+        status = statuses[min(len(calls), len(statuses) - 1)]
+        calls.append(request)
+        if status == 200:
+            return httpx.Response(status, json={'response': {}})
+        return httpx.Response(status, text='<html>Internal Server Error</html>')
+
+    transport = httpx.MockTransport(handle)
+    transport.calls = calls
+    return transport
+
+
+def test_error_response_without_retries():
+    adapter = FakeAdapter(500)
+    api = steam_webapi.SteamWebAPI('key', transport=adapter)
+
+    response = api.get_user_game_stats(76561198000000000, 730)
+    assert isinstance(response, requests.Response) and not response  # callers check for a falsy response
+    assert adapter.calls == 1
+
+
+def test_error_response_once_retries_run_out():
+    adapter = FakeAdapter(503)
+    api = steam_webapi.SteamWebAPI('key', transport=adapter, retry_policy=NO_DELAYS, breaker_failure_threshold=5)
+
+    assert api.get_player_summaries('1').status_code == 503
+    assert adapter.calls == 3
+    assert api.breakers['ISteamUser/GetPlayerSummaries'].failures == 3
+
+
+def test_retry_until_success():
+    adapter = FakeAdapter(502, 200)
+    api = steam_webapi.SteamWebAPI('key', transport=adapter, retry_policy=NO_DELAYS, breaker_failure_threshold=5)
+
+    assert api.get_player_summaries('1') == {'response': {}}
+    assert adapter.calls == 2
+    assert api.breaker_states() == {'ISteamUser/GetPlayerSummaries': webapi_policy.CircuitBreaker.CLOSED}
+
+
+def test_async_error_response_without_retries():
+    async def main():
+        transport = fake_transport(500)
+        api = steam_webapi.AsyncSteamWebAPI('key', transport=transport)
+        try:
+            response = await api.get_user_game_stats(76561198000000000, 730)
+        finally:
+            await api.close()
+        assert isinstance(response, httpx.Response) and response.status_code == 500
+        assert len(transport.calls) == 1
+
+    asyncio.run(main())
+
+
+def test_async_retry_until_success():
+    async def main():
+        transport = fake_transport(429, 500, 200)
+        api = steam_webapi.AsyncSteamWebAPI('key', transport=transport, retry_policy=NO_DELAYS)
+        try:
+            assert await api.get_player_summaries('1') == {'response': {}}
+        finally:
+            await api.close()
+        assert len(transport.calls) == 3
+
+    asyncio.run(main())
+
+
+def test_transport_errors_still_raise():
+    def fail(request):
+        raise httpx.ConnectError('no route', request=request)
+
+    async def main():
+        api = steam_webapi.AsyncSteamWebAPI('key', transport=httpx.MockTransport(fail))
+        try:
+            with pytest.raises(httpx.ConnectError):
+                await api.get_player_summaries('1')
+        finally:
+            await api.close()
+
+    asyncio.run(main())
@@ -0,0 +1,99 @@
+import types
+
+import pytest
+
+from conftest import import_isolated
+
+webapi_limits = import_isolated('utypes', 'webapi_limits')
+RateLimiter, RequestPriority, QuotaExceededError = (webapi_limits.RateLimiter, webapi_limits.RequestPriority,
+                                                    webapi_limits.QuotaExceededError)
+
+ENDPOINT = 'ICSGOServers_730/GetGameServersStatus'
+
+
+@pytest.fixture(autouse=True)
+def fake_time(monkeypatch, clock):
+    monkeypatch.setattr(webapi_limits, 'time', types.SimpleNamespace(time=clock))
+
+
+@pytest.fixture
+def make_limiter(tmp_path):
+    limiters = []
+
+    def make(**kwargs):
+        limiter = RateLimiter(tmp_path / 'limits.sqlite', **kwargs)
+        limiters.append(limiter)
+        return limiter
+
+    yield make
+    for limiter in limiters:
+        limiter.close()
+
+
+def take(limiter, count, priority=RequestPriority.COLLECTOR, endpoint=ENDPOINT):
+    """Returns how many tokens out of ``count`` were taken."""
+
+    return sum(limiter.acquire(endpoint, priority) == 0 for _ in range(count))
+
+
+def test_burst_then_wait(make_limiter, clock):
+    limiter = make_limiter(rate=2, burst=10)
+
+    assert take(limiter, 12) == 10
+    assert limiter.acquire(ENDPOINT, RequestPriority.COLLECTOR) == pytest.approx(0.5)
+
+    clock.advance(1)
+    assert take(limiter, 3) == 2
+
+
+def test_bucket_is_full_after_idle(make_limiter, clock):
+    limiter = make_limiter(rate=2, burst=10)
+
+    take(limiter, 10)
+    clock.advance(60)
+    assert take(limiter, 12) == 10
+
+
+def test_buckets_per_endpoint(make_limiter):
+    limiter = make_limiter(rate=1, burst=5, limits={'ISteamUser/GetPlayerSummaries': (1, 10)})
+
+    assert take(limiter, 6) == 5
+    assert take(limiter, 12, endpoint='ISteamUser/GetPlayerSummaries') == 10
+    assert take(limiter, 6, endpoint='ISteamApps/UpToDateCheck') == 5
+
+
+def test_lower_priorities_keep_reserve(make_limiter):
+    limiter = make_limiter(rate=1, burst=10)
+
+    assert take(limiter, 10, RequestPriority.BACKGROUND) == 5
+    assert take(limiter, 10, RequestPriority.INTERACTIVE) == 3
+    assert take(limiter, 10, RequestPriority.COLLECTOR) == 2
+
+
+def test_shared_between_instances(make_limiter):
+    first, second = make_limiter(rate=1, burst=10), make_limiter(rate=1, burst=10)
+
+    assert take(first, 6) == 6
+    assert take(second, 6) == 4
+
+
+def test_daily_quota(make_limiter, clock):
+    limiter = make_limiter(rate=1000, burst=1000, daily_quota=10)
+
+    assert take(limiter, 5, RequestPriority.BACKGROUND) == 5
+    with pytest.raises(QuotaExceededError):
+        limiter.acquire(ENDPOINT, RequestPriority.BACKGROUND)
+
+    assert take(limiter, 5) == 5
+    with pytest.raises(QuotaExceededError) as e:
+        limiter.acquire(ENDPOINT, RequestPriority.COLLECTOR)
+    assert (e.value.used, e.value.limit) == (10, 10)
+    assert limiter.quota()['used'] == 10
+
+    clock.advance(24 * 60 * 60)
+    assert take(limiter, 1) == 1
+
+
+def test_burst_too_small(make_limiter):
+    with pytest.raises(ValueError):
+        make_limiter(burst=1)
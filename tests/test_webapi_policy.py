@@ -0,0 +1,110 @@
+import types
+
+import pytest
+
+from conftest import import_isolated
+
+webapi_policy = import_isolated('utypes', 'webapi_policy')
+RetryPolicy, CircuitBreaker, CircuitOpenError = (webapi_policy.RetryPolicy, webapi_policy.CircuitBreaker,
+                                                 webapi_policy.CircuitOpenError)
+
+
+@pytest.fixture(autouse=True)
+def fake_time(monkeypatch, clock):
+    monkeypatch.setattr(webapi_policy, 'time', types.SimpleNamespace(monotonic=clock))
+
+
+@pytest.fixture
+def longest_delays(monkeypatch):
+    """Makes the jitter always pick the longest delay."""
+
+    monkeypatch.setattr(webapi_policy, 'random', types.SimpleNamespace(uniform=lambda a, b: b))
+
+
+def test_delays_are_bounded():
+    policy = RetryPolicy(attempts=6, base_delay=1, max_delay=5, deadline=1000)
+    for _ in range(100):
+        delays = list(policy.delays())
+        assert len(delays) == 5
+        for attempt, delay in enumerate(delays):
+            assert 0 <= delay <= min(5, 2 ** attempt)
+
+
+def test_delays_backoff(longest_delays):
+    assert list(RetryPolicy(attempts=5, base_delay=1, max_delay=5, deadline=1000).delays()) == [1, 2, 4, 5]
+    assert list(RetryPolicy(attempts=1).delays()) == []
+
+
+def test_delays_stop_at_deadline(longest_delays, clock):
+    policy = RetryPolicy(attempts=10, base_delay=4, max_delay=4, deadline=10)
+
+    delays = policy.delays()
+    assert next(delays) == 4
+    clock.advance(4 + 3)  # the delay and the second attempt
+    assert next(delays, None) is None  # 7 + 4 would be past the deadline
+
+
+def test_deadline_starts_when_delays_are_requested(longest_delays, clock):
+    policy = RetryPolicy(attempts=10, base_delay=4, max_delay=4, deadline=10)
+
+    delays = policy.delays()
+    clock.advance(7)  # the first attempt, the generator hasn't been started yet
+    assert next(delays, None) is None
+
+
+def test_breaker_opens_after_threshold(clock):
+    breaker = CircuitBreaker('endpoint', failure_threshold=3, reset_timeout=60)
+
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    breaker.record_success()  # failures have to be in a row
+    for _ in range(3):
+        breaker.before_call()
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    clock.advance(20)
+    with pytest.raises(CircuitOpenError) as e:
+        breaker.before_call()
+    assert e.value.retry_in == 40
+
+
+def test_breaker_half_open_trial(clock):
+    breaker = CircuitBreaker('endpoint', failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+
+    clock.advance(60)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.before_call()  # the trial call
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()  # only one at a time
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.before_call()
+
+
+def test_breaker_failed_trial_reopens(clock):
+    breaker = CircuitBreaker('endpoint', failure_threshold=5, reset_timeout=60)
+    for _ in range(5):
+        breaker.record_failure()
+
+    clock.advance(60)
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_breaker_lost_trial(clock):
+    breaker = CircuitBreaker('endpoint', failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+
+    clock.advance(60)
+    breaker.before_call()  # the trial gets cancelled and never reports back
+    clock.advance(60)
+    breaker.before_call()  # so another one is let through
@@ -4,4 +4,6 @@ from .game_data import *
 from .gun_info import *
 from .profiles import *
 from .states import *
-from .steam_webapi import SteamWebAPI
+from .steam_webapi import AsyncSteamWebAPI, SteamWebAPI
+from .webapi_limits import *
+from .webapi_policy import *
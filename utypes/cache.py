@@ -1,10 +1,19 @@
 from __future__ import annotations
 
+from dataclasses import dataclass, field
+import datetime as dt
+from typing import Callable, ClassVar, Hashable, Literal, TYPE_CHECKING, TypeVar
+
+from .states import State, States
+
+if TYPE_CHECKING:
+    from .datacenters import DatacenterStateVariation, DatacenterVariation
+
 
 __all__ = ['CoreCache', 'GCCache', 'GraphCache', 'LeaderboardCache']
 
-from typing import Literal
 
+T = TypeVar('T')
 
 _premier_leaderboard_entries = Literal['world_leaderboard_stats',
                                        'regional_leaderboard_stats_northamerica',
@@ -15,7 +24,157 @@ _premier_leaderboard_entries = Literal['world_leaderboard_stats',
                                        'regional_leaderboard_stats_china',
                                        'regional_leaderboard_stats_africa',]
 
-CoreCache = dict[str, ...]  # todo: implement actual dataclasses
-GCCache = dict[str, ...]
-GraphCache = dict[str, str]
-LeaderboardCache = dict[_premier_leaderboard_entries, list[dict[str, ...]]]
+
+
+class _DecodedCache:
+    """
+    Base for the cache models.
+
+    ``from_dict()`` remembers the last dict it has decoded, so as long as it's given
+    the same snapshot (see ``functions.caching.load_cache_snapshot()``), it returns the same object.
+    Anything built from a model can be memoized in it with ``derive()`` and will be thrown away
+    together with the model once a new cache generation arrives.
+    """
+
+    __slots__ = ()
+
+    _last: ClassVar[tuple[dict[str, ...] | None, _DecodedCache | None]] = (None, None)
+    _derived: dict
+
+    @classmethod
+    def from_dict(cls, data: dict[str, ...]):
+        source, decoded = cls._last
+        if data is source:
+            return decoded
+
+        decoded = cls._decode(data)
+        cls._last = (data, decoded)
+        return decoded
+
+    @classmethod
+    def _decode(cls, data: dict[str, ...]):
+        raise NotImplementedError
+
+    def derive(self, key, factory: Callable[[], T], *, depends_on: Hashable = None) -> T:
+        """
+        Returns a value built by ``factory()``, building it only once per model.
+
+        If the value also depends on something else (like the generation of another cache), pass it as ``depends_on``:
+        the value is rebuilt once it changes, and only the latest one is kept.
+        """
+
+        derived = self._derived.get(key)
+        if derived is not None and derived[0] == depends_on:
+            return derived[1]
+
+        value = factory()
+        self._derived[key] = (depends_on, value)
+        return value
+
+
+def _generation_key() -> str:
+    # not imported at the top: functions imports utypes itself
+    from functions.cache_backends import GENERATION_KEY
+
+    return GENERATION_KEY
+
+
+def _generation(data: dict[str, ...]) -> int:
+    return data.get(_generation_key(), 0)
+
+
+def _state(data: dict[str, ...], key: str) -> State:
+    return States.get_or_unknown(data.get(key))
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class CoreCache(_DecodedCache):
+    generation: int
+    latest_info_update: dt.datetime | State
+    sessions_logon_state: State
+    matchmaking_scheduler_state: State
+    steam_community_state: State
+    webapi_state: State
+    online_servers: int
+    active_players: int
+    searching_players: int
+    average_search_time: int
+    player_24h_peak: int
+    player_alltime_peak: int
+    monthly_unique_players: int
+    datacenters: dict[str, ...]
+    key_price: dict[str, str] | None
+    _derived: dict = field(default_factory=dict, init=False, repr=False)
+
+    @classmethod
+    def _decode(cls, data: dict[str, ...]):
+        api_timestamp = data.get('api_timestamp')
+        if api_timestamp is None:
+            latest_info_update = States.UNKNOWN
+        else:
+            latest_info_update = dt.datetime.fromtimestamp(api_timestamp, dt.UTC)
+
+        return cls(_generation(data),
+                   latest_info_update,
+                   _state(data, 'sessions_logon_state'),
+                   _state(data, 'matchmaking_scheduler_state'),
+                   _state(data, 'steam_community_state'),
+                   _state(data, 'webapi_state'),
+                   data.get('online_servers', 0),
+                   data.get('active_players', 0),
+                   data.get('searching_players', 0),
+                   data.get('average_search_time', 0),
+                   data.get('player_24h_peak', 0),
+                   data.get('player_alltime_peak', 0),
+                   data.get('monthly_unique_players', 0),
+                   data.get('datacenters', {}),
+                   data.get('key_price'))
+
+    def datacenter_state(self, datacenter: DatacenterVariation) -> DatacenterStateVariation:
+        return self.derive(('datacenter', datacenter.id), lambda: datacenter.cached_state(self.datacenters))
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class GCCache(_DecodedCache):
+    generation: int
+    game_coordinator_state: State
+    online_players: int
+    cs2_client_version: int | str
+    cs2_server_version: int | str
+    cs2_patch_version: str
+    cs2_version_timestamp: float
+    _derived: dict = field(default_factory=dict, init=False, repr=False)
+
+    @classmethod
+    def _decode(cls, data: dict[str, ...]):
+        return cls(_generation(data),
+                   _state(data, 'game_coordinator_state'),
+                   data.get('online_players', 0),
+                   data.get('cs2_client_version', States.UNKNOWN.literal),
+                   data.get('cs2_server_version', States.UNKNOWN.literal),
+                   data.get('cs2_patch_version', States.UNKNOWN.literal),
+                   data.get('cs2_version_timestamp', 0))
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class GraphCache(_DecodedCache):
+    generation: int
+    link: str
+    _derived: dict = field(default_factory=dict, init=False, repr=False)
+
+    @classmethod
+    def _decode(cls, data: dict[str, ...]):
+        return cls(_generation(data), data.get('link', ''))
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class LeaderboardCache(_DecodedCache):
+    generation: int
+    entries: dict[_premier_leaderboard_entries, list[dict[str, ...]]]
+    _derived: dict = field(default_factory=dict, init=False, repr=False)
+
+    @classmethod
+    def _decode(cls, data: dict[str, ...]):
+        generation_key = _generation_key()
+        entries = {k: v for k, v in data.items() if k != generation_key}
+        return cls(data.get(generation_key, 0), entries)
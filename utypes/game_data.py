@@ -3,12 +3,16 @@ from __future__ import annotations
 import dataclasses
 from dataclasses import dataclass
 import datetime as dt
+import hashlib
+import json
 from typing import NamedTuple, TYPE_CHECKING
 from zoneinfo import ZoneInfo
 
+import httpx
+
 from .cache import CoreCache, GCCache, LeaderboardCache
 from .states import States
-from .steam_webapi import SteamWebAPI, CS2_PREMIER_LEADERBOARD_REGIONS
+from .steam_webapi import AsyncSteamWebAPI, SteamWebAPI, CS2_PREMIER_LEADERBOARD_REGIONS
 from .protobufs import ScoreLeaderboardData
 
 if TYPE_CHECKING:
@@ -16,7 +20,7 @@ if TYPE_CHECKING:
 
     from .states import State
 
-__all__ = ('GameVersion', 'GameVersionData',
+__all__ = ('GameVersion', 'GameVersionData', 'GameVersionFetcher',
            'ExchangeRate', 'ExchangeRateData',
            'GameServers', 'OverallGameServersData', 'ServerStatusData', 'MatchmakingStatsData',
            'LeaderboardStats', 'LeaderboardEntry',
@@ -174,7 +178,10 @@ class GameVersion:
 
     @classmethod
     def request(cls, session: requests.Session):
-        cs2_data = session.get(cls.CS2_VERSION_DATA_URL).text
+        return cls._parse(session.get(cls.CS2_VERSION_DATA_URL).text)
+
+    @staticmethod
+    def _parse(cs2_data: str) -> GameVersionData:
         config_entries = (line for line in cs2_data.split('\n') if line)
 
         options = {}
@@ -194,20 +201,53 @@ class GameVersion:
                                cs2_server_version,
                                cs2_patch_version,
                                cs2_version_timestamp)
-    
+
     @staticmethod
-    def cached_data(gc_cache: GCCache):
+    def cached_data(gc_cache: GCCache) -> GameVersionData:
         """Get the version of the game"""
 
-        cs2_client_version = gc_cache.get('cs2_client_version', States.UNKNOWN.literal)
-        cs2_server_version = gc_cache.get('cs2_client_version', States.UNKNOWN.literal)
-        cs2_patch_version = gc_cache.get('cs2_patch_version', States.UNKNOWN.literal)
+        return gc_cache.derive('game_version', lambda: GameVersionData(gc_cache.cs2_client_version,
+                                                                       gc_cache.cs2_server_version,
+                                                                       gc_cache.cs2_patch_version,
+                                                                       gc_cache.cs2_version_timestamp))
 
-        cs2_version_timestamp = gc_cache.get('cs2_version_timestamp', 0)
-        return GameVersionData(cs2_client_version,
-                               cs2_server_version,
-                               cs2_patch_version,
-                               cs2_version_timestamp)
+
+class GameVersionFetcher:
+    """
+    Polls the game version data with conditional requests (``If-None-Match`` / ``If-Modified-Since``),
+    so a poll of unchanged data only costs a 304 response.
+    """
+
+    DEFAULT_TIMEOUT = 15
+
+    def __init__(self, *, timeout: float = DEFAULT_TIMEOUT, transport: httpx.AsyncBaseTransport = None):
+        self.client = httpx.AsyncClient(timeout=timeout, transport=transport)
+        self.etag: str | None = None
+        self.last_modified: str | None = None
+        self.data: GameVersionData | None = None
+
+    async def fetch(self) -> GameVersionData:
+        """Returns the current game version data, it's only downloaded and parsed again if it has changed."""
+
+        headers = {}
+        if self.data is not None:
+            if self.etag is not None:
+                headers['If-None-Match'] = self.etag
+            if self.last_modified is not None:
+                headers['If-Modified-Since'] = self.last_modified
+
+        response = await self.client.get(GameVersion.CS2_VERSION_DATA_URL, headers=headers)
+        if response.status_code == httpx.codes.NOT_MODIFIED and self.data is not None:
+            return self.data
+        response.raise_for_status()
+
+        self.data = GameVersion._parse(response.text)
+        self.etag = response.headers.get('ETag')
+        self.last_modified = response.headers.get('Last-Modified')
+        return self.data
+
+    async def close(self):
+        await self.client.aclose()
 
 
 class ExchangeRate:
@@ -225,7 +265,15 @@ class ExchangeRate:
 
     @classmethod
     def request(cls, webapi: SteamWebAPI):
-        r = webapi.get_asset_prices(730)['result']['assets']
+        return cls._parse(webapi.get_asset_prices(730))
+
+    @classmethod
+    async def arequest(cls, webapi: AsyncSteamWebAPI):
+        return cls._parse(await webapi.get_asset_prices(730))
+
+    @classmethod
+    def _parse(cls, response):
+        r = response['result']['assets']
         key_price = [item for item in r if item['classid'] == '1544098059'][0]['prices']
 
         for currency in cls.UNDEFINED_CURRENCIES:
@@ -242,14 +290,14 @@ class ExchangeRate:
     def cached_data(core_cache: CoreCache):
         """Get the currencies for CS2 store"""
 
-        key_prices = core_cache.get('key_price')
+        key_prices = core_cache.key_price
 
         if key_prices is None:
             # to allow chaining `ExchangeRate.cached_data().asdict()`
             # and get more sensible error later on
             return MockDict()
 
-        return ExchangeRateData(**key_prices)
+        return core_cache.derive('exchange_rate', lambda: ExchangeRateData(**key_prices))
 
 
 class MockDict(dict):
@@ -258,10 +306,31 @@ class MockDict(dict):
 
 
 class GameServers:
+    VOLATILE_APP_FIELDS = ('timestamp', 'time')  # change on every poll even if nothing else did
+
     @classmethod
     def request(cls, webapi: SteamWebAPI):
-        response = webapi.cs2_get_game_servers_status()
+        return cls.parse(webapi.cs2_get_game_servers_status())
+
+    @classmethod
+    async def arequest(cls, webapi: AsyncSteamWebAPI):
+        return cls.parse(await webapi.cs2_get_game_servers_status())
+
+    @classmethod
+    def fingerprint(cls, response) -> str:
+        """Hash of a ``GetGameServersStatus`` response that ignores the volatile fields."""
 
+        result = response['result']
+        app = {k: v for k, v in result['app'].items() if k not in cls.VOLATILE_APP_FIELDS}
+        payload = json.dumps(result | {'app': app}, sort_keys=True, separators=(',', ':'))
+        return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+    @staticmethod
+    def api_timestamp(response) -> int:
+        return response['result']['app']['timestamp']
+
+    @staticmethod
+    def parse(response):
         result = response['result']
         services = result['services']
         matchmaking = result['matchmaking']
@@ -288,55 +357,43 @@ class GameServers:
                                       datacenters)
 
     @staticmethod
-    def cached_server_status(core_cache: CoreCache, gc_cache: GCCache):
+    def cached_server_status(core_cache: CoreCache, gc_cache: GCCache) -> ServerStatusData | State:
         """Get the status of Counter-Strike servers"""
 
-        game_server_dt = GameServers.latest_info_update(core_cache)
-        if game_server_dt == States.UNKNOWN:
+        game_server_dt = core_cache.latest_info_update
+        if game_server_dt is States.UNKNOWN:
             return States.UNKNOWN
 
-        gc_state = States.get_or_unknown(gc_cache.get('game_coordinator_state'))  # GC!!!!
-        sl_state = States.get_or_unknown(core_cache.get('sessions_logon_state'))
-        ms_state = States.get_or_unknown(core_cache.get('matchmaking_scheduler_state'))
-        sc_state = States.get_or_unknown(core_cache.get('steam_community_state'))
-        webapi_state = States.get_or_unknown(core_cache.get('webapi_state'))
-
-        return ServerStatusData(game_server_dt,
-                                gc_state, sl_state, ms_state, sc_state, webapi_state)
+        return core_cache.derive('server_status',
+                                 lambda: ServerStatusData(game_server_dt,
+                                                          gc_cache.game_coordinator_state,  # GC!!!!
+                                                          core_cache.sessions_logon_state,
+                                                          core_cache.matchmaking_scheduler_state,
+                                                          core_cache.steam_community_state,
+                                                          core_cache.webapi_state),
+                                 depends_on=gc_cache.generation)
     
     @staticmethod
-    def cached_matchmaking_stats(core_cache: CoreCache, gc_cache: GCCache, graph_image: str):
-        game_server_dt = GameServers.latest_info_update(core_cache)
+    def cached_matchmaking_stats(core_cache: CoreCache, gc_cache: GCCache,
+                                 graph_image: str) -> MatchmakingStatsData | State:
+        game_server_dt = core_cache.latest_info_update
         if game_server_dt is States.UNKNOWN:
             return States.UNKNOWN
-        
-        gc_state = States.get_or_unknown(core_cache.get('game_coordinator_state'))
-        sl_state = States.get_or_unknown(core_cache.get('sessions_logon_state'))
-
-        online_players = gc_cache.get('online_players', 0)  # GC!!!!
-
-        online_servers = core_cache.get('online_servers', 0)
-        active_players = core_cache.get('active_players', 0)
-        average_search_time = core_cache.get('average_search_time', 0)
-        searching_players = core_cache.get('searching_players', 0)
-
-        player_24h_peak = core_cache.get('player_24h_peak', 0)
-        player_alltime_peak = core_cache.get('player_alltime_peak', 0)
-        monthly_unique_players = core_cache.get('monthly_unique_players', 0)
-
-        return MatchmakingStatsData(game_server_dt,
-                                    gc_state, sl_state,
-                                    graph_image,
-                                    online_servers,
-                                    online_players, active_players, searching_players, average_search_time,
-                                    player_24h_peak, player_alltime_peak, monthly_unique_players)
-    
-    @staticmethod
-    def latest_info_update(cache: CoreCache):
-        if cache.get('api_timestamp', States.UNKNOWN) == States.UNKNOWN:
-            return States.UNKNOWN
 
-        return dt.datetime.fromtimestamp(cache['api_timestamp'], dt.UTC)
+        return core_cache.derive('matchmaking_stats',
+                                 lambda: MatchmakingStatsData(game_server_dt,
+                                                              gc_cache.game_coordinator_state,
+                                                              core_cache.sessions_logon_state,
+                                                              graph_image,
+                                                              core_cache.online_servers,
+                                                              gc_cache.online_players,  # GC!!!!
+                                                              core_cache.active_players,
+                                                              core_cache.searching_players,
+                                                              core_cache.average_search_time,
+                                                              core_cache.player_24h_peak,
+                                                              core_cache.player_alltime_peak,
+                                                              core_cache.monthly_unique_players),
+                                 depends_on=(gc_cache.generation, graph_image))
 
 
 @dataclass
@@ -383,28 +440,46 @@ class LeaderboardStats:
     @staticmethod
     def request_world(steam_webapi: SteamWebAPI, *, season: int):
         world_leaderboard_data = steam_webapi.cs2_get_premier_leaderboard_stats(season=season)
-        world_leaderboard_data = world_leaderboard_data['result']['entries']
-        world_leaderboard_data = world_leaderboard_data[:10]
-
-        return [LeaderboardEntry.from_binary(person).asdict() for person in world_leaderboard_data]
+        return LeaderboardStats._parse(world_leaderboard_data)
 
     @staticmethod
     def request_regional(steam_webapi: SteamWebAPI, *, season: int, region: CS2_PREMIER_LEADERBOARD_REGIONS, ):
         regional_leaderboard_data = steam_webapi.cs2_get_premier_leaderboard_stats(season=season, region=region)
-        regional_leaderboard_data = regional_leaderboard_data['result']['entries']
-        regional_leaderboard_data = regional_leaderboard_data[:10]
+        return LeaderboardStats._parse(regional_leaderboard_data)
 
-        return [LeaderboardEntry.from_binary(person).asdict() for person in regional_leaderboard_data]
+    @staticmethod
+    async def arequest_world(steam_webapi: AsyncSteamWebAPI, *, season: int):
+        world_leaderboard_data = await steam_webapi.cs2_get_premier_leaderboard_stats(season=season)
+        return LeaderboardStats._parse(world_leaderboard_data)
+
+    @staticmethod
+    async def arequest_regional(steam_webapi: AsyncSteamWebAPI, *, season: int,
+                                region: CS2_PREMIER_LEADERBOARD_REGIONS):
+        regional_leaderboard_data = await steam_webapi.cs2_get_premier_leaderboard_stats(season=season,
+                                                                                         region=region)
+        return LeaderboardStats._parse(regional_leaderboard_data)
+
+    @staticmethod
+    def _parse(leaderboard_data):
+        leaderboard_data = leaderboard_data['result']['entries']
+        leaderboard_data = leaderboard_data[:10]
+
+        return [LeaderboardEntry.from_binary(person).asdict() for person in leaderboard_data]
+
+    @staticmethod
+    def cached_world_stats(lb_cache: LeaderboardCache) -> tuple[LeaderboardEntry, ...]:
+        return LeaderboardStats._cached_stats(lb_cache, 'world_leaderboard_stats')
 
     @staticmethod
-    def cached_world_stats(lb_cache: LeaderboardCache):
-        world_leaderboard_stats = lb_cache.get('world_leaderboard_stats', [])
-        return [LeaderboardEntry(**person) for person in world_leaderboard_stats]
+    def cached_regional_stats(lb_cache: LeaderboardCache,
+                              region: CS2_PREMIER_LEADERBOARD_REGIONS) -> tuple[LeaderboardEntry, ...]:
+        return LeaderboardStats._cached_stats(lb_cache, f'regional_leaderboard_stats_{region}')
 
     @staticmethod
-    def cached_regional_stats(lb_cache: LeaderboardCache, region: CS2_PREMIER_LEADERBOARD_REGIONS):
-        regional_leaderboard_stats = lb_cache.get(f'regional_leaderboard_stats_{region}', [])  # noqa
-        return [LeaderboardEntry(**person) for person in regional_leaderboard_stats]
+    def _cached_stats(lb_cache: LeaderboardCache, key: str) -> tuple[LeaderboardEntry, ...]:
+        # noinspection PyTypeChecker
+        return lb_cache.derive(key, lambda: tuple(LeaderboardEntry(**person)
+                                                  for person in lb_cache.entries.get(key, [])))
 
 
 def is_pdt(_datetime: dt.datetime) -> bool:
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 from dataclasses import astuple, dataclass
 from enum import auto, StrEnum
 import httpx
@@ -12,6 +13,7 @@ import requests
 
 import config
 from .steam_webapi import SteamWebAPI
+from .webapi_limits import rate_limiter_from_config, RequestPriority
 
 
 __all__ = ['ErrorCode', 'FACEITRequestsHandler', 'ParseUserStatsError', 'ProfileInfo', 'UserGameStats']
@@ -19,7 +21,9 @@ __all__ = ['ErrorCode', 'FACEITRequestsHandler', 'ParseUserStatsError', 'Profile
 STEAM_PROFILE_LINK_PATTERN = re.compile(r'(?:https?://)?steamcommunity\.com/(?:profiles|id)/[a-zA-Z0-9]+(/?)\w')
 _csgofrcode_chars = "ABCDEFGHJKLMNPQRSTUVWXYZ23456789"
 
-api = SteamWebAPI(config.STEAM_API_KEY)
+api = SteamWebAPI(config.STEAM_API_KEY,
+                  rate_limiter=rate_limiter_from_config(config),
+                  priority=RequestPriority.INTERACTIVE)
 
 
 def safe_div(x: float, y: float):
@@ -258,7 +262,8 @@ class UserGameStats(NamedTuple):
         try:
             _id = parse_steamid(data)
 
-            response = api.get_user_game_stats(steamid=_id.as_64, appid=730)
+            # in a thread, since waiting for the rate limiter shouldn't block the bot
+            response = await asyncio.to_thread(api.get_user_game_stats, steamid=_id.as_64, appid=730)
             if not response:
                 raise ParseUserStatsError(ErrorCode.PROFILE_IS_PRIVATE)
 
@@ -421,8 +426,8 @@ class ProfileInfo:
         try:
             _id = parse_steamid(data)
 
-            bans = api.get_player_bans(steamids=str(_id.as_64))
-            user_data = api.get_player_summaries(steamids=str(_id.as_64))
+            bans = await asyncio.to_thread(api.get_player_bans, steamids=str(_id.as_64))
+            user_data = await asyncio.to_thread(api.get_player_summaries, steamids=str(_id.as_64))
             if not isinstance(user_data, dict):
                 print(user_data)
                 raise ParseUserStatsError(ErrorCode.INVALID_REQUEST)
@@ -0,0 +1,72 @@
+"""
+SQLite database shared between threads and processes, used by the SQLite cache backend and the Web API rate limiter.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+import sqlite3
+import threading
+
+
+__all__ = ('SQLiteDatabase',)
+
+
+class SQLiteDatabase:
+    """
+    Opens a connection to the database per thread, in WAL mode so readers never block writers.
+
+    Connections are in autocommit mode, use ``transaction()`` to group statements.
+    """
+
+    DEFAULT_TIMEOUT = 10
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._local = threading.local()
+        self._connections: list[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+
+    def connection(self, *, timeout: float = DEFAULT_TIMEOUT) -> sqlite3.Connection:
+        """
+        Returns the connection of the current thread, opening it if needed.
+        ``timeout`` is how long its statements wait for a locked database.
+        """
+
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # connections are per thread: handlers may offload cache reads to threads
+            conn = sqlite3.connect(self.path, timeout=timeout, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def transaction(self, *, timeout: float = DEFAULT_TIMEOUT) -> _Transaction:
+        """``with db.transaction() as conn:`` commits the statements together, or rolls them back on exception."""
+
+        return _Transaction(self.connection(timeout=timeout))
+
+    def close(self):
+        """Closes the connections of all threads."""
+
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+
+
+class _Transaction:
+    """``BEGIN IMMEDIATE`` transaction, so concurrent writers wait for each other instead of failing on commit."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute('BEGIN IMMEDIATE')
+        return self.conn
+
+    def __exit__(self, exc_type, *_):
+        self.conn.execute('ROLLBACK' if exc_type is not None else 'COMMIT')
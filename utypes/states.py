@@ -31,8 +31,14 @@ class States:
     INTERNAL_STEAM_ERROR = State('internal Steam error', LK.states_internal_steam_error)
     UNKNOWN = State('unknown', LK.states_unknown)
 
+    _by_literal: dict[str, State] = {}
+
     @classmethod
     def get(cls, data, default=None) -> State | None:
+        state = cls._by_literal.get(data)
+        if state is not None:
+            return state
+
         data = str(data).replace(' ', '_').upper()
 
         return getattr(cls, data, default)
@@ -40,3 +46,6 @@ class States:
     @classmethod
     def get_or_unknown(cls, data: str | None) -> State:
         return cls.get(data, States.UNKNOWN)
+
+
+States._by_literal = {v.literal: v for v in vars(States).values() if isinstance(v, State)}
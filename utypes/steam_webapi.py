@@ -1,45 +1,81 @@
+import asyncio
+import json
+import time
 from typing import Literal
 
+import httpx
 import requests
+import requests.adapters
+
+from .webapi_limits import RateLimiter, RequestPriority
+from .webapi_policy import CircuitBreaker, RetryableResponseError, RetryPolicy
 
 
 CS2_PREMIER_LEADERBOARD_REGIONS = Literal['northamerica', 'southamerica', 'europe',
                                           'asia', 'australia', 'china', 'africa']
 
 
-class SteamWebAPI:
-    """Made because `steamio` doesn't have any Steam WebAPI support."""
-    # todo: deprecate and finish making it into seperate package
-    # todo: maybe even without API methods for partners (since we can't test them properly anyway)
+class _SteamWebAPIMethods:
+    """API methods shared by the sync and the async clients, ``_method()`` is what makes the difference."""
 
     BASE_URL = 'api.steampowered.com'
     DEFAULT_HEADERS = {}
     DEFAULT_TIMEOUT = 15
+    NO_RETRIES = RetryPolicy(attempts=1)
+
+    def __init__(self, api_key: str, *, headers: dict = None, timeout: int = None,
+                 retry_policy: RetryPolicy = None, breaker_failure_threshold: int = None,
+                 breaker_reset_timeout: float = CircuitBreaker.DEFAULT_RESET_TIMEOUT,
+                 rate_limiter: RateLimiter = None, priority: RequestPriority = RequestPriority.INTERACTIVE):
+        """
+        By default every call is made once. Pass ``retry_policy`` to retry failed calls
+        and ``breaker_failure_threshold`` to stop calling endpoints that keep failing (see ``CircuitBreaker``).
+        Once the retries run out, the last 429 or 5xx response is returned just like any other response.
+        With ``rate_limiter`` every attempt waits for a token of the ``priority`` first (see ``RateLimiter``).
+        """
 
-    def __init__(self, api_key: str, *, headers: dict = None, timeout: int = None):
         self.api_key = api_key
         self.headers = headers or self.DEFAULT_HEADERS
         self.timeout = timeout or self.DEFAULT_TIMEOUT
-        self.session = requests.Session()
-
-    def _method(self, interface: str, method: str, version: int, params: dict = None):  # only supports GET methods btw
+        self.retry_policy = retry_policy or self.NO_RETRIES
+        self.breaker_failure_threshold = breaker_failure_threshold
+        self.breaker_reset_timeout = breaker_reset_timeout
+        self.breakers: dict[str, CircuitBreaker] = {}
+        self.rate_limiter = rate_limiter
+        self.priority = priority
+
+    def _method(self, interface: str, method: str, version: int, params: dict = None):
+        raise NotImplementedError
+
+    def _breaker(self, interface: str, method: str) -> CircuitBreaker | None:
+        if self.breaker_failure_threshold is None:
+            return
+
+        endpoint = f'{interface}/{method}'
+        breaker = self.breakers.get(endpoint)
+        if breaker is None:
+            breaker = self.breakers[endpoint] = CircuitBreaker(endpoint,
+                                                               failure_threshold=self.breaker_failure_threshold,
+                                                               reset_timeout=self.breaker_reset_timeout)
+        return breaker
+
+    def breaker_states(self) -> dict[str, str]:
+        """Returns ``{endpoint: state}`` of all the endpoints called so far."""
+
+        return {endpoint: breaker.state for endpoint, breaker in self.breakers.items()}
+
+    @staticmethod
+    def _check_status(status_code: int, url: str):
+        if status_code in RetryPolicy.RETRYABLE_STATUS_CODES:
+            raise RetryableResponseError(status_code, url)
+
+    def _url(self, interface: str, method: str, version: int) -> str:
+        return f'https://{self.BASE_URL}/{interface}/{method}/v{version}/'
+
+    def _params(self, params: dict = None) -> dict:
         params = params.copy() if params else {}
         params['key'] = self.api_key
-
-        response = self.session.get(
-            f'https://{self.BASE_URL}/{interface}/{method}/v{version}/',
-            params=params,
-            headers=self.headers,
-            timeout=self.timeout
-        )
-
-        try:
-            return response.json()
-        except requests.exceptions.JSONDecodeError:
-            return response
-
-    def close(self):
-        self.session.close()
+        return params
 
     def get_player_bans(self, steamids: list | tuple | str):
         if isinstance(steamids, (list, tuple)):
@@ -85,3 +121,132 @@ class SteamWebAPI:
         return self._method('ICSGOServers_730', 'GetLeaderboardEntries', 1,
                             {'lbname': leaderboard_name})
 
+
+class SteamWebAPI(_SteamWebAPIMethods):
+    """Made because `steamio` doesn't have any Steam WebAPI support."""
+    # todo: deprecate and finish making it into seperate package
+    # todo: maybe even without API methods for partners (since we can't test them properly anyway)
+
+    RETRYABLE_EXCEPTIONS = (requests.ConnectionError, requests.Timeout, RetryableResponseError)
+
+    def __init__(self, api_key: str, *, transport: requests.adapters.BaseAdapter = None, **kwargs):
+        """``transport`` replaces the HTTP adapter used for the API (e.g. an offline stand-in for benchmarks)."""
+
+        super().__init__(api_key, **kwargs)
+        self.session = requests.Session()
+        if transport is not None:
+            self.session.mount(f'https://{self.BASE_URL}/', transport)
+
+    def _method(self, interface: str, method: str, version: int, params: dict = None):  # only supports GET methods btw
+        breaker = self._breaker(interface, method)
+        delays = self.retry_policy.delays()
+        url = self._url(interface, method, version)
+
+        while True:
+            if breaker is not None:
+                breaker.before_call()
+            self._throttle(interface, method)
+            try:
+                response = self.session.get(url, params=self._params(params), headers=self.headers,
+                                            timeout=self.timeout)
+                self._check_status(response.status_code, url)
+            except self.RETRYABLE_EXCEPTIONS as e:
+                if breaker is not None:
+                    breaker.record_failure()
+                delay = next(delays, None)
+                if delay is None:
+                    if isinstance(e, RetryableResponseError):
+                        break  # out of retries, the caller deals with the error response as before
+                    raise
+                time.sleep(delay)
+                continue
+
+            if breaker is not None:
+                breaker.record_success()
+            break
+
+        try:
+            return response.json()
+        except requests.exceptions.JSONDecodeError:
+            return response
+
+    def _throttle(self, interface: str, method: str):
+        if self.rate_limiter is None:
+            return
+
+        while wait := self.rate_limiter.acquire(f'{interface}/{method}', self.priority):
+            time.sleep(wait)
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncSteamWebAPI(_SteamWebAPIMethods):
+    """
+    Asyncio version of ``SteamWebAPI`` with the same methods, except that they have to be awaited.
+
+    Uses a single pooled ``httpx.AsyncClient``, so the connections to the API are kept alive between the calls
+    and concurrent calls don't block each other. HTTP/2 requires the ``h2`` package.
+    """
+
+    DEFAULT_MAX_CONNECTIONS = 10
+    RETRYABLE_EXCEPTIONS = (httpx.TransportError, RetryableResponseError)
+
+    def __init__(self, api_key: str, *, http2: bool = False, max_connections: int = DEFAULT_MAX_CONNECTIONS,
+                 transport: httpx.AsyncBaseTransport = None, **kwargs):
+        """``transport`` replaces the HTTP transport (e.g. an offline stand-in for benchmarks)."""
+
+        super().__init__(api_key, **kwargs)
+        self.client = httpx.AsyncClient(headers=self.headers,
+                                        timeout=self.timeout,
+                                        http2=http2,
+                                        limits=httpx.Limits(max_connections=max_connections,
+                                                            max_keepalive_connections=max_connections),
+                                        transport=transport)
+
+    async def _method(self, interface: str, method: str, version: int, params: dict = None):
+        breaker = self._breaker(interface, method)
+        delays = self.retry_policy.delays()
+        url = self._url(interface, method, version)
+
+        while True:
+            if breaker is not None:
+                breaker.before_call()
+            await self._throttle(interface, method)
+            try:
+                response = await self.client.get(url, params=self._params(params))
+                self._check_status(response.status_code, url)
+            except self.RETRYABLE_EXCEPTIONS as e:
+                if breaker is not None:
+                    breaker.record_failure()
+                delay = next(delays, None)
+                if delay is None:
+                    if isinstance(e, RetryableResponseError):
+                        break  # out of retries, the caller deals with the error response as before
+                    raise
+                await asyncio.sleep(delay)
+                continue
+
+            if breaker is not None:
+                breaker.record_success()
+            break
+
+        try:
+            return response.json()
+        except json.JSONDecodeError:
+            return response
+
+    async def _throttle(self, interface: str, method: str):
+        if self.rate_limiter is None:
+            return
+
+        # the limiter's database is locked by other processes too, so wait for it in a thread
+        while wait := await asyncio.to_thread(self.rate_limiter.acquire, f'{interface}/{method}', self.priority):
+            await asyncio.sleep(wait)
+
+    async def close(self):
+        await self.client.aclose()
+
+    async def cs2_get_monthly_player_count(self):
+        response = await self._method('ICSGOServers_730', 'GetMonthlyPlayerCount', 1)
+        return int(response['result']['players'])
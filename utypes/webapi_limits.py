@@ -0,0 +1,186 @@
+"""
+Rate limiting and daily quota accounting for the Steam Web API key.
+
+The key is shared between processes (the core collector polls the API, the bot looks up profiles),
+so the limiter keeps its state in a small SQLite database every process opens:
+a token bucket per endpoint (``Interface/Method``) and the number of calls made per UTC day.
+
+Lower priorities can't use the last part of every bucket and of the daily quota (see ``RateLimiter.RESERVES``),
+so a burst of profile lookups never starves the collector.
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+from enum import StrEnum
+from pathlib import Path
+import time
+
+from .sqlite_db import SQLiteDatabase
+
+
+__all__ = ('RateLimiter', 'RequestPriority', 'QuotaExceededError', 'rate_limiter_from_config')
+
+
+class RequestPriority(StrEnum):
+    COLLECTOR = 'collector'
+    INTERACTIVE = 'interactive'
+    BACKGROUND = 'background'
+
+
+class QuotaExceededError(Exception):
+    """Raised instead of calling the API when the daily quota available to the priority is used up."""
+
+    def __init__(self, priority: RequestPriority, used: int, limit: int):
+        super().__init__(f'Steam Web API daily quota for {priority} requests is used up ({used}/{limit})')
+        self.priority = priority
+        self.used = used
+        self.limit = limit
+
+
+class RateLimiter:
+    """
+    Token bucket per endpoint plus a daily quota, shared between the processes using the same ``db_path``.
+
+    ``acquire()`` takes a token if there's one available to the priority, otherwise it returns how long to wait.
+    Every endpoint gets ``rate`` tokens per second up to ``burst`` tokens, unless it's overridden in ``limits``.
+    """
+
+    DEFAULT_RATE = 4
+    DEFAULT_BURST = 20
+    DEFAULT_DAILY_QUOTA = 100_000  # calls per key per day, as documented by Valve
+    # shares of every bucket and of the daily quota a priority can't use
+    RESERVES = {RequestPriority.COLLECTOR: 0,
+                RequestPriority.INTERACTIVE: 0.2,
+                RequestPriority.BACKGROUND: 0.5}
+    KEEP_USAGE_DAYS = 30
+
+    SCHEMA = (
+        'CREATE TABLE IF NOT EXISTS webapi_buckets ('
+        'endpoint TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL'
+        ') WITHOUT ROWID',
+        'CREATE TABLE IF NOT EXISTS webapi_usage ('
+        'day TEXT NOT NULL, endpoint TEXT NOT NULL, priority TEXT NOT NULL, '
+        'calls INTEGER NOT NULL DEFAULT 0, throttled INTEGER NOT NULL DEFAULT 0, '
+        'PRIMARY KEY (day, endpoint, priority)'
+        ') WITHOUT ROWID',
+    )
+
+    def __init__(self, db_path: Path, *, rate: float = DEFAULT_RATE, burst: float = DEFAULT_BURST,
+                 limits: dict[str, tuple[float, float]] = None, daily_quota: int = DEFAULT_DAILY_QUOTA):
+        self.db_path = db_path
+        self.rate = rate
+        self.burst = burst
+        self.limits = limits or {}
+        self.daily_quota = daily_quota
+
+        for endpoint, (_, endpoint_burst) in {'default': (rate, burst), **self.limits}.items():
+            if endpoint_burst * (1 - max(self.RESERVES.values())) < 1:
+                raise ValueError(f'Burst of the {endpoint} bucket is too small for every priority to get a token')
+
+        self.db = SQLiteDatabase(db_path)
+
+        with self.db.transaction() as conn:
+            for statement in self.SCHEMA:
+                conn.execute(statement)
+            oldest_day = _utc_day(time.time() - self.KEEP_USAGE_DAYS * 24 * 60 * 60)
+            conn.execute('DELETE FROM webapi_usage WHERE day < ?', (oldest_day,))
+
+    def _endpoint_limits(self, endpoint: str) -> tuple[float, float]:
+        return self.limits.get(endpoint, (self.rate, self.burst))
+
+    def acquire(self, endpoint: str, priority: RequestPriority) -> float:
+        """
+        Takes a token of ``endpoint`` and counts the call, returning 0.
+        If there are no tokens available to ``priority``, returns the number of seconds to wait before trying again.
+
+        Raises ``QuotaExceededError`` if the daily quota available to ``priority`` is used up.
+        """
+
+        rate, burst = self._endpoint_limits(endpoint)
+        reserve = self.RESERVES[priority]
+        now = time.time()
+        day = _utc_day(now)
+
+        with self.db.transaction() as conn:
+            used = conn.execute('SELECT COALESCE(SUM(calls), 0) FROM webapi_usage WHERE day = ?',
+                                (day,)).fetchone()[0]
+            limit = int(self.daily_quota * (1 - reserve))
+            if used >= limit:
+                raise QuotaExceededError(priority, used, limit)
+
+            row = conn.execute('SELECT tokens, updated_at FROM webapi_buckets WHERE endpoint = ?',
+                               (endpoint,)).fetchone()
+            tokens = burst if row is None else min(burst, row[0] + max(0., now - row[1]) * rate)
+
+            floor = burst * reserve
+            if tokens - 1 >= floor:
+                tokens -= 1
+                wait = 0.
+                column = 'calls'
+            else:
+                wait = (floor + 1 - tokens) / rate
+                column = 'throttled'
+
+            conn.execute('INSERT INTO webapi_buckets (endpoint, tokens, updated_at) VALUES (?, ?, ?) '
+                         'ON CONFLICT (endpoint) DO UPDATE SET tokens = excluded.tokens, '
+                         'updated_at = excluded.updated_at', (endpoint, tokens, now))
+            conn.execute(f'INSERT INTO webapi_usage (day, endpoint, priority, {column}) VALUES (?, ?, ?, 1) '
+                         f'ON CONFLICT (day, endpoint, priority) DO UPDATE SET {column} = {column} + 1',
+                         (day, endpoint, priority.value))
+        return wait
+
+    def quota(self) -> dict[str, ...]:
+        """Returns the number of calls made today and the daily quota."""
+
+        day = _utc_day(time.time())
+        used = self.db.connection().execute('SELECT COALESCE(SUM(calls), 0) FROM webapi_usage WHERE day = ?',
+                                            (day,)).fetchone()[0]
+        return {'day': day, 'used': used, 'limit': self.daily_quota}
+
+    def stats(self) -> dict[str, ...]:
+        """Returns today's calls and throttled attempts per endpoint and priority, along with the tokens left."""
+
+        now = time.time()
+        day = _utc_day(now)
+        conn = self.db.connection()
+        endpoints = {}
+        for endpoint, tokens, updated_at in conn.execute('SELECT endpoint, tokens, updated_at FROM webapi_buckets'):
+            rate, burst = self._endpoint_limits(endpoint)
+            endpoints[endpoint] = {'tokens': round(min(burst, tokens + max(0., now - updated_at) * rate), 2),
+                                   'calls': {}, 'throttled': {}}
+        for endpoint, priority, calls, throttled in conn.execute(
+                'SELECT endpoint, priority, calls, throttled FROM webapi_usage WHERE day = ?', (day,)):
+            stats = endpoints.setdefault(endpoint, {'tokens': None, 'calls': {}, 'throttled': {}})
+            stats['calls'][priority] = calls
+            stats['throttled'][priority] = throttled
+
+        used = sum(sum(stats['calls'].values()) for stats in endpoints.values())
+        return {'day': day, 'used': used, 'limit': self.daily_quota, 'endpoints': endpoints}
+
+    def close(self):
+        self.db.close()
+
+
+def _utc_day(timestamp: float) -> str:
+    return f'{dt.datetime.fromtimestamp(timestamp, dt.UTC):%Y-%m-%d}'
+
+
+def rate_limiter_from_config(config) -> RateLimiter | None:
+    """
+    Makes the rate limiter shared by all the processes using the Steam Web API key.
+
+    ``STEAM_WEBAPI_LIMITS_FILE_PATH`` enables it, ``STEAM_WEBAPI_RATE`` / ``STEAM_WEBAPI_BURST`` set the default
+    bucket, ``STEAM_WEBAPI_ENDPOINT_LIMITS`` overrides it per endpoint (``{'Interface/Method': (rate, burst)}``)
+    and ``STEAM_WEBAPI_DAILY_QUOTA`` sets the daily quota. Returns ``None`` if it's not enabled.
+    """
+
+    db_path = getattr(config, 'STEAM_WEBAPI_LIMITS_FILE_PATH', None)
+    if db_path is None:
+        return
+
+    return RateLimiter(db_path,
+                       rate=getattr(config, 'STEAM_WEBAPI_RATE', RateLimiter.DEFAULT_RATE),
+                       burst=getattr(config, 'STEAM_WEBAPI_BURST', RateLimiter.DEFAULT_BURST),
+                       limits=getattr(config, 'STEAM_WEBAPI_ENDPOINT_LIMITS', None),
+                       daily_quota=getattr(config, 'STEAM_WEBAPI_DAILY_QUOTA', RateLimiter.DEFAULT_DAILY_QUOTA))
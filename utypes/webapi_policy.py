@@ -0,0 +1,123 @@
+"""Retry and circuit breaker policies used by ``SteamWebAPI`` and ``AsyncSteamWebAPI``."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+import random
+import time
+from typing import Iterator
+
+
+__all__ = ('RetryPolicy', 'CircuitBreaker', 'CircuitOpenError', 'RetryableResponseError')
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an endpoint while its circuit breaker is open."""
+
+    def __init__(self, endpoint: str, retry_in: float):
+        super().__init__(f'Circuit breaker for {endpoint} is open, retry in {retry_in:.0f} seconds')
+        self.endpoint = endpoint
+        self.retry_in = retry_in
+
+
+class RetryableResponseError(Exception):
+    """Raised when the API keeps answering with a retryable status code (429, 5xx)."""
+
+    def __init__(self, status_code: int, url: str):
+        super().__init__(f'Got {status_code} from {url}')
+        self.status_code = status_code
+
+
+@dataclass(frozen=True, slots=True)
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter: the n-th retry waits for a random time in
+    ``[0, min(max_delay, base_delay * 2 ** n)]``. Retrying stops after ``attempts`` attempts
+    or once the next try wouldn't start before ``deadline`` seconds since the first one.
+    """
+
+    attempts: int = 4
+    base_delay: float = 1
+    max_delay: float = 30
+    deadline: float = 60
+
+    RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+    def delays(self) -> Iterator[float]:
+        """
+        Returns an iterator of the delays before every retry, it stops when there should be no more retries.
+        Should be called right before the first attempt, that's when the deadline starts.
+        """
+
+        return self._delays(time.monotonic() + self.deadline)
+
+    def _delays(self, deadline: float) -> Iterator[float]:
+        for attempt in range(self.attempts - 1):
+            delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+            if time.monotonic() + delay >= deadline:
+                return
+            yield delay
+
+
+class CircuitBreaker:
+    """
+    Per-endpoint circuit breaker.
+
+    Opens after ``failure_threshold`` failures in a row, so the endpoint isn't called for ``reset_timeout`` seconds.
+    After that a single trial call is let through (half-open): success closes the breaker, failure opens it again.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    DEFAULT_FAILURE_THRESHOLD = 5
+    DEFAULT_RESET_TIMEOUT = 120
+
+    __slots__ = ('endpoint', 'failure_threshold', 'reset_timeout', 'failures', 'opened_at', '_trial_started_at')
+
+    def __init__(self, endpoint: str, *, failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+                 reset_timeout: float = DEFAULT_RESET_TIMEOUT):
+        self.endpoint = endpoint
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._trial_started_at: float | None = None  # of the half-open trial call
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at < self.reset_timeout:
+            return self.OPEN
+        return self.HALF_OPEN
+
+    def before_call(self):
+        """Raises ``CircuitOpenError`` if the endpoint shouldn't be called right now."""
+
+        state = self.state
+        if state == self.CLOSED:
+            return
+
+        now = time.monotonic()
+        if state == self.OPEN:
+            raise CircuitOpenError(self.endpoint, self.reset_timeout - (now - self.opened_at))
+        # let a single trial call through, or another one if the previous trial got lost (e.g. cancelled)
+        if self._trial_started_at is not None and now - self._trial_started_at < self.reset_timeout:
+            raise CircuitOpenError(self.endpoint, self.reset_timeout - (now - self._trial_started_at))
+        self._trial_started_at = now
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial_started_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self._trial_started_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+        self._trial_started_at = None
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.endpoint!r}, state={self.state!r}, failures={self.failures})'